@@ -0,0 +1,127 @@
+"""
+Runtime configuration for the claim routing API.
+
+Settings are read from environment variables (or a .env file) once at import time.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "thread" or "process". Processes avoid GIL contention with the event loop for
+# CPU-heavy traffic, at the cost of loading the NLP and ML models in every worker.
+ROUTING_POOL = os.getenv("ROUTING_POOL", "thread")
+
+# Number of workers running extraction, scoring and ML inference off the event loop.
+# 0 runs the pipeline inline on the event loop.
+ROUTING_WORKERS = int(os.getenv("ROUTING_WORKERS", str(os.cpu_count() or 1)))
+
+# Number of routing jobs allowed to wait for a free worker before new submissions are rejected.
+ROUTING_QUEUE_LIMIT = int(os.getenv("ROUTING_QUEUE_LIMIT", "64"))
+
+# spaCy pipeline used to find named entities in claim text. It is loaded on the first text
+# claim, not at startup, so structured-only deployments and health probes never load it.
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+
+# Comma-separated pipeline components that are not loaded at all, and components loaded but
+# not run. Extraction only reads named entities, so by default only tok2vec and ner are kept.
+SPACY_EXCLUDE = [name.strip() for name in os.getenv(
+    "SPACY_EXCLUDE", "tagger,parser,attribute_ruler,lemmatizer,senter"
+).split(",") if name.strip()]
+SPACY_DISABLE = [name.strip() for name in os.getenv("SPACY_DISABLE", "").split(",") if name.strip()]
+
+# Claim texts run through the spaCy pipeline together when many claims are extracted at once,
+# and the processes those batches are spread over (-1 for one per CPU). Extra processes only
+# pay off for large batches with idle cores to spare; each one loads its own pipeline.
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "64"))
+SPACY_PROCESSES = int(os.getenv("SPACY_PROCESSES", "1"))
+
+# Claims buffered per live dashboard subscriber before it is dropped as too slow.
+FEED_BUFFER_SIZE = int(os.getenv("FEED_BUFFER_SIZE", "256"))
+
+# Seconds between keep-alive comments on idle live dashboard streams.
+FEED_HEARTBEAT_SECONDS = float(os.getenv("FEED_HEARTBEAT_SECONDS", "15"))
+
+# Share of the routing worker pool's capacity (running plus queued jobs) in use at which
+# new claims are routed in degraded mode: regex-only extraction and rules-only routing.
+ADMISSION_DEGRADE_LOAD = float(os.getenv("ADMISSION_DEGRADE_LOAD", "0.5"))
+
+# Share of capacity in use at which new claims are rejected with 503 and Retry-After.
+ADMISSION_SHED_LOAD = float(os.getenv("ADMISSION_SHED_LOAD", "0.9"))
+
+# Seconds clients are asked to wait before retrying a rejected claim.
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# Directory for files the API keeps between restarts.
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data"))
+
+# SQLite database holding asynchronous claim jobs, so queued jobs survive a crash.
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(DATA_DIR, "claim_jobs.db"))
+
+# Asynchronous jobs allowed to be queued or running before new ones are rejected with 503.
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "1000"))
+
+# Asynchronous jobs processed concurrently; each one takes a routing worker while it runs.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(max(ROUTING_WORKERS, 1))))
+
+# Attempts before a job that keeps failing unexpectedly (e.g. a crashed worker) is marked failed.
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Seconds before a failed job is retried, doubled after each further failed attempt.
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "2"))
+
+# Comma-separated hosts job callbacks may be sent to. When empty, callbacks may go to any host
+# that resolves to public addresses only, never to private, loopback or link-local ones.
+JOB_CALLBACK_ALLOWED_HOSTS = [host.strip().lower() for host in os.getenv(
+    "JOB_CALLBACK_ALLOWED_HOSTS", ""
+).split(",") if host.strip()]
+
+# Seconds finished jobs are kept for polling before they are deleted.
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+
+# Recent routing decisions kept in memory to answer resubmitted claims without a lookup.
+DEDUPE_CACHE_SIZE = int(os.getenv("DEDUPE_CACHE_SIZE", "10000"))
+
+# Where routed claims are stored: "memory" keeps them in process memory (with the claim
+# log below for durability), "shared" keeps them in the memory of every uvicorn worker,
+# kept in step through the file at CLAIM_SHARED_PATH, "sqlite" keeps them in the SQLite
+# database at CLAIM_DB_PATH, which several workers can also share, and "postgres" in the
+# database at CLAIM_DB_URL.
+CLAIM_STORE = os.getenv("CLAIM_STORE", "memory")
+
+# Append-only file of routed claims shared by the uvicorn workers, with CLAIM_STORE=shared.
+CLAIM_SHARED_PATH = os.getenv("CLAIM_SHARED_PATH", os.path.join(DATA_DIR, "claims.shared"))
+
+# SQLite database of routed claims, with CLAIM_STORE=sqlite.
+CLAIM_DB_PATH = os.getenv("CLAIM_DB_PATH", os.path.join(DATA_DIR, "claims.db"))
+
+# PostgreSQL connection string and connection pool size, with CLAIM_STORE=postgres.
+CLAIM_DB_URL = os.getenv("CLAIM_DB_URL", "postgresql://localhost/scope")
+CLAIM_DB_POOL_MIN_SIZE = int(os.getenv("CLAIM_DB_POOL_MIN_SIZE", "1"))
+CLAIM_DB_POOL_MAX_SIZE = int(os.getenv("CLAIM_DB_POOL_MAX_SIZE", "10"))
+
+# Directory of the claim write-ahead log and snapshots of the in-memory store; stored claims
+# are restored from it on startup. Set to an empty string to keep claims in memory only.
+CLAIM_LOG_DIR = os.getenv("CLAIM_LOG_DIR", os.path.join(DATA_DIR, "claim_log"))
+
+# Milliseconds between group commits: claims logged in that window share one fsync.
+CLAIM_LOG_FLUSH_MS = float(os.getenv("CLAIM_LOG_FLUSH_MS", "5"))
+
+# Wait for the group commit before answering a submission, so an acknowledged claim is
+# never lost; otherwise up to CLAIM_LOG_FLUSH_MS of claims can be lost in a crash.
+CLAIM_LOG_SYNC_COMMIT = os.getenv("CLAIM_LOG_SYNC_COMMIT", "false").lower() in ("1", "true", "yes")
+
+# Claims logged after the latest snapshot before a new snapshot is written.
+CLAIM_LOG_SNAPSHOT_EVERY = int(os.getenv("CLAIM_LOG_SNAPSHOT_EVERY", "100000"))
+
+# Newest claims kept in memory as routing decisions by the memory and shared stores; older
+# claims move to compressed segments on disk, so memory no longer grows with every claim's
+# full record. 0 keeps every claim in memory.
+CLAIM_HOT_CLAIMS = int(os.getenv("CLAIM_HOT_CLAIMS", "100000"))
+
+# Directory of the segments of claims no longer kept in memory, and the claims per segment.
+# Segments are rebuilt from the claim log on startup; each process keeps its own.
+CLAIM_SEGMENT_DIR = os.getenv("CLAIM_SEGMENT_DIR", os.path.join(DATA_DIR, "claim_segments"))
+CLAIM_SEGMENT_CLAIMS = int(os.getenv("CLAIM_SEGMENT_CLAIMS", "10000"))
@@ -1,11 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import claims
+from app.modules.worker_pool import routing_pool
+from app.modules.admission import admission_controller
+from app.modules.job_queue import claim_jobs
+from app.modules.database import ClaimDatabase
+from app import config
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ClaimDatabase.open()
+    if config.CLAIM_STORE == "memory" and config.CLAIM_LOG_DIR:
+        restored = ClaimDatabase.open_log(config.CLAIM_LOG_DIR)
+        print(f"Restored {restored} claims from {config.CLAIM_LOG_DIR}")
+    await claim_jobs.start()
+    yield
+    await claim_jobs.stop()
+    routing_pool.shutdown()
+    await ClaimDatabase.close()
+
 
 app = FastAPI(
     title="SCOPE Assistant",
     description="API for routing insurance claims to appropriate teams",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Disable CORS. Do not remove this for full-stack development.
@@ -15,6 +36,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor", "ETag", "Idempotent-Replayed"],
 )
 
 app.include_router(claims.router, tags=["claims"])
@@ -23,12 +45,18 @@ app.include_router(claims.router, tags=["claims"])
 async def healthz():
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def metrics():
+    return {"admission": admission_controller.metrics()}
+
 @app.get("/")
 async def root():
     return {
         "message": "Welcome to the SCOPE Assistant API",
         "endpoints": {
             "submit_claim": "/submit-claim",
+            "submit_claims": "/submit-claims",
+            "submit_claim_async": "/submit-claim/async",
             "adjuster_dashboard": "/adjuster-dashboard",
             "get_claim": "/claim/{claim_id}"
         }
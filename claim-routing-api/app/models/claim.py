@@ -1,5 +1,6 @@
-from typing import List, Optional, Dict
-from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import List, Optional, Dict, Literal
+from pydantic import BaseModel, Field, field_validator
 
 
 class ClaimInput(BaseModel):
@@ -8,6 +9,11 @@ class ClaimInput(BaseModel):
     structured_data: Optional[dict] = None
 
 
+class AsyncClaimInput(ClaimInput):
+    """Model for a claim submitted for asynchronous processing"""
+    callback_url: Optional[str] = Field(None, description="URL that receives the finished job by POST")
+
+
 class FraudIndicator(BaseModel):
     """Model for fraud indicators"""
     is_potential_fraud: bool = False
@@ -45,6 +51,116 @@ class RoutingDecision(BaseModel):
     fraud_indicators: List[str] = []
 
 
+class ClaimSummary(BaseModel):
+    """Model for the compact view of a routing decision used in claim listings"""
+    claim_id: str
+    assigned_team: str
+    urgency: str
+    risk_score: float
+    customer_value: str
+    is_potential_fraud: bool = False
+
+
+class BatchClaimResult(BaseModel):
+    """Model for the outcome of one claim in a batch submission"""
+    index: int
+    decision: Optional[RoutingDecision] = None
+    error: Optional[str] = None
+
+
+class ClaimJob(BaseModel):
+    """Model for the status of an asynchronously processed claim"""
+    job_id: str
+    status: Literal["queued", "running", "done", "failed"]
+    created_at: datetime
+    updated_at: datetime
+    attempts: int = 0
+    decision: Optional[RoutingDecision] = None
+    error: Optional[str] = None
+
+
+class ClaimQuery(BaseModel):
+    """Model for filtering, sorting and paginating stored claims"""
+    team: Optional[str] = None
+    urgency: Optional[str] = Field(None, description="Low, Medium, High")
+    customer_value: Optional[str] = Field(None, description="Standard, Premium, VIP")
+    is_potential_fraud: Optional[bool] = None
+    min_risk: Optional[float] = Field(None, ge=0, le=1)
+    max_risk: Optional[float] = Field(None, ge=0, le=1)
+    min_amount: Optional[float] = Field(None, ge=0, description="Smallest claim amount paid, inclusive")
+    max_amount: Optional[float] = Field(None, ge=0, description="Largest claim amount paid, inclusive")
+    date_from: Optional[date] = Field(None, description="Earliest claim date, inclusive")
+    date_to: Optional[date] = Field(None, description="Latest claim date, inclusive")
+    sort: Literal["submitted", "risk", "urgency", "amount"] = Field(
+        "submitted",
+        description="submitted: oldest first, risk: riskiest first, urgency: most urgent first, "
+                    "amount: largest claim amount first, claims without one last"
+    )
+    limit: int = Field(100, ge=1, le=1000)
+    cursor: Optional[str] = Field(None, description="Opaque cursor returned by the previous page")
+    view: Literal["full", "summary"] = Field(
+        "full", description="full: complete routing decisions, summary: compact records without claim data"
+    )
+    fields: Optional[str] = Field(None, description="Comma-separated routing decision fields to return")
+
+    @field_validator("team", "urgency", "customer_value", "cursor", "fields", mode="before")
+    @classmethod
+    def empty_as_unset(cls, value):
+        """An empty parameter, e.g. team=, means no filter, as it did before the dashboard was paginated"""
+        return None if value == "" else value
+
+
+class ClaimExportQuery(ClaimQuery):
+    """Model for exporting every stored claim matching the dashboard filters"""
+    format: Literal["csv", "parquet"] = Field("csv", description="parquet needs pyarrow on the server")
+
+
+class ClaimAnalyticsQuery(BaseModel):
+    """Model for grouping and filtering stored claims in analytical queries"""
+    group_by: Literal["team", "urgency", "customer_value", "region", "brand", "warranty"] = "team"
+    team: Optional[str] = None
+    region: Optional[str] = None
+    brand: Optional[str] = None
+    warranty: Optional[str] = None
+    is_potential_fraud: Optional[bool] = None
+    min_amount: Optional[float] = Field(None, ge=0, description="Smallest claim amount paid, inclusive")
+    max_amount: Optional[float] = Field(None, ge=0, description="Largest claim amount paid, inclusive")
+    date_from: Optional[date] = Field(None, description="Earliest claim date, inclusive")
+    date_to: Optional[date] = Field(None, description="Latest claim date, inclusive")
+
+
+class ClaimGroupStats(BaseModel):
+    """Model for the aggregated statistics of one group of stored claims"""
+    group: Optional[str] = Field(None, description="Grouping value; null for claims without one")
+    claims: int
+    fraud_rate: float
+    mean_risk_score: float
+    total_claim_amount: float
+    claim_amount_p50: Optional[float] = None
+    claim_amount_p90: Optional[float] = None
+    claim_amount_p99: Optional[float] = None
+
+
+class ClaimTotals(BaseModel):
+    """Model for the running totals of one group of stored claims"""
+    claims: int
+    fraud_claims: int
+    claims_with_amount: int
+    total_claim_amount: float
+    min_claim_amount: Optional[float] = None
+    max_claim_amount: Optional[float] = None
+
+
+class ClaimStats(BaseModel):
+    """Model for the running totals of all stored claims, overall and per group value"""
+    total: ClaimTotals
+    by_team: Dict[str, ClaimTotals]
+    by_urgency: Dict[str, ClaimTotals]
+    by_customer_value: Dict[str, ClaimTotals]
+    by_region: Dict[str, ClaimTotals]
+    by_fraud: Dict[str, ClaimTotals] = Field(description="Keyed by the fraud flag, \"true\" or \"false\"")
+
+
 class ClaimStore(BaseModel):
     """Model for storing claims in memory"""
     claims: List[RoutingDecision] = []
@@ -0,0 +1,89 @@
+from typing import Dict, Any
+
+from app import config
+from app.modules.worker_pool import RoutingWorkerPool, routing_pool
+
+NORMAL = "normal"
+DEGRADED = "degraded"
+SHEDDING = "shedding"
+
+
+class Overloaded(Exception):
+    """Raised when a claim is rejected because the system is overloaded"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Server is overloaded, retry later")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Decide how to handle new claims based on the routing worker pool's load
+
+    Load is the share of the pool's capacity taken by running, queued and waiting
+    jobs. Below degrade_load claims are processed normally. From degrade_load they
+    are processed in degraded mode (regex-only extraction, rules-only routing),
+    which is much cheaper and lets the backlog drain. Only from shed_load are new
+    claims rejected.
+    """
+
+    def __init__(self, pool: RoutingWorkerPool, degrade_load: float, shed_load: float, retry_after: int):
+        self.pool = pool
+        self.degrade_load = degrade_load
+        self.shed_load = shed_load
+        self.retry_after = retry_after
+        self.admitted_count = 0
+        self.degraded_count = 0
+        self.shed_count = 0
+
+    @property
+    def load(self) -> float:
+        return (self.pool.pending + self.pool.waiting) / self.pool.capacity
+
+    @property
+    def mode(self) -> str:
+        load = self.load
+        if load >= self.shed_load:
+            return SHEDDING
+        if load >= self.degrade_load:
+            return DEGRADED
+        return NORMAL
+
+    def admit(self, can_shed: bool = True) -> bool:
+        """
+        Admit one request and return whether it should be processed in degraded mode
+        Raises Overloaded when load is past the shedding threshold, unless can_shed
+        is False (callers that apply backpressure by waiting instead)
+        """
+        mode = self.mode
+        if mode == SHEDDING and can_shed:
+            raise self.reject()
+
+        self.admitted_count += 1
+        if mode != NORMAL:
+            self.degraded_count += 1
+            return True
+        return False
+
+    def reject(self) -> Overloaded:
+        """Count a rejected request and return the exception to raise for it"""
+        self.shed_count += 1
+        return Overloaded(self.retry_after)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Current mode, load and request counters"""
+        return {
+            "mode": self.mode,
+            "load": round(self.load, 3),
+            "in_flight": self.pool.pending,
+            "queue_depth": max(0, self.pool.pending - max(self.pool.max_workers, 1)) + self.pool.waiting,
+            "capacity": self.pool.capacity,
+            "admitted": self.admitted_count,
+            "degraded": self.degraded_count,
+            "shed": self.shed_count
+        }
+
+
+admission_controller = AdmissionController(
+    routing_pool, config.ADMISSION_DEGRADE_LOAD, config.ADMISSION_SHED_LOAD, config.ADMISSION_RETRY_AFTER_SECONDS
+)
@@ -0,0 +1,510 @@
+import gc
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Sequence, Tuple
+import uuid
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import from_json, to_json
+from app.models.claim import RoutingDecision, ClaimQuery, ClaimSummary
+from app.modules.claim_columns import ClaimColumns
+from app.modules.claim_index import ClaimIndex
+from app.modules.claim_log import ClaimLog
+from app.modules.claim_records import ClaimRecord, reason_codes
+from app.modules.claim_segments import ClaimTiers, StoredEncodings
+from app.modules.claim_stats import ClaimStats
+from app.modules.dedupe import LRUCache
+from app import config
+
+
+SUMMARY_FIELD_ORDER = list(ClaimSummary.model_fields)
+SUMMARY_FIELDS = set(SUMMARY_FIELD_ORDER)
+CLAIM_FIELDS = list(RoutingDecision.model_fields)
+claim_list_adapter = TypeAdapter(List[RoutingDecision])
+# Claims per chunk of a dashboard export
+EXPORT_CHUNK_SIZE = 1000
+# Format of the store state saved with snapshots; a state of another version is replayed instead
+STATE_VERSION = 1
+
+
+def encode(record: Dict) -> bytes:
+    return to_json(record)
+
+
+def summarize(claim: RoutingDecision) -> Dict:
+    """Compact summary record of a claim, in ClaimSummary field order"""
+    return {field: getattr(claim, field) for field in SUMMARY_FIELD_ORDER}
+
+
+def parse_fields(fields: str) -> List[str]:
+    """Turn a comma-separated field list into routing decision fields, in model order"""
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(CLAIM_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if not requested:
+        raise ValueError("fields must name at least one field")
+    return [field for field in CLAIM_FIELDS if field in requested]
+
+
+def json_array(items: List[bytes]) -> bytes:
+    return b"[" + b",".join(items) + b"]"
+
+
+class ClaimVersions:
+    """
+    Monotonic change counters for the claim store, globally and per team
+
+    The epoch changes on every restart, so versions from a previous process
+    never match the current store.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.global_version = 0
+        self.team_versions: Dict[str, int] = defaultdict(int)
+
+    def bump(self, team: str) -> None:
+        self.global_version += 1
+        self.team_versions[team] += 1
+
+    def bump_many(self, team_claims: Dict[str, int]) -> None:
+        """Bump the versions as bump does for the given number of claims of each team"""
+        for team, claims in team_claims.items():
+            self.global_version += claims
+            self.team_versions[team] += claims
+
+
+class ClaimBackend(ABC):
+    """
+    Storage for routing decisions behind ClaimDatabase
+
+    Claims are only ever added, never changed or removed, and each claim ID
+    is stored once: adding a claim whose ID is already stored keeps the
+    stored claim.
+    """
+
+    @abstractmethod
+    async def add_many(self, claims: List[RoutingDecision]) -> List[Tuple[RoutingDecision, bool]]:
+        """
+        Store claims that all have an ID, in order
+        Returns the stored claim for each one and whether it was newly added
+        """
+
+    @abstractmethod
+    async def get(self, claim_id: str) -> Optional[RoutingDecision]:
+        """Get a claim by its ID"""
+
+    @abstractmethod
+    async def get_json(self, claim_id: str) -> Optional[bytes]:
+        """Get the JSON encoding of a claim by its ID"""
+
+    @abstractmethod
+    async def get_all(self, team: Optional[str] = None) -> List[RoutingDecision]:
+        """Get every stored claim, or every claim assigned to a team, oldest first"""
+
+    @abstractmethod
+    async def query(self, query: ClaimQuery) -> Tuple[List[RoutingDecision], Optional[str]]:
+        """Get one page of claims matching the query and the cursor for the next page"""
+
+    @abstractmethod
+    async def query_json(self, query: ClaimQuery) -> Tuple[bytes, Optional[str]]:
+        """Same as query, but returns the page as a JSON array, projected as the query asks"""
+
+    @abstractmethod
+    async def count(self, team: Optional[str] = None) -> int:
+        """Number of stored claims, or of claims assigned to a team"""
+
+    @abstractmethod
+    async def version(self, team: Optional[str] = None) -> str:
+        """Version string that changes whenever claims (of the team) are added"""
+
+    @abstractmethod
+    async def epoch(self) -> str:
+        """Identifier of this store; a claim never changes within an epoch"""
+
+    async def find_existing(self, claim_id: str) -> Optional[RoutingDecision]:
+        """Get the stored claim with this ID, if any, for answering resubmitted claims"""
+        return await self.get(claim_id)
+
+    @abstractmethod
+    def export_json(self, query: ClaimQuery) -> AsyncIterator[List[bytes]]:
+        """
+        Iterate over the JSON encodings of every claim matching the query, in
+        chunks, in the query's sort order and projected as it asks
+        The query's limit and cursor are ignored
+        """
+
+    async def open(self) -> None:
+        """Connect to the store before claims are added or read"""
+
+    async def wait_durable(self, always: bool = False) -> None:
+        """Wait until every claim added so far is on disk"""
+
+    async def close(self) -> None:
+        """Release the store's resources"""
+
+
+class MemoryClaimBackend(ClaimBackend):
+    """
+    Claims kept in process memory, with indexes and an optional write-ahead log
+
+    Each claim is kept as a compact ClaimRecord, turned back into a routing
+    decision only when one is asked for, and encoded to JSON once, when it is
+    added; JSON responses are served from that encoding, and summaries and
+    other projections onto summary fields from the record. With open_log, every
+    added claim is logged and the claims logged before are restored, those of
+    the latest snapshot from the records and columns saved with it. With
+    hot_claims set, only the encodings of the newest hot_claims claims are
+    kept in memory; older ones move to compressed segments in
+    segment_directory, while records, index entries and columns stay in memory.
+
+    The store can be shared by threads. Writers take turns under one write
+    lock, so each claim ID is still stored once, while readers take no
+    store-wide lock: a claim becomes visible to them when claim_count passes
+    its position, once every list holds it. Indexes, columns and caches that
+    a reader could see mid-update guard themselves with their own short
+    locks, held for one insert or one slice rather than a whole batch.
+    Running totals and analytics columns may count a claim a moment before
+    it can be read.
+    """
+
+    def __init__(
+        self, hot_claims: int = 0, segment_directory: Optional[str] = None, segment_claims: int = 10000
+    ):
+        # Compact record and JSON encoding of each stored claim, by position; claims never change after they are added
+        self.claim_records: List[ClaimRecord] = []
+        self.claim_tiers = ClaimTiers(hot_claims, segment_directory, segment_claims)
+        self.claim_index = ClaimIndex()
+        # Number of claims readers see; positions past it may be in some lists and indexes already
+        self.claim_count = 0
+        # Held by the one thread adding claims at a time; reentrant for subclasses that hold it around add_many
+        self._write_lock = threading.RLock()
+        # NumPy mirror of the stored claims for analytics, by position
+        self.claim_columns = ClaimColumns()
+        # Running counts and claim amount totals, overall and per group
+        self.claim_stats = ClaimStats()
+        self.claim_versions = ClaimVersions()
+        # The most recently stored claims
+        self.recent_claims: LRUCache[str, RoutingDecision] = LRUCache(config.DEDUPE_CACHE_SIZE)
+        # Write-ahead log of stored claims, once opened with open_log
+        self.claim_log: Optional[ClaimLog] = None
+
+    async def add_many(self, claims: List[RoutingDecision]) -> List[Tuple[RoutingDecision, bool]]:
+        """
+        Blocks while another thread adds claims; reads on other threads go on meanwhile
+        The records and encodings of all new claims are built before any is stored,
+        so a claim that cannot be stored fails the whole batch and leaves no trace
+        """
+        return self._add_many(claims)
+
+    def _add_many(self, claims: List[RoutingDecision]) -> List[Tuple[RoutingDecision, bool]]:
+        """add_many itself, which never waits on the event loop, for subclasses to run on another thread"""
+        results = []
+        with self._write_lock:
+            prepared = [
+                None if self._find_existing(claim.claim_id) is not None
+                else (ClaimRecord(claim), claim.model_dump_json().encode())
+                for claim in claims
+            ]
+            for claim, parts in zip(claims, prepared):
+                # Looked up under the write lock, so two threads cannot both add the same ID,
+                # and again here for a claim ID repeated within the batch
+                existing = self._find_existing(claim.claim_id)
+                if existing is not None:
+                    results.append((existing, False))
+                    continue
+
+                record, encoded = parts
+                self.claim_index.add(len(self.claim_tiers), claim)
+                self.claim_columns.add(claim)
+                self._append(claim, record, encoded)
+                self.recent_claims.put(claim.claim_id, claim)
+                if self.claim_log is not None:
+                    self.claim_log.append(encoded)
+                results.append((claim, True))
+        return results
+
+    def _append(self, claim: RoutingDecision, record: ClaimRecord, encoded: bytes) -> None:
+        """
+        Append an indexed claim, its record and JSON encoding to the store and make it visible
+        Only with the write lock held; nothing here fails, so the lists stay in step
+        """
+        self.claim_records.append(record)
+        self.claim_tiers.append(encoded)
+        self.claim_stats.add(claim)
+        # Visible before the version changes, so a reader that sees the new version sees the claim
+        self.claim_count += 1
+        self.claim_versions.bump(claim.assigned_team)
+
+    async def catch_up(self) -> None:
+        """Add the claims other processes stored since the last read; only the shared store has any"""
+
+    def get_columns(self) -> ClaimColumns:
+        """Columnar mirror of the stored claims, by position"""
+        return self.claim_columns
+
+    def get_stats(self) -> ClaimStats:
+        """Running totals of the stored claims"""
+        return self.claim_stats
+
+    def open_log(self, directory: str) -> int:
+        """
+        Restore the claims recorded in the log directory, then log every claim added from now on
+        Must be called before any claim is added; returns the number of restored claims
+        """
+        if len(self.claim_tiers):
+            raise RuntimeError("The claim log must be opened before any claim is added")
+
+        log = ClaimLog(directory, config.CLAIM_LOG_FLUSH_MS / 1000, config.CLAIM_LOG_SNAPSHOT_EVERY)
+        # Restoring creates millions of long-lived objects and no garbage; with the cycle collector
+        # on, they would be scanned again and again as they are created, taking most of the time
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            state_path = log.latest_state()
+            # Claims of the snapshot restored from its state, of which pending still need their encoding added
+            restored = pending = self._load_state(state_path) if state_path else 0
+            for records in log.recover():
+                if pending:
+                    self.claim_tiers.extend(records[:pending])
+                    records, pending = records[pending:], max(pending - len(records), 0)
+                    if not pending:
+                        self.claim_count = restored
+                if records:
+                    self._add_records(records)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        log.start(StoredEncodings(self.claim_tiers), self._write_state)
+        self.claim_log = log
+        return len(self.claim_tiers)
+
+    def _write_state(self, claims: int, file: BinaryIO) -> None:
+        """
+        Write the records and columns of the first claims stored, for _load_state
+        Called by the claim log's snapshot thread while claims are being added. What is saved is
+        copied under the write lock; the records are immutable and column rows are never written
+        over, so the copy is then serialized without holding up writers. The file is a NumPy .npz
+        of the column arrays, with the rest, records included, as JSON in byte arrays
+        """
+        with self._write_lock:
+            records = self.claim_records[:claims]
+            templates = list(reason_codes.templates)
+            columns = self.claim_columns.state(claims)
+        header = {
+            "version": STATE_VERSION,
+            "claims": claims,
+            "reason_templates": templates,
+            "categories": columns["categories"],
+        }
+        arrays = {
+            "header": np.frombuffer(to_json(header), np.uint8),
+            "records": np.frombuffer(to_json([record.values() for record in records]), np.uint8),
+            "is_potential_fraud": columns["is_potential_fraud"],
+            "claim_day": columns["claim_day"],
+        }
+        for kind in ("codes", "numbers"):
+            for name, array in columns[kind].items():
+                arrays[f"{kind}.{name}"] = array
+        np.savez(file, **arrays)
+
+    def _load_state(self, path: str) -> int:
+        """
+        Restore the claims of a state written by _write_state into the empty store
+        Their encodings are left for the caller to add before it makes the claims visible. Indexes
+        and running totals are rebuilt from the columns with array operations, so no claim is
+        validated or looked at one by one. Returns the number of claims restored, or 0 (changing
+        nothing) if the state cannot be read, is of another version or its reason codes clash with
+        those in use. Only arrays and JSON are read, so the state cannot run code
+        """
+        try:
+            with np.load(path, allow_pickle=False) as arrays:
+                header = from_json(arrays["header"].tobytes())
+                if header.get("version") != STATE_VERSION:
+                    print(f"Ignoring claim store state {path}: version {header.get('version')}, not {STATE_VERSION}")
+                    return 0
+                claims = header["claims"]
+                columns = {
+                    "categories": {name: header["categories"][name] for name in self.claim_columns.categories},
+                    "codes": {name: arrays[f"codes.{name}"] for name in self.claim_columns.categories},
+                    "numbers": {name: arrays[f"numbers.{name}"] for name in self.claim_columns.numbers},
+                    "is_potential_fraud": arrays["is_potential_fraud"],
+                    "claim_day": arrays["claim_day"],
+                }
+                records = [ClaimRecord.from_values(values) for values in from_json(arrays["records"].tobytes())]
+            lengths = {len(records), *(len(array) for array in columns["codes"].values()),
+                       *(len(array) for array in columns["numbers"].values()),
+                       len(columns["is_potential_fraud"]), len(columns["claim_day"])}
+            if lengths != {claims}:
+                raise ValueError(f"expected {claims} claims in every part, found {sorted(lengths)}")
+        except Exception as e:
+            print(f"Ignoring unreadable claim store state {path}: {e}")
+            return 0
+        if not reason_codes.load(header["reason_templates"]):
+            print(f"Ignoring claim store state {path}: its reason codes differ from those in use")
+            return 0
+
+        with self._write_lock:
+            self.claim_records.extend(records)
+            self.claim_columns.load_state(columns)
+            self.claim_index.add_columns([record.claim_id for record in records], self.claim_columns)
+            self.claim_stats.add_columns(self.claim_columns, 0, claims)
+            self.claim_versions.bump_many({team: len(positions) for team, positions in self.claim_index.by_team.items()})
+        return claims
+
+    def _add_records(self, records: List[bytes]) -> None:
+        """
+        Add the claims of stored JSON encodings, as one validation, skipping invalid records
+        Running totals are added from the columns, as for a restored state, rather than claim by claim
+        """
+        try:
+            claims = claim_list_adapter.validate_json(json_array(records))
+        except ValidationError:
+            claims, records = self._parse_records(records)
+        claim_records = [ClaimRecord(claim) for claim in claims]
+        with self._write_lock:
+            first = len(self.claim_tiers)
+            self.claim_index.add_many(first, claims)
+            self.claim_columns.add_many(claims)
+            self.claim_records.extend(claim_records)
+            self.claim_tiers.extend(records)
+            self.claim_stats.add_columns(self.claim_columns, first, first + len(claims))
+            self.claim_count += len(claims)
+            self.claim_versions.bump_many(Counter(claim.assigned_team for claim in claims))
+
+    @staticmethod
+    def _parse_records(records: List[bytes]) -> Tuple[List[RoutingDecision], List[bytes]]:
+        """Parse stored records one by one, skipping the ones that are not valid claims"""
+        claims, valid_records = [], []
+        for record in records:
+            try:
+                claims.append(RoutingDecision.model_validate_json(record))
+                valid_records.append(record)
+            except ValidationError as e:
+                print(f"Skipping invalid claim record: {e.errors()[0]['msg']}")
+        return claims, valid_records
+
+    async def close(self) -> None:
+        """Write out the claims still waiting for the next group commit, stop logging and remove the segments"""
+        if self.claim_log is not None:
+            self.claim_log.close()
+            self.claim_log = None
+        self.claim_tiers.close()
+
+    async def wait_durable(self, always: bool = False) -> None:
+        """
+        Wait until every claim added so far is on disk, if the claim log is open
+        Only waits with CLAIM_LOG_SYNC_COMMIT, unless always is set
+        """
+        if self.claim_log is not None and (always or config.CLAIM_LOG_SYNC_COMMIT):
+            await self.claim_log.wait_durable()
+
+    async def find_existing(self, claim_id: str) -> Optional[RoutingDecision]:
+        return self._find_existing(claim_id)
+
+    def _find_existing(self, claim_id: str) -> Optional[RoutingDecision]:
+        """
+        Recently stored claims come from the cache, others through the claim ID index,
+        which also settles that a claim is new with one dict lookup
+        """
+        claim = self.recent_claims.get(claim_id)
+        if claim is not None:
+            return claim
+
+        claim = self._get(claim_id)
+        if claim is not None:
+            self.recent_claims.put(claim_id, claim)
+        return claim
+
+    async def version(self, team: Optional[str] = None) -> str:
+        if team is None:
+            return f"{self.claim_versions.epoch}-{self.claim_versions.global_version}"
+        return f"{self.claim_versions.epoch}-{self.claim_versions.team_versions.get(team, 0)}"
+
+    async def epoch(self) -> str:
+        return self.claim_versions.epoch
+
+    async def get(self, claim_id: str) -> Optional[RoutingDecision]:
+        return self._get(claim_id)
+
+    def _get(self, claim_id: str) -> Optional[RoutingDecision]:
+        position = self._position(claim_id)
+        return self._decisions([position])[0] if position is not None else None
+
+    async def get_json(self, claim_id: str) -> Optional[bytes]:
+        position = self._position(claim_id)
+        return self.claim_tiers.encoding(position) if position is not None else None
+
+    def _position(self, claim_id: str) -> Optional[int]:
+        """Position of a visible claim by its ID"""
+        position = self.claim_index.by_id.get(claim_id)
+        return position if position is not None and position < self.claim_count else None
+
+    async def get_all(self, team: Optional[str] = None) -> List[RoutingDecision]:
+        """Builds a routing decision for every claim asked for"""
+        if team is None:
+            return self._decisions(range(self.claim_count))
+        return self._decisions(self._team_positions(team))
+
+    def _team_positions(self, team: str) -> List[int]:
+        """Positions of a team's visible claims"""
+        posting = self.claim_index.by_team.get(team, [])
+        return posting[:bisect_left(posting, self.claim_count)]
+
+    async def count(self, team: Optional[str] = None) -> int:
+        if team is None:
+            return self.claim_count
+        return bisect_left(self.claim_index.by_team.get(team, []), self.claim_count)
+
+    async def query(self, query: ClaimQuery) -> Tuple[List[RoutingDecision], Optional[str]]:
+        positions, next_cursor = self.claim_index.search(self.claim_records, query, self.claim_count)
+        return self._decisions(positions), next_cursor
+
+    async def query_json(self, query: ClaimQuery) -> Tuple[bytes, Optional[str]]:
+        """Builds the page from the stored encodings, without serializing any claim again"""
+        fields = parse_fields(query.fields) if query.fields else None
+        positions, next_cursor = self.claim_index.search(self.claim_records, query, self.claim_count)
+        return json_array(self._encodings(positions, query, fields)), next_cursor
+
+    async def export_json(self, query: ClaimQuery) -> AsyncIterator[List[bytes]]:
+        fields = parse_fields(query.fields) if query.fields else None
+        query = query.model_copy(update={"limit": EXPORT_CHUNK_SIZE, "cursor": None})
+        while True:
+            positions, next_cursor = self.claim_index.search(self.claim_records, query, self.claim_count)
+            yield self._encodings(positions, query, fields)
+            if next_cursor is None:
+                return
+            query = query.model_copy(update={"cursor": next_cursor})
+
+    def _encodings(self, positions: List[int], query: ClaimQuery, fields: Optional[List[str]]) -> List[bytes]:
+        """
+        JSON encodings of the claims at these positions, projected as the query asks
+        Summaries and other projections within the summary fields are built from the claim records
+        """
+        if fields is None:
+            if query.view != "summary":
+                return self.claim_tiers.encodings_at(positions)
+            fields = SUMMARY_FIELD_ORDER
+        if SUMMARY_FIELDS.issuperset(fields):
+            return [
+                encode({field: getattr(self.claim_records[position], field) for field in fields})
+                for position in positions
+            ]
+        include = set(fields)
+        return [claim.model_dump_json(include=include).encode() for claim in self._decisions(positions)]
+
+    def _decisions(self, positions: Sequence[int]) -> List[RoutingDecision]:
+        """
+        Routing decisions of the claims at these positions
+        Parsed from their JSON encoding while it is in memory, which is faster than building them from their record
+        """
+        hot_start = self.claim_tiers.hot_start
+        return [
+            RoutingDecision.model_validate_json(self.claim_tiers.encoding(position)) if position >= hot_start
+            else self.claim_records[position].decision()
+            for position in positions
+        ]
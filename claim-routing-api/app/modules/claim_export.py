@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import csv
+import io
+import sys
+import time
+from typing import AsyncIterator, Dict, List, Tuple
+
+from pydantic_core import from_json, to_json
+
+from app import config
+from app.models.claim import ClaimData, ClaimQuery
+from app.modules.claim_backend import json_array
+from app.modules.database import ClaimDatabase
+
+# Claims per Parquet row group, and per CSV chunk
+EXPORT_CHUNK_ROWS = 16384
+# Claim data fields exported under another name: the claim ID found in the claim, next to the stored one
+RENAMED_DATA_FIELDS = {"claim_id": "extracted_claim_id"}
+# The fraud indicator repeats the decision's fraud flag and indicators; only its score is exported, as fraud_score
+NESTED_DATA_FIELDS = {"fraud_indicator"}
+
+
+# Exported columns: name, Arrow type name and path of the value in a routing decision
+EXPORT_COLUMNS: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("claim_id", "string", ("claim_id",)),
+    ("assigned_team", "string", ("assigned_team",)),
+    ("urgency", "string", ("urgency",)),
+    ("risk_score", "float64", ("risk_score",)),
+    ("customer_value", "string", ("customer_value",)),
+    ("is_potential_fraud", "bool", ("is_potential_fraud",)),
+    ("reasoning", "list<string>", ("reasoning",)),
+    ("fraud_indicators", "list<string>", ("fraud_indicators",)),
+    *(
+        (
+            RENAMED_DATA_FIELDS.get(name, name),
+            {int: "int64", float: "float64"}.get(field.annotation.__args__[0], "string"),
+            ("claim_data", name),
+        )
+        for name, field in ClaimData.model_fields.items()
+        if name not in NESTED_DATA_FIELDS
+    ),
+    ("fraud_score", "float64", ("claim_data", "fraud_indicator", "fraud_score")),
+]
+EXPORT_COLUMN_NAMES = [name for name, _, _ in EXPORT_COLUMNS]
+# Every path the columns read, and each path above them, shortest first
+EXPORT_PATHS = sorted({path[:end] for _, _, path in EXPORT_COLUMNS for end in range(1, len(path) + 1)}, key=len)
+
+
+def flatten(encodings: List[bytes]) -> Dict[str, list]:
+    """Columns of the claims with these JSON encodings, with their claim data flattened into columns"""
+    # Values at each path, by path; a missing object gives None for every value below it.
+    # Parents come before their children, so each path is one step below one already found
+    values: Dict[Tuple[str, ...], list] = {(): from_json(json_array(encodings))}
+    for path in EXPORT_PATHS:
+        key = path[-1]
+        values[path] = [value.get(key) if value is not None else None for value in values[path[:-1]]]
+    return {name: values[path] for name, _, path in EXPORT_COLUMNS}
+
+
+class CSVExport:
+    """
+    Claims as CSV, one header line and then one line per claim
+    List columns hold JSON arrays and missing values are empty
+    """
+
+    media_type = "text/csv"
+    extension = "csv"
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._writer.writerow(EXPORT_COLUMN_NAMES)
+
+    def write(self, columns: Dict[str, list]) -> bytes:
+        """Encode one chunk of claims"""
+        for name, arrow_type, _ in EXPORT_COLUMNS:
+            if arrow_type == "list<string>":
+                columns[name] = [to_json(values).decode() for values in columns[name]]
+        self._writer.writerows(zip(*columns.values()))
+        return self._take()
+
+    def close(self) -> bytes:
+        return self._take()
+
+    def _take(self) -> bytes:
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+class _WrittenBytes(io.RawIOBase):
+    """Write-only file that hands out the bytes written to it since the last take()"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+class ParquetExport:
+    """
+    Claims as a Parquet file, one row group per chunk of claims
+    Needs pyarrow, which is only imported here; RuntimeError without it
+    """
+
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (poetry install --extras parquet, or pip install pyarrow)")
+        self._pyarrow = pyarrow
+        types = {
+            "string": pyarrow.string(), "float64": pyarrow.float64(), "int64": pyarrow.int64(),
+            "bool": pyarrow.bool_(), "list<string>": pyarrow.list_(pyarrow.string()),
+        }
+        self._schema = pyarrow.schema([(name, types[arrow_type]) for name, arrow_type, _ in EXPORT_COLUMNS])
+        self._sink = _WrittenBytes()
+        self._writer = pyarrow.parquet.ParquetWriter(self._sink, self._schema, compression="zstd")
+
+    def write(self, columns: Dict[str, list]) -> bytes:
+        """Encode one chunk of claims as a row group"""
+        table = self._pyarrow.Table.from_pydict(columns, schema=self._schema)
+        self._writer.write_table(table, row_group_size=len(table))
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        """The rest of the file, with its footer"""
+        self._writer.close()
+        return self._sink.take()
+
+
+EXPORT_FORMATS = {"csv": CSVExport, "parquet": ParquetExport}
+
+
+def export_claims(query: ClaimQuery, export, chunk_rows: int = EXPORT_CHUNK_ROWS) -> AsyncIterator[bytes]:
+    """
+    Stream every stored claim matching the query's filters, in its sort order, encoded by export
+    Claims are read from the store in chunks and encoded chunk_rows at a time,
+    so memory use does not grow with the number of claims
+    """
+    query = query.model_copy(update={"view": "full", "fields": None})
+    return encode_chunks(ClaimDatabase.export_claims_json(query), export, chunk_rows)
+
+
+async def encode_chunks(
+    chunks: AsyncIterator[List[bytes]], export, chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> AsyncIterator[bytes]:
+    """Encode chunks of full JSON claim encodings with export, chunk_rows claims at a time"""
+    pending: List[bytes] = []
+    async for encodings in chunks:
+        pending.extend(encodings)
+        while len(pending) >= chunk_rows:
+            yield export.write(flatten(pending[:chunk_rows]))
+            del pending[:chunk_rows]
+    if pending:
+        yield export.write(flatten(pending))
+    yield export.close()
+
+
+async def main():
+    """Export the claims of the configured claim store to a CSV or Parquet file"""
+    parser = argparse.ArgumentParser(
+        description="Export stored claims to CSV or Parquet. With the in-memory store, the claims are "
+                    "restored from the claim log, so run it while the API is stopped."
+    )
+    parser.add_argument("output", help="file to write, - for standard output")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--team")
+    parser.add_argument("--date-from")
+    parser.add_argument("--date-to")
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    query = ClaimQuery(team=args.team, date_from=args.date_from, date_to=args.date_to)
+    export = EXPORT_FORMATS[args.format]()
+    await ClaimDatabase.open()
+    if config.CLAIM_STORE == "memory" and config.CLAIM_LOG_DIR:
+        ClaimDatabase.open_log(config.CLAIM_LOG_DIR)
+
+    start, size = time.perf_counter(), 0
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        async for data in export_claims(query, export, args.chunk_rows):
+            output.write(data)
+            size += len(data)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        await ClaimDatabase.close()
+    print(f"Exported {size:,} bytes in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
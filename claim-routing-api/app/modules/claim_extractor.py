@@ -1,14 +1,21 @@
+import os
 import re
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, Optional, List, Union
 import json
-import spacy
+from app import config
 from app.models.claim import ClaimData
 
+# Claim data fields holding text; structured values of other types are stored as their text
+TEXT_DATA_FIELDS = {name for name, field in ClaimData.model_fields.items() if field.annotation == Optional[str]}
+
 
 class ClaimExtractor:
     """Extract claim data from text or structured input"""
     
-    nlp = spacy.load("en_core_web_sm")
+    # The spaCy pipeline, loaded by get_nlp on the first text claim
+    _nlp = None
+    _nlp_lock = threading.Lock()
     
     regions = ["Milan", "Rome", "Naples", "Turin", "Palermo", "Genoa", "Bologna", 
               "Florence", "Bari", "Catania", "Napoli", "Caserta"]
@@ -35,13 +42,64 @@ class ClaimExtractor:
     }
 
     @staticmethod
-    def extract_from_text(text: str) -> ClaimData:
-        """Extract claim data from natural language text using NLP"""
-        claim_data = ClaimData(raw_text=text)
+    def get_nlp():
+        """
+        The spaCy pipeline, loaded on first use
+        Components listed in config.SPACY_EXCLUDE are not loaded, and those in
+        config.SPACY_DISABLE are loaded but not run
+        """
+        if ClaimExtractor._nlp is None:
+            with ClaimExtractor._nlp_lock:
+                if ClaimExtractor._nlp is None:
+                    import spacy
+                    ClaimExtractor._nlp = spacy.load(
+                        config.SPACY_MODEL, exclude=config.SPACY_EXCLUDE, disable=config.SPACY_DISABLE
+                    )
+        return ClaimExtractor._nlp
+
+    @staticmethod
+    def extract_from_text(text: str, use_nlp: bool = True) -> ClaimData:
+        """
+        Extract claim data from natural language text using NLP
+        With use_nlp=False only the regular expression fallbacks are used, which is
+        much cheaper but misses details that only named entities pick up
+        """
+        doc = ClaimExtractor.get_nlp()(text) if use_nlp else None
+        return ClaimExtractor._extract_from_doc(text, doc)
+
+    @staticmethod
+    def extract_many(
+        texts: List[str], use_nlp: bool = True, batch_size: Optional[int] = None, n_process: Optional[int] = None
+    ) -> List[ClaimData]:
+        """
+        Extract claim data from many texts, in order
+        The texts go through the NLP pipeline together with nlp.pipe, batch_size
+        at a time, spread over n_process processes (config.SPACY_BATCH_SIZE and
+        config.SPACY_PROCESSES by default). No more processes are started than
+        there are batches. use_nlp=False works as in extract_from_text
+        """
+        if not use_nlp or not texts:
+            return [ClaimExtractor._extract_from_doc(text, None) for text in texts]
         
-        doc = ClaimExtractor.nlp(text)
+        batch_size = batch_size or config.SPACY_BATCH_SIZE
+        n_process = n_process or config.SPACY_PROCESSES
+        if n_process < 0:
+            n_process = os.cpu_count() or 1
+        n_process = min(n_process, -(-len(texts) // batch_size))
         
-        for ent in doc.ents:
+        docs = ClaimExtractor.get_nlp().pipe(texts, batch_size=batch_size, n_process=n_process)
+        return [ClaimExtractor._extract_from_doc(text, doc) for text, doc in zip(texts, docs)]
+
+    @staticmethod
+    def _extract_from_doc(text: str, doc) -> ClaimData:
+        """
+        Extract claim data from text that has already been run through the NLP pipeline
+        A doc of None skips the named entity rules
+        """
+        claim_data = ClaimData(raw_text=text)
+        ents = doc.ents if doc is not None else ()
+        
+        for ent in ents:
             if ent.label_ == "CARDINAL" and "year" in doc[ent.end:min(ent.end+2, len(doc))].text.lower():
                 try:
                     claim_data.policyholder_age = int(ent.text)
@@ -54,7 +112,7 @@ class ClaimExtractor:
             if age_match:
                 claim_data.policyholder_age = int(age_match.group(1))
         
-        for ent in doc.ents:
+        for ent in ents:
             if ent.label_ in ["GPE", "LOC"] and ent.text in ClaimExtractor.regions:
                 claim_data.claim_region = ent.text
                 break
@@ -70,7 +128,7 @@ class ClaimExtractor:
                 claim_data.warranty = warranty
                 break
         
-        for ent in doc.ents:
+        for ent in ents:
             if ent.label_ in ["ORG", "PRODUCT"] and ent.text in ClaimExtractor.brands:
                 claim_data.vehicle_brand = ent.text
                 break
@@ -88,7 +146,7 @@ class ClaimExtractor:
                     claim_data.vehicle_model = model
                     break
         
-        for ent in doc.ents:
+        for ent in ents:
             if ent.label_ == "MONEY":
                 amount_str = re.search(r'(\d{1,3}(?:,\d{3})*(?:\.\d+)?|\d+(?:\.\d+)?)', ent.text)
                 if amount_str:
@@ -137,16 +195,44 @@ class ClaimExtractor:
         
         for json_field, model_field in field_mapping.items():
             if json_field in data:
-                setattr(claim_data, model_field, data[json_field])
+                value = data[json_field]
+                if model_field in TEXT_DATA_FIELDS and value is not None and not isinstance(value, str):
+                    value = str(value)
+                setattr(claim_data, model_field, value)
                 
         return claim_data
 
     @staticmethod
-    def extract(input_data: Dict[str, Any]) -> ClaimData:
+    def extract(input_data: Dict[str, Any], use_nlp: bool = True) -> ClaimData:
         """Extract claim data from either text or structured input"""
         if "text" in input_data and input_data["text"]:
-            return ClaimExtractor.extract_from_text(input_data["text"])
+            return ClaimExtractor.extract_from_text(input_data["text"], use_nlp)
         elif "structured_data" in input_data and input_data["structured_data"]:
             return ClaimExtractor.extract_from_json(input_data["structured_data"])
         else:
             raise ValueError("Input must contain either 'text' or 'structured_data'")
+
+    @staticmethod
+    def extract_batch(inputs: List[Dict[str, Any]], use_nlp: bool = True) -> List[Union[ClaimData, ValueError]]:
+        """
+        Extract claim data from many inputs at once
+        All text inputs go through the NLP pipeline together, see extract_many
+        Returns one entry per input, in order: the ClaimData, or the ValueError
+        that extract would have raised for that input
+        """
+        results: List[Union[ClaimData, ValueError]] = [None] * len(inputs)
+        text_positions = []
+        
+        for i, input_data in enumerate(inputs):
+            if "text" in input_data and input_data["text"]:
+                text_positions.append(i)
+            elif "structured_data" in input_data and input_data["structured_data"]:
+                results[i] = ClaimExtractor.extract_from_json(input_data["structured_data"])
+            else:
+                results[i] = ValueError("Input must contain either 'text' or 'structured_data'")
+        
+        texts = [inputs[i]["text"] for i in text_positions]
+        for i, claim_data in zip(text_positions, ClaimExtractor.extract_many(texts, use_nlp)):
+            results[i] = claim_data
+        
+        return results
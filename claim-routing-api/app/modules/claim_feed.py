@@ -0,0 +1,87 @@
+import asyncio
+from typing import Dict, Optional, Set
+
+from app import config
+from app.models.claim import RoutingDecision
+
+
+class FeedSubscription:
+    """A live dashboard subscriber with a bounded buffer of encoded claims"""
+
+    def __init__(self, team: Optional[str], buffer_size: int):
+        self.team = team
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.dropped = False
+
+
+class ClaimFeed:
+    """
+    Push newly stored claims to live dashboard subscribers
+
+    Each subscriber gets a bounded buffer. A subscriber whose buffer is full
+    is dropped rather than slowing down claim submission or holding memory;
+    it is expected to reconnect and reload the dashboard. Each claim is
+    encoded once, and only when someone is subscribed, so idle subscribers
+    cost nothing but their open connection.
+    """
+
+    def __init__(self, buffer_size: int):
+        self.buffer_size = buffer_size
+        self.dropped_count = 0
+        self._subscribers: Dict[Optional[str], Set[FeedSubscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def subscribe(self, team: Optional[str] = None) -> FeedSubscription:
+        """Subscribe to claims for one team, or to all claims if team is None"""
+        self._loop = asyncio.get_running_loop()
+        subscription = FeedSubscription(team, self.buffer_size)
+        self._subscribers.setdefault(team, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: FeedSubscription) -> None:
+        """Remove a subscriber"""
+        subscribers = self._subscribers.get(subscription.team)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.team]
+
+    def publish(self, claim: RoutingDecision) -> None:
+        """
+        Send a newly stored claim to its subscribers
+        Safe to call from worker threads; delivery happens on the event loop
+        """
+        if not self._subscribers or self._loop is None:
+            return
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            self._deliver(claim)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, claim)
+
+    def _deliver(self, claim: RoutingDecision) -> None:
+        """Queue the encoded claim for every subscriber of its team and for all-team subscribers"""
+        subscribers = self._subscribers.get(None, set()) | self._subscribers.get(claim.assigned_team, set())
+        if not subscribers:
+            return
+
+        payload = claim.model_dump_json()
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                subscription.dropped = True
+                self.dropped_count += 1
+                self.unsubscribe(subscription)
+
+
+claim_feed = ClaimFeed(config.FEED_BUFFER_SIZE)
@@ -0,0 +1,444 @@
+import base64
+import heapq
+import json
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Iterable, Iterator
+
+import numpy as np
+
+from app.models.claim import RoutingDecision, ClaimQuery
+
+URGENCY_ORDER = ["High", "Medium", "Low"]
+URGENCY_RANK = {level: rank for rank, level in enumerate(URGENCY_ORDER)}
+# Claim amount that claims without one sort as: after every claim amount, largest first
+NO_AMOUNT = -1e300
+# Positions read from a range index and sorted in about the time it takes to check one claim against a query
+SORTED_PER_CHECK = 16
+# Claim dates parsed once each, so that claims on the same day share one date object in the indexes
+PARSED_DATES_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=PARSED_DATES_CACHE_SIZE)
+def parse_claim_date(value: Optional[str]) -> Optional[date]:
+    """Parse a claim date string into a date, or None if it is missing or not ISO formatted"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).date()
+    except ValueError:
+        return None
+
+
+def amount_key(amount: Optional[float]) -> float:
+    """Key of a claim amount in the amount index and in cursors, so that the largest amounts come first"""
+    return -(amount if amount is not None else NO_AMOUNT)
+
+
+def encode_cursor(sort: str, key: tuple) -> str:
+    """Encode the sort key of the last claim on a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps([sort, *key]).encode()).decode()
+
+
+def decode_cursor(sort: str, cursor: str) -> tuple:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is invalid"""
+    try:
+        cursor_sort, *key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or not key:
+        raise ValueError("Cursor does not match the requested sort order")
+    return tuple(key)
+
+
+class SortedIndex:
+    """
+    Sorted (key, position) pairs in sublists of at most 2 * LOAD pairs
+
+    Finding a pair bisects the sublists' largest pairs and then one sublist,
+    and inserting one moves at most 2 * LOAD pairs instead of every pair after
+    it, so both stay O(log n) in practice however many claims are stored.
+    Ranges are read and counted between two such locations.
+
+    Readers on other threads take the lock for one sublist slice at a time,
+    so they wait for at most one insert and a writer waits for at most one
+    slice, never for a whole range.
+    """
+
+    LOAD = 1000
+
+    def __init__(self):
+        self._lists: List[List[tuple]] = []
+        self._maxes: List[tuple] = []
+        self._len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, item: tuple) -> None:
+        with self._lock:
+            self._len += 1
+            if not self._lists:
+                self._lists.append([item])
+                self._maxes.append(item)
+                return
+            i = min(bisect_left(self._maxes, item), len(self._lists) - 1)
+            sublist = self._lists[i]
+            insort(sublist, item)
+            self._maxes[i] = sublist[-1]
+            if len(sublist) > 2 * self.LOAD:
+                self._lists.insert(i + 1, sublist[self.LOAD:])
+                del sublist[self.LOAD:]
+                self._maxes.insert(i, sublist[-1])
+
+    def update(self, items: List[tuple]) -> None:
+        """
+        Add many pairs at once
+        Sorts everything once for a large batch; a batch that is small next to the
+        index is inserted pair by pair, since even sorting an almost sorted list
+        walks all of it
+        """
+        if len(items) * 16 < self._len:
+            for item in items:
+                self.add(item)
+            return
+        with self._lock:
+            merged = [item for sublist in self._lists for item in sublist]
+            merged.extend(items)
+            merged.sort()
+            self._lists = [merged[start:start + self.LOAD] for start in range(0, len(merged), self.LOAD)]
+            self._maxes = [sublist[-1] for sublist in self._lists]
+            self._len = len(merged)
+
+    def irange(self, low: Optional[tuple] = None, high: Optional[tuple] = None,
+               after: Optional[tuple] = None) -> Iterator[tuple]:
+        """Iterate the pairs from low to high, inclusive, that sort after the given pair"""
+        for pairs in self._slices(low, high, after):
+            yield from pairs
+
+    def positions(self, low: Optional[tuple] = None, high: Optional[tuple] = None) -> List[int]:
+        """Positions of the pairs from low to high, inclusive, in index order"""
+        return [position for pairs in self._slices(low, high, None) for _, position in pairs]
+
+    def count(self, low: Optional[tuple] = None, high: Optional[tuple] = None, after: Optional[tuple] = None) -> int:
+        """Number of pairs irange would yield"""
+        with self._lock:
+            (i, j), (end_i, end_j) = self._bounds(low, high, after)
+            if (i, j) >= (end_i, end_j):
+                return 0
+            if i == end_i:
+                return end_j - j
+            return len(self._lists[i]) - j + sum(map(len, self._lists[i + 1:end_i])) + end_j
+
+    def _slices(self, low: Optional[tuple], high: Optional[tuple], after: Optional[tuple]) -> Iterator[List[tuple]]:
+        """
+        The pairs irange yields, a slice of one sublist at a time
+        Each slice is located again after the last pair of the one before, so
+        pairs inserted in between neither shift nor repeat the pairs read
+        """
+        while True:
+            with self._lock:
+                (i, j), (end_i, end_j) = self._bounds(low, high, after)
+                if (i, j) >= (end_i, end_j):
+                    return
+                sublist = self._lists[i]
+                pairs = sublist[j:end_j if i == end_i else len(sublist)]
+            yield pairs
+            after = pairs[-1]
+
+    def _bounds(self, low: Optional[tuple], high: Optional[tuple], after: Optional[tuple]) -> Tuple[tuple, tuple]:
+        """(sublist, offset) locations of the first pair in range and just past the last one"""
+        start = self._locate(low, bisect_left) if low is not None else (0, 0)
+        if after is not None:
+            start = max(start, self._locate(after, bisect_right))
+        end = self._locate(high, bisect_right) if high is not None else (len(self._lists), 0)
+        return start, end
+
+    def _locate(self, item: tuple, bisect) -> Tuple[int, int]:
+        i = bisect(self._maxes, item)
+        if i == len(self._lists):
+            return i, 0
+        return i, bisect(self._lists[i], item)
+
+
+class ClaimIndex:
+    """
+    Primary and secondary indexes over the stored claims list
+
+    Indexes hold list positions. The primary index maps each claim ID to the
+    position of the first claim stored under it. Equality indexes are posting
+    lists that are appended in position order, so they stay sorted for free.
+    Range indexes keep (key, position) pairs sorted: risk scores and claim
+    amounts negated, so that the riskiest and largest claims come first, with
+    claims without an amount last, and claim dates for claims that have one.
+
+    One thread at a time adds claims, while searches run on any thread: a
+    search is given the number of claims stored so far and skips the
+    positions past it, which may already be in some indexes.
+    """
+
+    def __init__(self):
+        self.by_id: Dict[str, int] = {}
+        self.by_team: Dict[str, List[int]] = defaultdict(list)
+        self.by_urgency: Dict[str, List[int]] = defaultdict(list)
+        self.by_customer_value: Dict[str, List[int]] = defaultdict(list)
+        self.by_fraud: Dict[bool, List[int]] = defaultdict(list)
+        self.by_risk = SortedIndex()
+        self.by_amount = SortedIndex()
+        self.by_date = SortedIndex()
+        self.claim_amounts: List[Optional[float]] = []
+        self.claim_dates: List[Optional[date]] = []
+
+    def add(self, position: int, claim: RoutingDecision) -> None:
+        """
+        Index the claim stored at the given list position
+        Keys are worked out before any index changes, so a claim that cannot be indexed changes none
+        """
+        risk_key = (-claim.risk_score, position)
+        amount = (amount_key(claim.claim_data.claim_amount_paid), position)
+        claim_date = parse_claim_date(claim.claim_data.claim_date)
+        self.by_id.setdefault(claim.claim_id, position)
+        self.by_team[claim.assigned_team].append(position)
+        self.by_urgency[claim.urgency].append(position)
+        self.by_customer_value[claim.customer_value].append(position)
+        self.by_fraud[claim.is_potential_fraud].append(position)
+        self.by_risk.add(risk_key)
+        self.by_amount.add(amount)
+        if claim_date is not None:
+            self.by_date.add((claim_date, position))
+        self.claim_amounts.append(claim.claim_data.claim_amount_paid)
+        self.claim_dates.append(claim_date)
+
+    def add_many(self, first_position: int, claims: List[RoutingDecision]) -> None:
+        """Index claims stored at consecutive positions starting at first_position"""
+        risks, amounts, dates = [], [], []
+        for position, claim in enumerate(claims, first_position):
+            self.by_id.setdefault(claim.claim_id, position)
+            self.by_team[claim.assigned_team].append(position)
+            self.by_urgency[claim.urgency].append(position)
+            self.by_customer_value[claim.customer_value].append(position)
+            self.by_fraud[claim.is_potential_fraud].append(position)
+            risks.append((-claim.risk_score, position))
+            amounts.append((amount_key(claim.claim_data.claim_amount_paid), position))
+            claim_date = parse_claim_date(claim.claim_data.claim_date)
+            if claim_date is not None:
+                dates.append((claim_date, position))
+            self.claim_amounts.append(claim.claim_data.claim_amount_paid)
+            self.claim_dates.append(claim_date)
+        self.by_risk.update(risks)
+        self.by_amount.update(amounts)
+        self.by_date.update(dates)
+
+    def add_columns(self, claim_ids: List[str], columns) -> None:
+        """
+        Index claims from their IDs and ClaimColumns mirror, into an empty index
+        Posting lists and range index keys are read from the columns with array
+        operations instead of from each claim, e.g. to restore a snapshot quickly
+        """
+        rows = len(claim_ids)
+        # The first position of an ID wins, as with setdefault in add
+        self.by_id.update(zip(reversed(claim_ids), range(rows - 1, -1, -1)))
+        for by, name in ((self.by_team, "team"), (self.by_urgency, "urgency"), (self.by_customer_value, "customer_value")):
+            column = columns.categories[name]
+            codes = column.codes.head(rows)
+            for code, value in enumerate(column.categories):
+                positions = np.flatnonzero(codes == code).tolist()
+                if positions:
+                    by[value].extend(positions)
+        fraud = columns.is_potential_fraud.head(rows)
+        for flag in dict.fromkeys(fraud[:1].tolist() + [True, False]):
+            positions = np.flatnonzero(fraud == flag).tolist()
+            if positions:
+                self.by_fraud[flag].extend(positions)
+
+        risk_keys = -columns.numbers["risk_score"].head(rows)
+        amounts = columns.numbers["claim_amount"].head(rows)
+        amount_keys = np.where(np.isnan(amounts), -NO_AMOUNT, -amounts)
+        for index, keys in ((self.by_risk, risk_keys), (self.by_amount, amount_keys)):
+            order = np.argsort(keys, kind="stable")
+            index.update(list(zip(keys[order].tolist(), order.tolist())))
+        claim_dates = columns.claim_dates(rows)
+        by_day = np.argsort(columns.claim_day.head(rows), kind="stable").tolist()
+        self.by_date.update([(claim_dates[position], position) for position in by_day if claim_dates[position] is not None])
+        self.claim_amounts.extend([None if amount != amount else amount for amount in amounts.tolist()])
+        self.claim_dates.extend(claim_dates)
+
+    def search(self, records: Sequence, query: ClaimQuery, count: Optional[int] = None) -> Tuple[List[int], Optional[str]]:
+        """
+        Find the positions of one page of claims matching the query
+        records holds each stored claim by position, as a ClaimRecord or routing decision;
+        only the first count are searched (all of them by default)
+
+        Returns the positions in sort order and the cursor for the next page,
+        or None if this is the last page
+        """
+        after = decode_cursor(query.sort, query.cursor) if query.cursor else None
+        if count is None:
+            count = len(records)
+
+        postings = [
+            index.get(value, [])
+            for index, value in [
+                (self.by_team, query.team),
+                (self.by_urgency, query.urgency),
+                (self.by_customer_value, query.customer_value),
+                (self.by_fraud, query.is_potential_fraud),
+            ]
+            if value is not None
+        ]
+        driver = min(postings, key=len) if postings else None
+        # The narrowest range filter, if it is narrower than every equality filter
+        narrowest = None
+        narrowest_size = len(driver) if driver is not None else count
+        for sorted_index, low, high in self._range_filters(query):
+            size = sorted_index.count(low, high)
+            if size < narrowest_size:
+                narrowest, narrowest_size = (sorted_index, low, high), size
+
+        def key_of(position: int) -> tuple:
+            if query.sort == "risk":
+                return (-records[position].risk_score, position)
+            if query.sort == "amount":
+                return (amount_key(self.claim_amounts[position]), position)
+            if query.sort == "urgency":
+                return (URGENCY_RANK.get(records[position].urgency, len(URGENCY_ORDER)), position)
+            return (position,)
+
+        def matches(position: int) -> bool:
+            if position >= count:
+                return False
+            record = records[position]
+            if query.team is not None and record.assigned_team != query.team:
+                return False
+            if query.urgency is not None and record.urgency != query.urgency:
+                return False
+            if query.customer_value is not None and record.customer_value != query.customer_value:
+                return False
+            if query.is_potential_fraud is not None and record.is_potential_fraud != query.is_potential_fraud:
+                return False
+            if query.min_risk is not None and record.risk_score < query.min_risk:
+                return False
+            if query.max_risk is not None and record.risk_score > query.max_risk:
+                return False
+            if query.min_amount is not None or query.max_amount is not None:
+                amount = self.claim_amounts[position]
+                if amount is None:
+                    return False
+                if query.min_amount is not None and amount < query.min_amount:
+                    return False
+                if query.max_amount is not None and amount > query.max_amount:
+                    return False
+            if query.date_from is not None or query.date_to is not None:
+                claim_date = self.claim_dates[position]
+                if claim_date is None:
+                    return False
+                if query.date_from is not None and claim_date < query.date_from:
+                    return False
+                if query.date_to is not None and claim_date > query.date_to:
+                    return False
+            return True
+
+        if query.sort == "submitted":
+            source = driver if driver is not None else range(count)
+            if narrowest is not None and narrowest_size ** 2 < SORTED_PER_CHECK * (query.limit + 1) * len(source):
+                # Sorting the positions in a narrow range beats skipping the claims outside it
+                sorted_index, low, high = narrowest
+                source = sorted(sorted_index.positions(low, high))
+            start = bisect_right(source, after[0]) if after else 0
+            candidates = (source[i] for i in range(start, len(source)))
+            page = self._take(candidates, matches, query.limit + 1)
+        else:
+            ordered, scan_size = self._ordered_positions(query, after)
+            if narrowest is not None:
+                # Read the range only if it is small enough to use; then it is smaller than the driver
+                sorted_index, low, high = narrowest
+                fits = narrowest_size ** 2 < (query.limit + 1) * scan_size
+                driver = sorted_index.positions(low, high) if fits else None
+            if driver is not None and len(driver) ** 2 < (query.limit + 1) * scan_size:
+                # The driving posting list or range is small enough that sorting its
+                # matches beats walking the sort order and skipping non-matching claims
+                keyed = (
+                    (key_of(position), position) for position in driver
+                    if matches(position) and (after is None or key_of(position) > after)
+                )
+                page = [position for _, position in heapq.nsmallest(query.limit + 1, keyed)]
+            else:
+                page = self._take(ordered, matches, query.limit + 1)
+
+        if len(page) > query.limit:
+            page = page[:query.limit]
+            return page, encode_cursor(query.sort, key_of(page[-1]))
+        return page, None
+
+    def _range_filters(self, query: ClaimQuery) -> List[Tuple[SortedIndex, Optional[tuple], Optional[tuple]]]:
+        """The range index, lowest and highest pair of each range the query filters on"""
+        ranges = []
+        if query.min_risk is not None or query.max_risk is not None:
+            ranges.append(self._risk_range(query))
+        if query.min_amount is not None or query.max_amount is not None:
+            ranges.append(self._amount_range(query))
+        if query.date_from is not None or query.date_to is not None:
+            ranges.append((
+                self.by_date,
+                (query.date_from, -1) if query.date_from is not None else None,
+                (query.date_to, len(self.claim_dates)) if query.date_to is not None else None,
+            ))
+        return ranges
+
+    def _risk_range(self, query: ClaimQuery) -> Tuple[SortedIndex, Optional[tuple], Optional[tuple]]:
+        """The risk index and the lowest and highest pair within the query's risk range"""
+        return (
+            self.by_risk,
+            (-query.max_risk, -1) if query.max_risk is not None else None,
+            (-query.min_risk, len(self.claim_dates)) if query.min_risk is not None else None,
+        )
+
+    def _amount_range(self, query: ClaimQuery) -> Tuple[SortedIndex, Optional[tuple], Optional[tuple]]:
+        """The amount index and the lowest and highest pair within the query's amount range"""
+        if query.min_amount is None and query.max_amount is None:
+            return self.by_amount, None, None
+        return (
+            self.by_amount,
+            (-query.max_amount, -1) if query.max_amount is not None else None,
+            # Without a minimum, the range still ends before the claims without an amount
+            (-query.min_amount, len(self.claim_dates)) if query.min_amount is not None else (amount_key(None), -1),
+        )
+
+    def _ordered_positions(self, query: ClaimQuery, after: Optional[tuple]) -> Tuple[Iterator[int], int]:
+        """
+        Iterate positions in the query's sort order, starting after the cursor key
+        Returns the iterator and the number of positions it may yield
+        """
+        if query.sort in ("risk", "amount"):
+            sorted_index, low, high = self._risk_range(query) if query.sort == "risk" else self._amount_range(query)
+            return (
+                (position for _, position in sorted_index.irange(low, high, after)),
+                sorted_index.count(low, high, after)
+            )
+
+        levels = [query.urgency] if query.urgency is not None else URGENCY_ORDER
+        ranges = []
+        for level in levels:
+            rank = URGENCY_RANK.get(level, len(URGENCY_ORDER))
+            posting = self.by_urgency.get(level, [])
+            if after is not None and rank < after[0]:
+                continue
+            start = bisect_right(posting, after[1]) if after is not None and rank == after[0] else 0
+            ranges.append((posting, start))
+        scan_size = sum(len(posting) - start for posting, start in ranges)
+        return (posting[i] for posting, start in ranges for i in range(start, len(posting))), scan_size
+
+    @staticmethod
+    def _take(candidates: Iterable[int], matches, count: int) -> List[int]:
+        """Collect up to count candidates that match"""
+        page = []
+        for position in candidates:
+            if matches(position):
+                page.append(position)
+                if len(page) == count:
+                    break
+        return page
@@ -0,0 +1,237 @@
+import asyncio
+import gzip
+import os
+import re
+import threading
+from typing import BinaryIO, Callable, Iterator, List, Optional, Sequence, Tuple
+
+SEGMENT_PATTERN = re.compile(r"^wal-(\d{12})\.log$")
+SNAPSHOT_PATTERN = re.compile(r"^snapshot-(\d{12})\.ndjson\.gz$")
+STATE_PATTERN = re.compile(r"^snapshot-(\d{12})\.state$")
+RECOVERY_CHUNK_SIZE = 10000
+# Bytes read at a time during recovery, split into records in one call rather than read line by line
+RECOVERY_READ_BYTES = 1 << 20
+
+
+class ClaimLog:
+    """
+    Append-only write-ahead log of stored claims, with periodic snapshots
+
+    Each record is one claim's JSON encoding on its own line. append() only
+    adds the record to an in-memory buffer; a background thread writes the
+    buffer and fsyncs it every flush_interval seconds, so one fsync covers
+    every claim appended in that interval (group commit). Callers that must
+    not acknowledge a claim before it is on disk await wait_durable().
+
+    The log is split into segments named after the sequence number of their
+    first record. Once snapshot_every records have been logged since the last
+    snapshot, a new segment is started and all records before it are written
+    to a compressed snapshot in a separate thread; older segments and snapshots
+    are then deleted. Recovery reads the latest snapshot and the segments after it.
+
+    Next to each snapshot, the store may write its own state for the records
+    in it (see start), so that it can restore that state on startup instead
+    of rebuilding it from every record of the snapshot.
+    """
+
+    def __init__(self, directory: str, flush_interval: float, snapshot_every: int):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.appended = 0
+        self.durable = 0
+        self.snapshot_seq = 0
+        self._buffer: List[bytes] = []
+        self._lock = threading.Lock()
+        self._segment = None
+        self._records: Optional[Sequence[bytes]] = None
+        self._state: Optional[Callable[[int, BinaryIO], None]] = None
+        self._waiters: List[Tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._snapshotter: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def recover(self) -> Iterator[List[bytes]]:
+        """
+        Yield the logged records (without line endings) in chunks, oldest first:
+        the latest snapshot, then the log tail
+        A torn record at the end of a segment (from a crash mid-write) is dropped
+        """
+        snapshots = self._files(SNAPSHOT_PATTERN)
+        if snapshots:
+            self.snapshot_seq, name = snapshots[-1]
+            with gzip.open(os.path.join(self.directory, name), "rb") as snapshot:
+                yield from _chunks(snapshot, [0])
+        self.appended = self.snapshot_seq
+
+        for start, name in self._files(SEGMENT_PATTERN):
+            if start < self.snapshot_seq:
+                continue
+            path = os.path.join(self.directory, name)
+            valid_bytes = [0]
+            with open(path, "rb") as segment:
+                for chunk in _chunks(segment, valid_bytes):
+                    self.appended += len(chunk)
+                    yield chunk
+            if valid_bytes[0] < os.path.getsize(path):
+                # Cut off the torn record so that the segment can be appended to again
+                os.truncate(path, valid_bytes[0])
+        self.durable = self.appended
+
+    def latest_state(self) -> Optional[str]:
+        """Path of the state written with the latest snapshot, if there is one"""
+        snapshots = self._files(SNAPSHOT_PATTERN)
+        states = dict(self._files(STATE_PATTERN))
+        if not snapshots or snapshots[-1][0] not in states:
+            return None
+        return os.path.join(self.directory, states[snapshots[-1][0]])
+
+    def start(self, records: Sequence[bytes], state: Optional[Callable[[int, BinaryIO], None]] = None) -> None:
+        """
+        Start logging new records after recovery
+        records is a live view of all stored records, sliced by the snapshot
+        thread to write snapshots; sequence numbers continue from its length
+        state, if given, is called by the snapshot thread with a snapshot's
+        sequence number and a file, to write the state of the records before it
+        """
+        self._records = records
+        self._state = state
+        self.appended = self.durable = len(records)
+        self._open_segment()
+        self._flusher = threading.Thread(target=self._run, name="claim-log", daemon=True)
+        self._flusher.start()
+
+    def append(self, record: bytes) -> int:
+        """Queue a record (without line ending) for the next group commit and return its sequence number"""
+        with self._lock:
+            self._buffer.append(record + b"\n")
+            self.appended += 1
+            return self.appended
+
+    async def wait_durable(self, seq: Optional[int] = None) -> None:
+        """Wait until the record with this sequence number (default: the latest) is fsynced"""
+        seq = self.appended if seq is None else seq
+        with self._lock:
+            if self.durable >= seq:
+                return
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._waiters.append((seq, loop, future))
+        await future
+
+    def flush(self) -> None:
+        """Write and fsync the buffered records"""
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            seq = self.appended
+        if records:
+            self._segment.write(b"".join(records))
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+
+        with self._lock:
+            self.durable = seq
+            ready = [waiter for waiter in self._waiters if waiter[0] <= seq]
+            self._waiters = [waiter for waiter in self._waiters if waiter[0] > seq]
+        for _, loop, future in ready:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_set_done, future)
+
+    def close(self) -> None:
+        """Flush outstanding records and stop the background threads"""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+            self._snapshotter = None
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if self.durable - self.snapshot_seq >= self.snapshot_every and not self._snapshot_running():
+                self._start_snapshot()
+        self.flush()
+
+    def _snapshot_running(self) -> bool:
+        return self._snapshotter is not None and self._snapshotter.is_alive()
+
+    def _start_snapshot(self) -> None:
+        """Start a new segment and snapshot every record before it in the background"""
+        seq = self.durable
+        self._open_segment()
+        self._snapshotter = threading.Thread(target=self._write_snapshot, args=(seq,), name="claim-log-snapshot", daemon=True)
+        self._snapshotter.start()
+
+    def _write_snapshot(self, seq: int) -> None:
+        path = os.path.join(self.directory, f"snapshot-{seq:012d}.ndjson.gz")
+        with gzip.open(path + ".tmp", "wb", compresslevel=1) as snapshot:
+            for start in range(0, seq, RECOVERY_CHUNK_SIZE):
+                snapshot.write(b"\n".join(self._records[start:min(start + RECOVERY_CHUNK_SIZE, seq)]) + b"\n")
+        with open(path + ".tmp", "rb") as written:
+            os.fsync(written.fileno())
+        os.replace(path + ".tmp", path)
+        self.snapshot_seq = seq
+        if self._state is not None:
+            # Written after the snapshot, so a crash in between only makes recovery slower
+            state_path = os.path.join(self.directory, f"snapshot-{seq:012d}.state")
+            with open(state_path + ".tmp", "wb") as state:
+                self._state(seq, state)
+                state.flush()
+                os.fsync(state.fileno())
+            os.replace(state_path + ".tmp", state_path)
+
+        # Everything before seq is now in the snapshot
+        for start, name in self._files(SEGMENT_PATTERN):
+            if start < seq:
+                os.remove(os.path.join(self.directory, name))
+        for start, name in self._files(SNAPSHOT_PATTERN) + self._files(STATE_PATTERN):
+            if start < seq:
+                os.remove(os.path.join(self.directory, name))
+
+    def _open_segment(self) -> None:
+        """Start a new segment for records from the current sequence number on"""
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            start = self.appended - len(records)
+            if self._segment is not None:
+                self._segment.close()
+            self._segment = open(os.path.join(self.directory, f"wal-{start:012d}.log"), "ab")
+            self._buffer = records
+
+    def _files(self, pattern: re.Pattern) -> List[Tuple[int, str]]:
+        """(sequence number, file name) of the log files matching pattern, in order"""
+        matches = (pattern.match(name) for name in os.listdir(self.directory))
+        return sorted((int(match.group(1)), match.group(0)) for match in matches if match)
+
+
+def _chunks(file, valid_bytes: List[int]) -> Iterator[List[bytes]]:
+    """
+    Read complete lines from a log file in chunks, without their line endings
+    valid_bytes[0] is set to the length of the complete lines read
+    """
+    lines, rest = [], b""
+    while True:
+        data = file.read(RECOVERY_READ_BYTES)
+        if not data:
+            break
+        valid_bytes[0] += len(rest) + len(data)
+        complete = (rest + data).split(b"\n")
+        rest = complete.pop()
+        valid_bytes[0] -= len(rest)
+        lines.extend(complete)
+        while len(lines) >= RECOVERY_CHUNK_SIZE:
+            yield lines[:RECOVERY_CHUNK_SIZE]
+            del lines[:RECOVERY_CHUNK_SIZE]
+    if lines:
+        yield lines
+
+
+def _set_done(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,253 @@
+import re
+import sys
+import threading
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.models.claim import ClaimData, RoutingDecision
+
+CLAIM_DATA_FIELDS = list(ClaimData.model_fields)
+FRAUD_INDICATOR_POSITION = CLAIM_DATA_FIELDS.index("fraud_indicator")
+# Claim data fields that take few distinct values, interned so that every record shares one copy
+INTERNED_DATA_FIELDS = {
+    "warranty", "claim_region", "claim_province", "vehicle_brand", "vehicle_model", "policyholder_gender", "claim_date"
+}
+# Reason templates get codes up to this many; later new templates are stored as plain strings
+MAX_REASON_CODES = 65536
+# Reasons without an amount repeat from claim to claim; up to this many are kept split
+MAX_SPLIT_REASONS = 65536
+# Risk scores and fraud indicators that repeat from claim to claim; one copy of each of up to this many is kept
+MAX_SHARED_VALUES = 65536
+# Code of a reason stored as a plain string
+RAW_REASON = -1
+# Reasons end in a parameter in parentheses, e.g. "Claim amount > €15,000 (€17250.00)"
+TRAILING_PARAMETER = re.compile(r"\(([^(){}]*)\)$")
+AMOUNT_PARAMETER = re.compile(r"€(\d+\.\d\d)")
+
+
+class ReasonCodes:
+    """
+    Codebook of reason templates, for storing reasons as small integer codes
+
+    A reason such as "High-risk region (Naples)" is stored as the code of its
+    template, "High-risk region ({})", and its parameter, an amount, a number
+    or an interned string. Reasons whose template would not give back the
+    exact same text are stored as they are.
+    """
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.templates: List[str] = []
+        self.splits: Dict[str, Tuple[Optional[str], object]] = {}
+        # Only taken to give a new template its code; codes are read without it
+        self._lock = threading.Lock()
+
+    def encode(self, reason: str, shared: Optional[Dict] = None) -> Tuple[int, object]:
+        """
+        The code of the reason's template and its parameter (None without one)
+        A parameter equal to one in shared, keyed by type and value, is replaced by it
+        """
+        split = self.splits.get(reason)
+        if split is None:
+            split = _split_reason(reason)
+            if not isinstance(split[1], float) and len(self.splits) < MAX_SPLIT_REASONS:
+                self.splits[reason] = split
+        template, parameter = split
+        if template is None:
+            return RAW_REASON, reason
+        if parameter is not None and shared is not None:
+            parameter = shared.setdefault((type(parameter), parameter), parameter)
+
+        code = self.codes.get(template)
+        if code is None:
+            with self._lock:
+                code = self.codes.get(template)
+                if code is None:
+                    if len(self.templates) >= MAX_REASON_CODES:
+                        return RAW_REASON, reason
+                    # The template is in place before its code can be read
+                    self.templates.append(template)
+                    code = self.codes[template] = len(self.templates) - 1
+        return code, parameter
+
+    def load(self, templates: List[str]) -> bool:
+        """
+        Give saved templates the codes they were saved with, e.g. when restoring records
+        Returns False, changing nothing, if one of those codes already stands for another template
+        """
+        with self._lock:
+            if any(current != saved for current, saved in zip(self.templates, templates)):
+                return False
+            for code in range(len(self.templates), len(templates)):
+                self.templates.append(templates[code])
+                self.codes[templates[code]] = code
+        return True
+
+    def decode(self, code: int, parameter: object) -> str:
+        if code == RAW_REASON:
+            return parameter
+        template = self.templates[code]
+        return template if parameter is None else template.format(parameter)
+
+    def encode_all(self, reasons: List[str], shared: Optional[Dict] = None) -> tuple:
+        """Codes and parameters of the reasons, flattened into one tuple"""
+        if not reasons:
+            return ()
+        return tuple(chain.from_iterable(self.encode(reason, shared) for reason in reasons))
+
+    def decode_all(self, codes: tuple) -> List[str]:
+        return [self.decode(codes[i], codes[i + 1]) for i in range(0, len(codes), 2)]
+
+
+class SharedValues:
+    """
+    One copy of each distinct value, like sys.intern for numbers and tuples
+
+    Values are told apart by their repr, so 0.0 and -0.0, or 1 and 1.0,
+    are never shared with each other.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, object] = {}
+
+    def share(self, value: object) -> object:
+        key = repr(value)
+        shared = self.values.get(key)
+        if shared is None:
+            if len(self.values) >= MAX_SHARED_VALUES:
+                return value
+            shared = self.values.setdefault(key, value)
+        return shared
+
+
+def _split_reason(reason: str) -> Tuple[Optional[str], object]:
+    """
+    Template and parameter of a reason; the template is the reason itself if it has
+    no parameter, and None if the reason can only be stored as it is
+    """
+    if "{" in reason or "}" in reason:
+        return None, None
+    match = TRAILING_PARAMETER.search(reason)
+    if match is None:
+        return reason, None
+    head, inner = reason[:match.start()], match.group(1)
+    amount = AMOUNT_PARAMETER.fullmatch(inner)
+    if amount is not None:
+        template, parameter = head + "(€{:.2f})", float(amount.group(1))
+    elif inner.isascii() and inner.isdigit():
+        template, parameter = head + "({:d})", int(inner)
+    else:
+        template, parameter = head + "({})", sys.intern(inner)
+    if template.format(parameter) != reason:
+        return reason, None
+    return template, parameter
+
+
+reason_codes = ReasonCodes()
+shared_values = SharedValues()
+
+
+class ClaimRecord:
+    """
+    Compact in-memory form of a stored routing decision
+
+    The summary fields are attributes, named as in RoutingDecision, with
+    team, urgency and customer value interned. Reasons and fraud indicators
+    are reason codes, and the claim data is a tuple of its field values, in
+    CLAIM_DATA_FIELDS order and without trailing None values. decision()
+    builds the RoutingDecision back, for the API. values() gives the plain
+    values of a record, e.g. to save it as JSON, and from_values() takes
+    them back; reason codes only mean something with the templates of the
+    reason_codes they were made with.
+    """
+
+    __slots__ = (
+        "claim_id", "assigned_team", "urgency", "risk_score", "customer_value", "is_potential_fraud",
+        "reasoning_codes", "fraud_indicator_codes", "claim_data_values",
+    )
+
+    def __init__(self, claim: RoutingDecision):
+        self.claim_id = claim.claim_id
+        self.assigned_team = sys.intern(claim.assigned_team)
+        self.urgency = sys.intern(claim.urgency)
+        self.risk_score = shared_values.share(claim.risk_score)
+        self.customer_value = sys.intern(claim.customer_value)
+        self.is_potential_fraud = claim.is_potential_fraud
+        # Reasons repeat the claim's amounts; their parameters share the claim data's values
+        shared = {
+            (float, amount): amount
+            for amount in (claim.claim_data.claim_amount_paid, claim.claim_data.premium_amount_paid)
+            if amount is not None
+        }
+        self.reasoning_codes = reason_codes.encode_all(claim.reasoning, shared)
+        self.fraud_indicator_codes = reason_codes.encode_all(claim.fraud_indicators, shared)
+        self.claim_data_values = self._pack_claim_data(claim.claim_data, shared)
+
+    def values(self) -> tuple:
+        """The record's attributes, in __slots__ order, as None, bools, numbers, strings and tuples"""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    @classmethod
+    def from_values(cls, values: Sequence) -> "ClaimRecord":
+        """The record whose values() these are, with its tuples possibly turned into lists"""
+        record = cls.__new__(cls)
+        (record.claim_id, assigned_team, urgency, risk_score, customer_value,
+         record.is_potential_fraud, reasoning_codes, fraud_indicator_codes, claim_data_values) = values
+        record.assigned_team = sys.intern(assigned_team)
+        record.urgency = sys.intern(urgency)
+        record.risk_score = shared_values.share(risk_score)
+        record.customer_value = sys.intern(customer_value)
+        record.reasoning_codes = tuple(reasoning_codes)
+        record.fraud_indicator_codes = tuple(fraud_indicator_codes)
+        if len(claim_data_values) > FRAUD_INDICATOR_POSITION and claim_data_values[FRAUD_INDICATOR_POSITION] is not None:
+            is_potential_fraud, fraud_score, indicator_codes = claim_data_values[FRAUD_INDICATOR_POSITION]
+            claim_data_values = list(claim_data_values)
+            claim_data_values[FRAUD_INDICATOR_POSITION] = shared_values.share(
+                (is_potential_fraud, fraud_score, tuple(indicator_codes))
+            )
+        record.claim_data_values = tuple(claim_data_values)
+        return record
+
+    def _pack_claim_data(self, claim_data: ClaimData, shared: Dict) -> tuple:
+        values = []
+        for field in CLAIM_DATA_FIELDS:
+            value = getattr(claim_data, field)
+            if value is None:
+                pass
+            elif field in INTERNED_DATA_FIELDS:
+                # Structured claims may hold other values; they are stored as text, as the extractor does
+                value = sys.intern(value if isinstance(value, str) else str(value))
+            elif field == "claim_id" and value == self.claim_id:
+                value = self.claim_id
+            elif field == "fraud_indicator":
+                value = shared_values.share((
+                    value.is_potential_fraud, value.fraud_score, reason_codes.encode_all(value.fraud_indicators, shared)
+                ))
+            values.append(value)
+        while values and values[-1] is None:
+            values.pop()
+        return tuple(values)
+
+    def decision(self) -> RoutingDecision:
+        """The routing decision this record was made from"""
+        claim_data = dict(zip(CLAIM_DATA_FIELDS, self.claim_data_values))
+        fraud_indicator: Optional[tuple] = claim_data.get("fraud_indicator")
+        if fraud_indicator is not None:
+            is_potential_fraud, fraud_score, indicator_codes = fraud_indicator
+            claim_data["fraud_indicator"] = {
+                "is_potential_fraud": is_potential_fraud,
+                "fraud_score": fraud_score,
+                "fraud_indicators": reason_codes.decode_all(indicator_codes),
+            }
+        # Validating plain values is faster than model_construct on the nested models
+        return RoutingDecision.model_validate({
+            "assigned_team": self.assigned_team,
+            "urgency": self.urgency,
+            "risk_score": self.risk_score,
+            "customer_value": self.customer_value,
+            "reasoning": reason_codes.decode_all(self.reasoning_codes),
+            "claim_data": claim_data,
+            "claim_id": self.claim_id,
+            "is_potential_fraud": self.is_potential_fraud,
+            "fraud_indicators": reason_codes.decode_all(self.fraud_indicator_codes),
+        })
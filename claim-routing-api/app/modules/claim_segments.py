@@ -0,0 +1,210 @@
+import os
+import shutil
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from typing import List, NamedTuple, Optional, Sequence
+
+from app.modules.dedupe import LRUCache
+
+# Claims per compressed block; a cold read decompresses one block
+BLOCK_CLAIMS = 16
+# Decompressed blocks kept for cold reads that hit the same block again
+BLOCK_CACHE_SIZE = 32
+COMPRESSION_LEVEL = 1
+
+
+class ClaimSegment(NamedTuple):
+    """An immutable on-disk segment holding the claims at positions first to first + count"""
+    first: int
+    count: int
+    fd: int
+    # Sparse index: file offset of each block, plus the end of the last one
+    offsets: array
+
+
+class ClaimTiers:
+    """
+    JSON encodings of the stored claims by position, newest in memory, oldest on disk
+
+    The encodings of the newest hot_claims claims stay in memory. Once
+    segment_claims more have been added, the oldest segment_claims are written
+    by a background thread to an immutable segment file of zlib-compressed
+    blocks, then dropped from memory. Reading a cold claim decompresses the
+    one block holding it, found through the segment's sparse block index.
+
+    Segments are not the durable record of the claims (the claim log is):
+    each process writes its own under the segment directory, and removes them
+    on close. With hot_claims 0, every claim stays in memory.
+
+    One thread at a time appends; reads are safe from any thread.
+    """
+
+    def __init__(self, hot_claims: int = 0, directory: Optional[str] = None, segment_claims: int = 10000):
+        if hot_claims and not directory:
+            raise ValueError("Keeping claims on disk needs a segment directory")
+        self.hot_claims = hot_claims
+        self.segment_claims = segment_claims
+        self.directory = os.path.join(directory, str(os.getpid())) if directory else None
+        # Position of the first claim still in memory
+        self.hot_start = 0
+        self.encodings: List[bytes] = []
+        self.segments: List[ClaimSegment] = []
+        self._firsts: List[int] = []
+        self._block_cache: LRUCache[tuple, List[bytes]] = LRUCache(BLOCK_CACHE_SIZE)
+        # Guards hot_start, segments and the front of the hot list against readers on other threads
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._written: Optional[ClaimSegment] = None
+        if self.directory:
+            _remove_stale_directories(directory)
+
+    def __len__(self) -> int:
+        return self.hot_start + len(self.encodings)
+
+    def append(self, encoded: bytes) -> None:
+        self.encodings.append(encoded)
+        if self.hot_claims:
+            self._demote()
+
+    def extend(self, encodings: List[bytes]) -> None:
+        self.encodings.extend(encodings)
+        if self.hot_claims:
+            self._demote()
+
+    def encoding(self, position: int) -> bytes:
+        with self._lock:
+            index = position - self.hot_start
+            if index >= 0:
+                return self.encodings[index]
+        return self._cold([position])[0]
+
+    def encodings_at(self, positions: Sequence[int]) -> List[bytes]:
+        # Claims only ever move from hot to cold, so a position cold here stays cold
+        with self._lock:
+            hot_start = self.hot_start
+            hot = [self.encodings[position - hot_start] for position in positions if position >= hot_start]
+        if len(hot) == len(positions):
+            return hot
+        cold = iter(self._cold([position for position in positions if position < hot_start]))
+        hot = iter(hot)
+        return [next(cold) if position < hot_start else next(hot) for position in positions]
+
+    def encoding_range(self, start: int, end: int) -> List[bytes]:
+        """Encodings of the claims at positions start to end; safe to call from another thread"""
+        with self._lock:
+            hot_start = self.hot_start
+            segments = list(self.segments)
+            hot = self.encodings[max(0, start - hot_start):max(0, end - hot_start)]
+        cold = []
+        for segment in segments:
+            if segment.first + segment.count <= start or segment.first >= min(end, hot_start):
+                continue
+            first_block = max(0, start - segment.first) // BLOCK_CLAIMS
+            last_block = (min(end, segment.first + segment.count) - 1 - segment.first) // BLOCK_CLAIMS
+            for block in range(first_block, last_block + 1):
+                block_first = segment.first + block * BLOCK_CLAIMS
+                records = _read_block(segment, block)
+                cold.extend(records[max(0, start - block_first):max(0, min(end, hot_start) - block_first)])
+        return cold + hot
+
+    def wait(self) -> None:
+        """Wait until the encodings past the hot limit, in whole segments, are on disk and dropped from memory"""
+        while self._writer is not None:
+            self._writer.join()
+            self._demote()
+
+    def close(self) -> None:
+        """Remove the segments; claims on disk can no longer be read"""
+        if self._writer is not None:
+            self._writer.join()
+        for segment in self.segments:
+            os.close(segment.fd)
+        if self._written is not None:
+            os.close(self._written.fd)
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _demote(self) -> None:
+        """Drop the encodings of a finished segment from memory, and start the next segment when enough are hot"""
+        if self._writer is not None and not self._writer.is_alive():
+            written, self._written, self._writer = self._written, None, None
+            if written is not None:
+                with self._lock:
+                    self.segments.append(written)
+                    self._firsts.append(written.first)
+                    del self.encodings[:written.count]
+                    self.hot_start += written.count
+        if self.hot_claims and self._writer is None and len(self.encodings) >= self.hot_claims + self.segment_claims:
+            self._writer = threading.Thread(
+                target=self._write_segment, args=(self.hot_start, self.encodings[:self.segment_claims]),
+                name="claim-segment", daemon=True
+            )
+            self._writer.start()
+
+    def _write_segment(self, first: int, encodings: List[bytes]) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"segment-{first:012d}.bin")
+            offsets = array("Q", [0])
+            with open(path, "wb") as segment:
+                for start in range(0, len(encodings), BLOCK_CLAIMS):
+                    # JSON encodings never contain a raw newline
+                    block = zlib.compress(b"\n".join(encodings[start:start + BLOCK_CLAIMS]), COMPRESSION_LEVEL)
+                    segment.write(block)
+                    offsets.append(offsets[-1] + len(block))
+            self._written = ClaimSegment(first, len(encodings), os.open(path, os.O_RDONLY), offsets)
+        except OSError as e:
+            print(f"Could not write claim segment, keeping every claim in memory: {e}")
+            self.hot_claims = 0
+
+    def _cold(self, positions: Sequence[int]) -> List[bytes]:
+        """Encodings of claims in segments, decompressing each block once"""
+        encodings = []
+        for position in positions:
+            segment = self.segments[bisect_right(self._firsts, position) - 1]
+            block, offset = divmod(position - segment.first, BLOCK_CLAIMS)
+            records = self._block_cache.get((segment.first, block))
+            if records is None:
+                records = _read_block(segment, block)
+                self._block_cache.put((segment.first, block), records)
+            encodings.append(records[offset])
+        return encodings
+
+
+class StoredEncodings:
+    """Read-only view of every stored encoding by position, for the claim log's snapshots"""
+
+    def __init__(self, tiers: ClaimTiers):
+        self.tiers = tiers
+
+    def __len__(self) -> int:
+        return len(self.tiers)
+
+    def __getitem__(self, positions: slice) -> List[bytes]:
+        start, end, _ = positions.indices(len(self.tiers))
+        return self.tiers.encoding_range(start, end)
+
+
+def _read_block(segment: ClaimSegment, block: int) -> List[bytes]:
+    start, end = segment.offsets[block], segment.offsets[block + 1]
+    return zlib.decompress(os.pread(segment.fd, end - start, start)).split(b"\n")
+
+
+def _remove_stale_directories(directory: str) -> None:
+    """Remove segments left behind by processes that are no longer running (or by an earlier run of this PID)"""
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if not name.isdigit():
+            continue
+        if int(name) != os.getpid():
+            try:
+                os.kill(int(name), 0)
+                continue
+            except ProcessLookupError:
+                pass
+            except PermissionError:
+                continue
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
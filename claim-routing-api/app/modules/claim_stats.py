@@ -0,0 +1,122 @@
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from app.models.claim import RoutingDecision
+
+# Field each group of running totals is kept by; claims without a value are only counted in the total
+GROUPS: Dict[str, Callable[[RoutingDecision], Optional[str]]] = {
+    "team": lambda claim: claim.assigned_team,
+    "urgency": lambda claim: claim.urgency,
+    "customer_value": lambda claim: claim.customer_value,
+    "region": lambda claim: claim.claim_data.claim_region,
+    "fraud": lambda claim: "true" if claim.is_potential_fraud else "false",
+}
+# ClaimColumns category column holding each group's values, for all groups but fraud
+GROUP_COLUMNS = {"team": "team", "urgency": "urgency", "customer_value": "customer_value", "region": "region"}
+
+
+class RunningTotals:
+    """Claim and fraud counts and claim amount sum, min and max of a group of claims"""
+
+    __slots__ = ("claims", "fraud_claims", "claims_with_amount", "total_claim_amount",
+                 "min_claim_amount", "max_claim_amount")
+
+    def __init__(self):
+        self.claims = 0
+        self.fraud_claims = 0
+        self.claims_with_amount = 0
+        self.total_claim_amount = 0.0
+        self.min_claim_amount: Optional[float] = None
+        self.max_claim_amount: Optional[float] = None
+
+    def add(self, is_potential_fraud: bool, amount: Optional[float]) -> None:
+        self.claims += 1
+        if is_potential_fraud:
+            self.fraud_claims += 1
+        if amount is not None:
+            self.claims_with_amount += 1
+            self.total_claim_amount += amount
+            if self.min_claim_amount is None or amount < self.min_claim_amount:
+                self.min_claim_amount = amount
+            if self.max_claim_amount is None or amount > self.max_claim_amount:
+                self.max_claim_amount = amount
+
+    def add_many(self, is_potential_fraud: np.ndarray, amounts: np.ndarray) -> None:
+        """Add claims given as arrays of fraud flags and claim amounts (NaN when missing)"""
+        amounts = amounts[~np.isnan(amounts)]
+        self.claims += len(is_potential_fraud)
+        self.fraud_claims += int(np.count_nonzero(is_potential_fraud))
+        if not len(amounts):
+            return
+        self.claims_with_amount += len(amounts)
+        # A running sum, as add keeps, rather than NumPy's pairwise sum, so the total comes out the same
+        self.total_claim_amount = np.cumsum(np.concatenate(([self.total_claim_amount], amounts)))[-1].item()
+        low, high = amounts.min().item(), amounts.max().item()
+        if self.min_claim_amount is None or low < self.min_claim_amount:
+            self.min_claim_amount = low
+        if self.max_claim_amount is None or high > self.max_claim_amount:
+            self.max_claim_amount = high
+
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ClaimStats:
+    """
+    Running totals of the stored claims, overall and per group (see GROUPS)
+
+    Updated as each claim is stored, so reading them costs the same however
+    many claims there are: only the number of distinct teams, regions and so
+    on matters. A snapshot taken on another thread never sees a claim half
+    counted.
+    """
+
+    def __init__(self):
+        self.total = RunningTotals()
+        self.groups: Dict[str, Dict[str, RunningTotals]] = {name: defaultdict(RunningTotals) for name in GROUPS}
+        self._lock = threading.Lock()
+
+    def add(self, claim: RoutingDecision) -> None:
+        amount = claim.claim_data.claim_amount_paid
+        values = [(name, value_of(claim)) for name, value_of in GROUPS.items()]
+        with self._lock:
+            self.total.add(claim.is_potential_fraud, amount)
+            for name, value in values:
+                if value is not None:
+                    self.groups[name][value].add(claim.is_potential_fraud, amount)
+
+    def add_columns(self, columns, start: int, end: int) -> None:
+        """
+        Add the claims in rows start to end of a ClaimColumns mirror at once, e.g. to restore a snapshot
+        Groups are added in order of first appearance, as add would add them
+        """
+        fraud = columns.is_potential_fraud.head(end)[start:]
+        amounts = columns.numbers["claim_amount"].head(end)[start:]
+        group_codes = {
+            name: (columns.categories[column].codes.head(end)[start:], columns.categories[column].categories)
+            for name, column in GROUP_COLUMNS.items()
+        }
+        group_codes["fraud"] = (fraud.astype(np.int32), ["false", "true"])
+        with self._lock:
+            self.total.add_many(fraud, amounts)
+            for name, (codes, values) in group_codes.items():
+                order = np.argsort(codes, kind="stable")
+                sorted_codes = codes[order]
+                ends = np.searchsorted(sorted_codes, np.arange(len(values)), side="right")
+                starts = np.searchsorted(sorted_codes, np.arange(len(values)), side="left")
+                # The first position of each group, to add the groups in order of first appearance
+                present = [code for code in range(len(values)) if ends[code] > starts[code]]
+                for code in sorted(present, key=lambda code: order[starts[code]]):
+                    positions = order[starts[code]:ends[code]]
+                    self.groups[name][values[code]].add_many(fraud[positions], amounts[positions])
+
+    def snapshot(self) -> Dict:
+        """The current totals, in ClaimStats model layout"""
+        with self._lock:
+            snapshot = {"total": self.total.as_dict()}
+            for name, groups in self.groups.items():
+                snapshot[f"by_{name}"] = {value: totals.as_dict() for value, totals in groups.items()}
+        return snapshot
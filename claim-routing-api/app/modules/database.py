@@ -1,36 +1,192 @@
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import uuid
-from app.models.claim import RoutingDecision, ClaimStore
+from app.models.claim import RoutingDecision, ClaimQuery, ClaimAnalyticsQuery
+from app.modules.claim_backend import ClaimBackend, MemoryClaimBackend
+from app.modules.claim_columns import ClaimColumns
+from app.modules.claim_feed import claim_feed
+from app.modules.shared_backend import SharedClaimBackend
+from app.modules.sqlite_backend import SQLiteClaimBackend
+from app import config
 
-claim_store = ClaimStore(claims=[])
+
+def create_backend(kind: str) -> ClaimBackend:
+    """Create the claim storage backend named by CLAIM_STORE"""
+    if kind == "memory":
+        return MemoryClaimBackend(config.CLAIM_HOT_CLAIMS, config.CLAIM_SEGMENT_DIR, config.CLAIM_SEGMENT_CLAIMS)
+    if kind == "shared":
+        return SharedClaimBackend(
+            config.CLAIM_SHARED_PATH, config.CLAIM_HOT_CLAIMS, config.CLAIM_SEGMENT_DIR, config.CLAIM_SEGMENT_CLAIMS
+        )
+    if kind == "sqlite":
+        return SQLiteClaimBackend(config.CLAIM_DB_PATH)
+    if kind == "postgres":
+        # psycopg is only needed with the Postgres store
+        from app.modules.postgres_backend import PostgresClaimBackend
+        return PostgresClaimBackend(
+            config.CLAIM_DB_URL, config.CLAIM_DB_POOL_MIN_SIZE, config.CLAIM_DB_POOL_MAX_SIZE
+        )
+    raise ValueError(f"Unknown claim store: {kind}")
+
+
+claim_backend: ClaimBackend = create_backend(config.CLAIM_STORE)
 
 
 class ClaimDatabase:
-    """In-memory database for storing and retrieving claims"""
+    """Database for storing and retrieving claims, kept in the configured storage backend"""
+    
+    @staticmethod
+    async def add_claim(claim: RoutingDecision) -> RoutingDecision:
+        """
+        Add a claim to the database
+        A claim whose ID is already stored is not added again; the stored claim is returned
+        """
+        return (await ClaimDatabase.add_claims([claim]))[0]
+    
+    @staticmethod
+    async def add_claims(claims: List[RoutingDecision]) -> List[RoutingDecision]:
+        """Add many claims to the database at once, returning the stored claims (see add_claim)"""
+        for claim in claims:
+            if not claim.claim_id:
+                claim.claim_id = f"CLAIM-{uuid.uuid4().hex[:8].upper()}"
+        
+        stored = []
+        for claim, added in await claim_backend.add_many(claims):
+            if added:
+                claim_feed.publish(claim)
+            stored.append(claim)
+        return stored
+    
+    @staticmethod
+    def open_log(directory: str) -> int:
+        """
+        Restore the claims recorded in the log directory, then log every claim added from now on
+        Only the in-memory store uses the log; returns the number of restored claims
+        """
+        if not isinstance(claim_backend, MemoryClaimBackend):
+            raise RuntimeError("The claim log is only used with the in-memory claim store")
+        return claim_backend.open_log(directory)
+    
+    @staticmethod
+    async def open() -> None:
+        """Connect to the storage backend"""
+        await claim_backend.open()
+    
+    @staticmethod
+    async def close() -> None:
+        """Write out claims not yet on disk and release the storage backend"""
+        await claim_backend.close()
+    
+    @staticmethod
+    async def wait_durable(always: bool = False) -> None:
+        """
+        Wait until every claim added so far is on disk
+        With the claim log, only waits with CLAIM_LOG_SYNC_COMMIT, unless always is set
+        """
+        await claim_backend.wait_durable(always)
+    
+    @staticmethod
+    async def find_existing(claim_id: str) -> Optional[RoutingDecision]:
+        """Get the stored claim with this ID, if any, for answering resubmitted claims"""
+        return await claim_backend.find_existing(claim_id)
+    
+    @staticmethod
+    async def get_version(team: Optional[str] = None) -> str:
+        """
+        Get a version string that changes whenever claims are added
+        With a team, only claims added to that team change the version
+        """
+        return await claim_backend.version(team)
     
     @staticmethod
-    def add_claim(claim: RoutingDecision) -> RoutingDecision:
-        """Add a claim to the database"""
-        if not claim.claim_id:
-            claim.claim_id = f"CLAIM-{uuid.uuid4().hex[:8].upper()}"
-            
-        claim_store.claims.append(claim)
-        return claim
+    async def get_epoch() -> str:
+        """Get the identifier of this store instance; stored claims never change within an epoch"""
+        return await claim_backend.epoch()
     
     @staticmethod
-    def get_all_claims() -> List[RoutingDecision]:
+    async def count(team: Optional[str] = None) -> int:
+        """Get the number of stored claims, optionally of one team"""
+        return await claim_backend.count(team)
+    
+    @staticmethod
+    async def get_all_claims() -> List[RoutingDecision]:
         """Get all claims from the database"""
-        return claim_store.claims
+        return await claim_backend.get_all()
     
     @staticmethod
-    def get_claim_by_id(claim_id: str) -> Optional[RoutingDecision]:
+    async def get_claim_by_id(claim_id: str) -> Optional[RoutingDecision]:
         """Get a claim by its ID"""
-        for claim in claim_store.claims:
-            if claim.claim_id == claim_id:
-                return claim
-        return None
+        return await claim_backend.get(claim_id)
+    
+    @staticmethod
+    async def get_claim_json(claim_id: str) -> Optional[bytes]:
+        """Get the stored JSON encoding of a claim by its ID"""
+        return await claim_backend.get_json(claim_id)
     
     @staticmethod
-    def get_claims_by_team(team: str) -> List[RoutingDecision]:
+    async def get_claims_by_team(team: str) -> List[RoutingDecision]:
         """Get all claims assigned to a specific team"""
-        return [claim for claim in claim_store.claims if claim.assigned_team == team]
+        return await claim_backend.get_all(team)
+    
+    @staticmethod
+    async def query_claims(query: ClaimQuery) -> Tuple[List[RoutingDecision], Optional[str]]:
+        """
+        Get one page of claims matching the query's filters, in the query's sort order
+        Returns the claims and the cursor for the next page (None on the last page)
+        """
+        return await claim_backend.query(query)
+    
+    @staticmethod
+    def export_claims_json(query: ClaimQuery) -> AsyncIterator[List[bytes]]:
+        """
+        Iterate over the JSON encodings of every claim matching the query's filters,
+        in chunks, in the query's sort order; the query's limit and cursor are ignored
+        """
+        return claim_backend.export_json(query)
+    
+    @staticmethod
+    async def query_claims_json(query: ClaimQuery) -> Tuple[bytes, Optional[str]]:
+        """
+        Same as query_claims, but returns the page as a JSON array built from
+        the stored encodings, without serializing any claim again
+        With view=summary or fields, each item is projected to those fields
+        """
+        return await claim_backend.query_json(query)
+    
+    @staticmethod
+    async def get_group_stats(query: ClaimAnalyticsQuery) -> List[Dict]:
+        """
+        Aggregate the claims matching the query's filters per value of its group_by field
+        Runs over the columnar mirror, which only the in-memory store keeps
+        """
+        columns = ClaimDatabase.get_claim_columns()
+        if columns is None:
+            raise RuntimeError("Claim analytics are only available with the in-memory claim store")
+        await claim_backend.catch_up()
+        equals = {
+            name: getattr(query, name)
+            for name in ("team", "region", "brand", "warranty")
+            if getattr(query, name) is not None
+        }
+        ranges = {}
+        if query.min_amount is not None or query.max_amount is not None:
+            ranges["claim_amount"] = (query.min_amount, query.max_amount)
+        mask = columns.mask(equals, ranges, query.date_from, query.date_to, query.is_potential_fraud)
+        return columns.group_stats(query.group_by, mask)
+    
+    @staticmethod
+    async def get_stats() -> Dict:
+        """
+        Get the running totals of the stored claims, overall and per team, urgency,
+        customer value, region and fraud flag; only the in-memory store keeps them
+        """
+        if not isinstance(claim_backend, MemoryClaimBackend):
+            raise RuntimeError("Claim stats are only available with the in-memory claim store")
+        await claim_backend.catch_up()
+        return claim_backend.get_stats().snapshot()
+    
+    @staticmethod
+    def get_claim_columns() -> Optional[ClaimColumns]:
+        """Get the columnar mirror of the stored claims, or None if the store keeps none"""
+        if isinstance(claim_backend, MemoryClaimBackend):
+            return claim_backend.get_columns()
+        return None
@@ -0,0 +1,57 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Mapping that keeps only the max_size most recently used entries; safe to share between threads"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[K, V]" = OrderedDict()
+        # A get reorders entries too, so readers on other threads take it as well
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+def claim_key(input_data: Dict[str, Any]) -> str:
+    """
+    Get the idempotency key of a claim input, which is also the ID its claim is stored under
+
+    Structured claims with a CLAIM_ID use that ID. Other claims get an ID derived
+    from a hash of the normalized input (whitespace in text is collapsed, and
+    structured fields are compared regardless of order), so resubmitting the same
+    claim always maps to the same ID.
+    """
+    text = input_data.get("text")
+    structured_data = input_data.get("structured_data")
+    if text:
+        normalized: Dict[str, Any] = {"text": " ".join(text.split())}
+    elif structured_data and structured_data.get("CLAIM_ID"):
+        return str(structured_data["CLAIM_ID"])
+    else:
+        normalized = {"structured_data": structured_data}
+
+    encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+    return f"CLAIM-{hashlib.sha256(encoded.encode()).hexdigest()[:16].upper()}"
@@ -0,0 +1,342 @@
+import asyncio
+import ipaddress
+import json
+import os
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, TypeVar, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from app import config
+from app.models.claim import ClaimJob, RoutingDecision
+from app.modules.admission import admission_controller
+from app.modules.database import ClaimDatabase
+from app.modules.dedupe import claim_key
+from app.modules.pipeline import ClaimPipeline
+from app.modules.worker_pool import routing_pool
+
+T = TypeVar("T")
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+IDLE_POLL_SECONDS = 5
+CALLBACK_TIMEOUT_SECONDS = 10
+CALLBACK_SCHEMES = {"http", "https"}
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the job queue is full"""
+
+
+class ClaimJobQueue:
+    """
+    Bounded, persistent queue of asynchronously processed claims
+
+    Jobs are written to SQLite before they are acknowledged, so a crash loses
+    none of them: jobs that were running when the process stopped are queued
+    again the next time the database is opened. Workers are asyncio tasks that
+    hand each job to the routing worker pool, store the decision and then POST
+    the finished job to its callback URL, if it has one.
+
+    A job interrupted after its claim was stored finishes with the stored
+    decision when it runs again, since claims are stored idempotently. A job
+    that fails unexpectedly is retried after a backoff that doubles with each
+    attempt, and a job started max_attempts times without finishing is marked
+    failed without being run again, so a claim that crashes the process is
+    not retried forever.
+
+    Every statement runs on a thread of the queue's own, one at a time, so
+    waiting for another API worker's write to the shared database does not
+    stall the event loop.
+    """
+
+    def __init__(self, path: str, max_jobs: int, workers: int, max_attempts: int, retention_seconds: int):
+        self.path = path
+        self.max_jobs = max_jobs
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self.active = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        """Run func(*args) on the queue's thread"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="claim-jobs")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Open the database on first use, queueing again any jobs left running by a crash"""
+        if self._connection is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT UNIQUE NOT NULL,
+                    status TEXT NOT NULL,
+                    input TEXT NOT NULL,
+                    callback_url TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    decision TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    retry_at TEXT
+                )"""
+            )
+            columns = {column["name"] for column in connection.execute("PRAGMA table_info(jobs)")}
+            if "retry_at" not in columns:
+                connection.execute("ALTER TABLE jobs ADD COLUMN retry_at TEXT")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, seq)")
+            connection.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            self.active = connection.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            self._connection = connection
+        return self._connection
+
+    async def submit(self, input_data: Dict[str, Any], callback_url: Optional[str] = None) -> ClaimJob:
+        """Queue a claim input for processing, raising JobQueueFull if the queue is full"""
+        job = await self._run(self._submit, input_data, callback_url)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def _submit(self, input_data: Dict[str, Any], callback_url: Optional[str]) -> ClaimJob:
+        connection = self.connection
+        if self.active >= self.max_jobs:
+            raise JobQueueFull("Too many claims are waiting to be processed")
+
+        job_id = f"JOB-{uuid.uuid4().hex[:12].upper()}"
+        now = _now()
+        connection.execute(
+            "INSERT INTO jobs (job_id, status, input, callback_url, created_at, updated_at) "
+            "VALUES (?, 'queued', ?, ?, ?, ?)",
+            (job_id, json.dumps(input_data), callback_url, now, now)
+        )
+        self.active += 1
+        return ClaimJob(job_id=job_id, status="queued", created_at=now, updated_at=now)
+
+    async def get(self, job_id: str) -> Optional[ClaimJob]:
+        """Get a job by its ID"""
+        return await self._run(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[ClaimJob]:
+        row = self.connection.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return ClaimJob(
+            job_id=row["job_id"],
+            status=row["status"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+            attempts=row["attempts"],
+            decision=RoutingDecision.model_validate_json(row["decision"]) if row["decision"] else None,
+            error=row["error"]
+        )
+
+    async def start(self) -> None:
+        """Start the job workers"""
+        self._wakeup = asyncio.Event()
+        # Callbacks connect to the address their host was checked at (see _send_callback), so
+        # connections are not kept alive for another host that happens to share the address
+        self._client = httpx.AsyncClient(
+            timeout=CALLBACK_TIMEOUT_SECONDS, limits=httpx.Limits(max_keepalive_connections=0)
+        )
+        await self._run(self._delete_expired)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the job workers; interrupted jobs are queued again on the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._executor is not None:
+            await self._run(self._close)
+            self._executor.shutdown()
+            self._executor = None
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def _work(self) -> None:
+        while True:
+            row = await self._run(self._claim_next)
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), await self._run(self._idle_seconds))
+                except asyncio.TimeoutError:
+                    await self._run(self._delete_expired)
+                continue
+
+            job = await self._process(row)
+            if job is not None and row["callback_url"]:
+                await self._send_callback(row["callback_url"], job)
+
+    def _idle_seconds(self) -> float:
+        """Seconds to wait for new jobs, waking up early when a retried job is due"""
+        retry_at = self.connection.execute(
+            "SELECT MIN(retry_at) FROM jobs WHERE status = 'queued'"
+        ).fetchone()[0]
+        if retry_at is None:
+            return IDLE_POLL_SECONDS
+        due = (datetime.fromisoformat(retry_at) - datetime.now(timezone.utc)).total_seconds()
+        return min(max(due, 0), IDLE_POLL_SECONDS)
+
+    def _claim_next(self) -> Optional[sqlite3.Row]:
+        """Mark the oldest queued job that is due as running and return it"""
+        row = self.connection.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' AND (retry_at IS NULL OR retry_at <= ?) "
+            "ORDER BY seq LIMIT 1",
+            (_now(),)
+        ).fetchone()
+        if row is None:
+            return None
+        self.connection.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+            (_now(), row["job_id"])
+        )
+        return self.connection.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone()
+
+    async def _process(self, row: sqlite3.Row) -> Optional[ClaimJob]:
+        """
+        Route and store one job's claim
+        Returns the finished job, or None if it was queued again to be retried
+        """
+        job_id = row["job_id"]
+        if row["attempts"] > self.max_attempts:
+            # Only a job that was running when the process stopped gets here, so its claim
+            # may be what crashed it: fail it instead of running it again
+            error = f"Gave up after {self.max_attempts} attempts: {row['error'] or 'interrupted'}"
+            return await self._run(self._finish, job_id, "failed", None, error)
+
+        input_data = json.loads(row["input"])
+        try:
+            # A claim already stored (a resubmission, or a job retried after a crash) is not routed again
+            decision = await ClaimDatabase.find_existing(claim_key(input_data))
+            if decision is None:
+                degraded = admission_controller.admit(can_shed=False)
+                decision = await routing_pool.run(ClaimPipeline.route_input, input_data, degraded, wait=True)
+                decision = await ClaimDatabase.add_claim(decision)
+            # The job must not be marked done before its claim is durable
+            await ClaimDatabase.wait_durable(always=True)
+            return await self._run(self._finish, job_id, "done", decision)
+        except ValueError as e:
+            return await self._run(self._finish, job_id, "failed", None, str(e))
+        except Exception as e:
+            if row["attempts"] < self.max_attempts:
+                backoff = config.JOB_RETRY_BACKOFF_SECONDS * 2 ** (row["attempts"] - 1)
+                retry_at = (datetime.now(timezone.utc) + timedelta(seconds=backoff)).isoformat()
+                await self._run(self._retry, job_id, str(e), retry_at)
+                return None
+            return await self._run(self._finish, job_id, "failed", None, f"An error occurred: {str(e)}")
+
+    def _retry(self, job_id: str, error: str, retry_at: str) -> None:
+        self.connection.execute(
+            "UPDATE jobs SET status = 'queued', error = ?, retry_at = ?, updated_at = ? WHERE job_id = ?",
+            (error, retry_at, _now(), job_id)
+        )
+
+    def _finish(self, job_id: str, status: str, decision: Optional[RoutingDecision] = None,
+                error: Optional[str] = None) -> ClaimJob:
+        self.connection.execute(
+            "UPDATE jobs SET status = ?, decision = ?, error = ?, updated_at = ? WHERE job_id = ?",
+            (status, decision.model_dump_json() if decision else None, error, _now(), job_id)
+        )
+        self.active -= 1
+        return self._get(job_id)
+
+    async def _send_callback(self, url: str, job: ClaimJob) -> None:
+        try:
+            # Checked again before sending, as the host may resolve to other addresses by now
+            address = await check_callback_url(url)
+        except ValueError as e:
+            print(f"Callback for job {job.job_id} to {url} refused: {e}")
+            return
+        try:
+            request = self._client.build_request(
+                "POST", url, content=job.model_dump_json(), headers={"Content-Type": "application/json"}
+            )
+            if address is not None:
+                # Connect to the address just checked instead of letting httpx resolve the host
+                # again, which a host could answer with a private address (DNS rebinding); the
+                # Host header and the TLS server name stay those of the URL
+                request.extensions["sni_hostname"] = request.url.raw_host.decode("ascii")
+                request.url = request.url.copy_with(host=str(address))
+            # Redirects are not followed, so a callback cannot be redirected to a private address
+            response = await self._client.send(request)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            print(f"Callback for job {job.job_id} to {url} failed: {e}")
+
+    def _delete_expired(self) -> None:
+        """Delete finished jobs older than the retention period"""
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=self.retention_seconds)).isoformat()
+        self.connection.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,)
+        )
+
+
+async def check_callback_url(url: str) -> Optional[IPAddress]:
+    """
+    Check that a job's finished status may be POSTed to a URL
+    Raises ValueError unless the URL is http(s) and its host is in JOB_CALLBACK_ALLOWED_HOSTS,
+    or, when no hosts are configured, resolves to public addresses only
+    Returns the public address to send the callback to, or None for an allowed host
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in CALLBACK_SCHEMES or not parts.hostname:
+        raise ValueError("callback_url must be an http or https URL")
+    host = parts.hostname.lower()
+    if config.JOB_CALLBACK_ALLOWED_HOSTS:
+        if host not in config.JOB_CALLBACK_ALLOWED_HOSTS:
+            raise ValueError(f"callback_url host {host} is not allowed")
+        return None
+
+    try:
+        addresses = [ipaddress.ip_address(host)]
+    except ValueError:
+        try:
+            addresses = [ipaddress.ip_address(address) for address in await resolve_host(host, parts.port or 0)]
+        except OSError:
+            raise ValueError(f"callback_url host {host} cannot be resolved")
+    for address in addresses:
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"callback_url host {host} is not a public address")
+    return addresses[0]
+
+
+async def resolve_host(host: str, port: int) -> List[str]:
+    """Addresses a host name resolves to"""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port)
+    return [info[4][0].split("%")[0] for info in infos]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+claim_jobs = ClaimJobQueue(
+    config.JOB_DB_PATH, config.JOB_QUEUE_LIMIT, config.JOB_WORKERS,
+    config.JOB_MAX_ATTEMPTS, config.JOB_RETENTION_SECONDS
+)
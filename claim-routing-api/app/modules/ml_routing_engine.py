@@ -141,20 +141,7 @@ class MLRoutingEngine:
             probabilities = self.model.predict_proba(X)[0]
             confidence = max(probabilities)
             
-            target_classes = []
-            if self.metadata is not None and 'target_classes' in self.metadata:
-                target_classes = self.metadata['target_classes']
-                
-            if isinstance(prediction, str) and prediction in (self.metadata.get('target_classes', []) if self.metadata else []):
-                predicted_department = prediction
-            elif isinstance(prediction, (int, np.integer)) and self.metadata is not None and 'target_classes' in self.metadata:
-                departments = self.metadata['target_classes']
-                if 0 <= prediction < len(departments):
-                    predicted_department = departments[prediction]
-                else:
-                    predicted_department = str(prediction)
-            else:
-                predicted_department = str(prediction)
+            predicted_department = self._department_name(prediction)
             
             reasons = self._generate_prediction_reasons(claim_data, predicted_department, confidence)
             
@@ -163,6 +150,113 @@ class MLRoutingEngine:
             print(f"Error making ML prediction: {e}")
             return None, 0.0, [f"Error in ML prediction: {str(e)}"]
     
+    def preprocess_claims(self, claims: List[Dict[str, Any]]) -> Optional[pd.DataFrame]:
+        """
+        Preprocess many claims for ML prediction in a single DataFrame.
+        
+        Produces the same feature rows as preprocess_claim, but builds one frame
+        for the whole batch and encodes each categorical column with a single lookup.
+        
+        Args:
+            claims: List of dictionaries containing claim information
+            
+        Returns:
+            DataFrame with one preprocessed row per claim or None if model is not available
+        """
+        if not self.is_model_available:
+            return None
+        
+        df = pd.DataFrame(claims)
+        
+        if 'claim_date' in df.columns:
+            claim_dates = df['claim_date'].where(df['claim_date'].astype(bool))
+            claim_dates = pd.to_datetime(claim_dates, format='mixed', errors='coerce')
+            df = df.drop(columns=['claim_date'])
+            df['claim_year'] = claim_dates.dt.year.fillna(2025).astype(int)
+            df['claim_month'] = claim_dates.dt.month.where(claim_dates.notna(), 1).astype(int)
+        else:
+            df['claim_year'] = 2025
+            df['claim_month'] = 1
+        
+        required_features = []
+        if self.metadata is not None and 'features' in self.metadata:
+            required_features = self.metadata['features']
+        for feature in required_features:
+            feature_lower = feature.lower()
+            if feature_lower not in df.columns:
+                if feature_lower in ('claim_amount_paid', 'premium_amount_paid'):
+                    df[feature_lower] = 0
+                elif feature_lower == 'policyholder_age':
+                    df[feature_lower] = 40
+                elif feature_lower in ('policyholder_gender', 'warranty', 'claim_region', 'claim_province',
+                                       'vehicle_brand', 'vehicle_model'):
+                    df[feature_lower] = 'Unknown'
+                else:
+                    df[feature_lower] = 0
+        
+        if self.encoders is not None:
+            for col, encoder in self.encoders.items():
+                col_lower = col.lower()
+                if col_lower in df.columns:
+                    codes = {label: code for code, label in enumerate(encoder.classes_)}
+                    df[col_lower] = [codes.get(value, 0) for value in df[col_lower].astype(str)]
+        
+        df.columns = [col.upper() for col in df.columns]
+        return df
+    
+    def predict_departments(self, claims: List[Dict[str, Any]]) -> List[Tuple[Optional[str], float, List[str]]]:
+        """
+        Predict departments for many claims with a single predict_proba call.
+        
+        Args:
+            claims: List of dictionaries containing claim information
+            
+        Returns:
+            List of (department, confidence, reasons) tuples in the same order as claims,
+            matching what predict_department returns for each claim
+        """
+        if not self.is_model_available:
+            return [(None, 0.0, ["ML model not available"]) for _ in claims]
+        
+        if not claims:
+            return []
+        
+        X = self.preprocess_claims(claims)
+        if X is None:
+            return [(None, 0.0, ["Failed to preprocess claim data"]) for _ in claims]
+        
+        try:
+            if self.model is None:
+                return [(None, 0.0, ["ML model not initialized"]) for _ in claims]
+            
+            probabilities = self.model.predict_proba(X)
+        except Exception as e:
+            print(f"Error making ML prediction: {e}")
+            return [(None, 0.0, [f"Error in ML prediction: {str(e)}"]) for _ in claims]
+        
+        results = []
+        for claim_data, row, index in zip(claims, probabilities, probabilities.argmax(axis=1)):
+            try:
+                department = self._department_name(self.model.classes_[index])
+                confidence = row[index]
+                reasons = self._generate_prediction_reasons(claim_data, department, confidence)
+                results.append((department, confidence, reasons))
+            except Exception as e:
+                print(f"Error making ML prediction: {e}")
+                results.append((None, 0.0, [f"Error in ML prediction: {str(e)}"]))
+        return results
+    
+    def _department_name(self, prediction: Any) -> str:
+        """Map a raw model prediction to a department name."""
+        target_classes = self.metadata.get('target_classes', []) if self.metadata else []
+        
+        if isinstance(prediction, str) and prediction in target_classes:
+            return prediction
+        if isinstance(prediction, (int, np.integer)) and target_classes:
+            if 0 <= prediction < len(target_classes):
+                return target_classes[prediction]
+        return str(prediction)
+    
     def _generate_prediction_reasons(self, claim_data: Dict[str, Any], 
                                     department: str, confidence: float) -> List[str]:
         """
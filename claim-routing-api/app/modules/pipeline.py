@@ -0,0 +1,99 @@
+from typing import List, Dict, Any, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.models.claim import ClaimInput, ClaimData, RoutingDecision, BatchClaimResult
+from app.modules.claim_extractor import ClaimExtractor
+from app.modules.routing_engine import RoutingEngine
+from app.modules.dedupe import claim_key
+
+MAX_NDJSON_LINE_BYTES = 1024 * 1024
+
+
+class ClaimPipeline:
+    """
+    Run claim inputs through extraction and routing
+    
+    These are the CPU-bound steps of claim submission. They do not touch the
+    claim database, so they can run on worker threads or in worker processes;
+    callers store the resulting decisions themselves. Every decision gets the
+    claim's idempotency key as its claim ID, so a resubmitted claim maps to the
+    ID it was first stored under.
+    
+    degraded=True is the cheap path used under overload: regex-only extraction
+    and rules-only routing, without the NLP pipeline or the ML model.
+    """
+    
+    @staticmethod
+    def route_input(input_data: Dict[str, Any], degraded: bool = False) -> RoutingDecision:
+        """Extract and route a single claim input"""
+        claim_data = ClaimExtractor.extract(input_data, use_nlp=not degraded)
+        
+        decision = RoutingEngine.route_claim(claim_data, use_ml=not degraded)
+        decision.claim_id = claim_key(input_data)
+        return decision
+    
+    @staticmethod
+    def route_batch(items: List[Tuple[int, Dict[str, Any]]], degraded: bool = False) -> List[BatchClaimResult]:
+        """
+        Extract and route (index, claim input) pairs as one batch
+        Returns one result per item, in order, holding either the decision or the error
+        """
+        results = [BatchClaimResult(index=index) for index, _ in items]
+        extracted = ClaimExtractor.extract_batch([input_data for _, input_data in items], use_nlp=not degraded)
+        
+        valid = []
+        for result, claim_data in zip(results, extracted):
+            if isinstance(claim_data, ClaimData):
+                valid.append((result, claim_data))
+            else:
+                result.error = str(claim_data)
+        
+        try:
+            decisions = RoutingEngine.route_claims([claim_data for _, claim_data in valid], use_ml=not degraded)
+            for (result, _), decision in zip(valid, decisions):
+                result.decision = decision
+        except Exception:
+            # Route claims one by one so that only the claims that actually fail get an error
+            for result, claim_data in valid:
+                try:
+                    result.decision = RoutingEngine.route_claim(claim_data, use_ml=not degraded)
+                except Exception as e:
+                    result.error = str(e)
+        
+        for result, (_, input_data) in zip(results, items):
+            if result.decision:
+                result.decision.claim_id = claim_key(input_data)
+        
+        return results
+    
+    @staticmethod
+    def route_ndjson_lines(lines: List[Tuple[int, Optional[bytes]]], degraded: bool = False) -> List[BatchClaimResult]:
+        """
+        Parse and route (index, NDJSON line) pairs as one batch
+        A line of None stands for a line that was too long to read
+        """
+        parsed = []
+        errors = {}
+        for index, line in lines:
+            try:
+                parsed.append((index, ClaimPipeline._parse_ndjson_line(line)))
+            except ValueError as e:
+                errors[index] = BatchClaimResult(index=index, error=str(e))
+        
+        try:
+            routed = {result.index: result for result in ClaimPipeline.route_batch(parsed, degraded)}
+        except Exception as e:
+            routed = {index: BatchClaimResult(index=index, error=f"An error occurred: {str(e)}") for index, _ in parsed}
+        
+        return [errors.get(index) or routed[index] for index, _ in lines]
+    
+    @staticmethod
+    def _parse_ndjson_line(line: Optional[bytes]) -> Dict[str, Any]:
+        """Parse one NDJSON line into claim input data, raising ValueError if it is invalid"""
+        if line is None:
+            raise ValueError(f"Line exceeds the maximum length of {MAX_NDJSON_LINE_BYTES} bytes")
+        try:
+            return ClaimInput.model_validate_json(line).dict()
+        except ValidationError as e:
+            raise ValueError(f"Invalid claim input: {e.errors()[0]['msg']}")
@@ -0,0 +1,365 @@
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from psycopg import AsyncConnection
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from psycopg_pool import AsyncConnectionPool
+from app.models.claim import RoutingDecision, ClaimQuery
+from app.modules.claim_backend import (
+    ClaimBackend, EXPORT_CHUNK_SIZE, SUMMARY_FIELD_ORDER, SUMMARY_FIELDS, claim_list_adapter, encode, json_array,
+    parse_fields
+)
+from app.modules.claim_index import (
+    NO_AMOUNT, URGENCY_ORDER, URGENCY_RANK, decode_cursor, encode_cursor, parse_claim_date
+)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS claims (
+        seq BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+        claim_id TEXT UNIQUE NOT NULL,
+        assigned_team TEXT NOT NULL,
+        urgency TEXT NOT NULL,
+        urgency_rank SMALLINT NOT NULL,
+        customer_value TEXT NOT NULL,
+        is_potential_fraud BOOLEAN NOT NULL,
+        risk_score DOUBLE PRECISION NOT NULL,
+        claim_date DATE,
+        reasoning JSONB NOT NULL,
+        fraud_indicators JSONB NOT NULL,
+        claim_data JSONB NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS claims_by_team ON claims (assigned_team, seq)",
+    "CREATE INDEX IF NOT EXISTS claims_by_urgency ON claims (urgency_rank, seq)",
+    "CREATE INDEX IF NOT EXISTS claims_by_risk ON claims (risk_score DESC, seq)",
+    "CREATE INDEX IF NOT EXISTS claims_by_date ON claims (claim_date)",
+    # The claim amount paid, NO_AMOUNT for claims without one; generated from claim_data, so
+    # adding it to an existing table fills it in for the claims already stored
+    "ALTER TABLE claims ADD COLUMN IF NOT EXISTS claim_amount DOUBLE PRECISION NOT NULL GENERATED ALWAYS AS "
+    f"(COALESCE((claim_data->>'claim_amount_paid')::double precision, {NO_AMOUNT!r})) STORED",
+    "CREATE INDEX IF NOT EXISTS claims_by_amount ON claims (claim_amount DESC, seq)",
+    # Team dashboards sorted by risk or urgency read these in order instead of sorting the team's claims
+    "CREATE INDEX IF NOT EXISTS claims_by_team_risk ON claims (assigned_team, risk_score DESC, seq)",
+    "CREATE INDEX IF NOT EXISTS claims_by_team_urgency ON claims (assigned_team, urgency_rank, seq)",
+    "CREATE TABLE IF NOT EXISTS claim_store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+]
+
+# Columns written for each claim, in the order of _row
+CLAIM_COLUMNS = (
+    "claim_id, assigned_team, urgency, urgency_rank, customer_value, is_potential_fraud, "
+    "risk_score, claim_date, reasoning, fraud_indicators, claim_data"
+)
+# Columns read to rebuild summaries, and full routing decisions; seq, risk_score, urgency_rank
+# and claim_amount form the cursor
+SUMMARY_COLUMNS = (
+    "seq, claim_id, assigned_team, urgency, urgency_rank, customer_value, is_potential_fraud, risk_score, claim_amount"
+)
+FULL_COLUMNS = f"{SUMMARY_COLUMNS}, reasoning, fraud_indicators, claim_data"
+
+# Batches are copied into this per-connection table, then moved into claims in one statement
+# that skips stored claim IDs; COPY itself cannot skip conflicting rows
+CREATE_STAGING = (
+    "CREATE TEMP TABLE IF NOT EXISTS claim_staging ("
+    "ord INTEGER NOT NULL, claim_id TEXT, assigned_team TEXT, urgency TEXT, urgency_rank SMALLINT, "
+    "customer_value TEXT, is_potential_fraud BOOLEAN, risk_score DOUBLE PRECISION, claim_date DATE, "
+    "reasoning JSONB, fraud_indicators JSONB, claim_data JSONB"
+    ") ON COMMIT DELETE ROWS"
+)
+COPY_STAGING = f"COPY claim_staging (ord, {CLAIM_COLUMNS}) FROM STDIN"
+MOVE_STAGING = (
+    f"INSERT INTO claims ({CLAIM_COLUMNS}) SELECT {CLAIM_COLUMNS} FROM claim_staging ORDER BY ord "
+    "ON CONFLICT (claim_id) DO NOTHING RETURNING claim_id"
+)
+# Claims are inserted under this transaction-level advisory lock, so they are given their seq
+# and committed in the same order: no claim becomes visible behind one a reader has already
+# seen. That keeps MAX(seq) a valid version and seq a valid cursor for sort=submitted
+CLAIM_INSERT_LOCK = 0x636C61696D
+LOCK_INSERTS = "SELECT pg_advisory_xact_lock(%s)"
+INSERT_CLAIM = (
+    f"INSERT INTO claims ({CLAIM_COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+    "ON CONFLICT (claim_id) DO NOTHING RETURNING claim_id"
+)
+
+# ORDER BY clause of each sort order; the cursor key is (sort column, seq) or (seq,)
+SORT_ORDER = {
+    "submitted": "seq",
+    "risk": "risk_score DESC, seq",
+    "urgency": "urgency_rank, seq",
+    "amount": "claim_amount DESC, seq",
+}
+
+
+class PostgresClaimBackend(ClaimBackend):
+    """
+    Claims stored in PostgreSQL, through an async connection pool
+
+    Each claim is one row, with the fields the dashboard filters and sorts on
+    as indexed columns and reasoning, fraud indicators and claim data as
+    JSONB. Single claims are inserted with one statement, which psycopg
+    prepares on the server once a connection has run it a few times; batches
+    are streamed in with COPY. Dashboard pages use keyset pagination and
+    exports read through a server-side cursor, so neither loads more than a
+    chunk of rows at a time. Inserts take CLAIM_INSERT_LOCK, so claims commit
+    in seq order; batches copy into the staging table before taking it.
+
+    Claims are stored for good, so the epoch is kept in the database and ETags
+    stay valid across restarts and API instances.
+    """
+
+    def __init__(self, url: str, min_size: int, max_size: int):
+        self.url = url
+        self.pool = AsyncConnectionPool(
+            url, min_size=min_size, max_size=max_size, open=False,
+            kwargs={"autocommit": True}, configure=self._configure
+        )
+        self._epoch: Optional[str] = None
+
+    @staticmethod
+    async def _configure(connection: AsyncConnection) -> None:
+        await connection.execute(CREATE_STAGING)
+
+    async def open(self) -> None:
+        """Open the pool and create the schema if needed"""
+        await self.pool.open(wait=True)
+        async with self.pool.connection() as connection:
+            async with connection.transaction():
+                for statement in SCHEMA:
+                    await connection.execute(statement)
+                await connection.execute(
+                    "INSERT INTO claim_store_meta VALUES ('epoch', %s) ON CONFLICT DO NOTHING", (uuid.uuid4().hex[:8],)
+                )
+            cursor = await connection.execute("SELECT value FROM claim_store_meta WHERE key = 'epoch'")
+            self._epoch = (await cursor.fetchone())[0]
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+    async def add_many(self, claims: List[RoutingDecision]) -> List[Tuple[RoutingDecision, bool]]:
+        async with self.pool.connection() as connection:
+            async with connection.transaction():
+                cursor = connection.cursor()
+                if len(claims) == 1:
+                    await cursor.execute(LOCK_INSERTS, (CLAIM_INSERT_LOCK,))
+                    await cursor.execute(INSERT_CLAIM, _row(claims[0]))
+                else:
+                    async with cursor.copy(COPY_STAGING) as copy:
+                        for position, claim in enumerate(claims):
+                            await copy.write_row((position, *_row(claim)))
+                    await cursor.execute(LOCK_INSERTS, (CLAIM_INSERT_LOCK,))
+                    await cursor.execute(MOVE_STAGING)
+                inserted = {row[0] for row in await cursor.fetchall()}
+
+                stored: Dict[str, RoutingDecision] = {}
+                existing_ids = [claim.claim_id for claim in claims if claim.claim_id not in inserted]
+                if existing_ids:
+                    cursor = connection.cursor(row_factory=dict_row)
+                    await cursor.execute(
+                        f"SELECT {FULL_COLUMNS} FROM claims WHERE claim_id = ANY(%s)", (existing_ids,)
+                    )
+                    stored = {claim.claim_id: claim for claim in _claims(await cursor.fetchall())}
+
+        results = []
+        for claim in claims:
+            if claim.claim_id in inserted and claim.claim_id not in stored:
+                stored[claim.claim_id] = claim
+                results.append((claim, True))
+            else:
+                results.append((stored[claim.claim_id], False))
+        return results
+
+    async def get(self, claim_id: str) -> Optional[RoutingDecision]:
+        rows = await self._fetch(f"SELECT {FULL_COLUMNS} FROM claims WHERE claim_id = %s", (claim_id,))
+        return _claims(rows)[0] if rows else None
+
+    async def get_json(self, claim_id: str) -> Optional[bytes]:
+        claim = await self.get(claim_id)
+        return claim.model_dump_json().encode() if claim is not None else None
+
+    async def get_all(self, team: Optional[str] = None) -> List[RoutingDecision]:
+        if team is None:
+            rows = await self._fetch(f"SELECT {FULL_COLUMNS} FROM claims ORDER BY seq")
+        else:
+            rows = await self._fetch(
+                f"SELECT {FULL_COLUMNS} FROM claims WHERE assigned_team = %s ORDER BY seq", (team,)
+            )
+        return _claims(rows)
+
+    async def count(self, team: Optional[str] = None) -> int:
+        if team is None:
+            rows = await self._fetch("SELECT COUNT(*) AS count FROM claims")
+        else:
+            rows = await self._fetch("SELECT COUNT(*) AS count FROM claims WHERE assigned_team = %s", (team,))
+        return rows[0]["count"]
+
+    async def version(self, team: Optional[str] = None) -> str:
+        # Claims commit in seq order (see CLAIM_INSERT_LOCK), so the latest seq (of the team)
+        # changes exactly when claims are added
+        if team is None:
+            rows = await self._fetch("SELECT MAX(seq) AS latest FROM claims")
+        else:
+            rows = await self._fetch("SELECT MAX(seq) AS latest FROM claims WHERE assigned_team = %s", (team,))
+        return f"{self._epoch}-{rows[0]['latest'] or 0}"
+
+    async def epoch(self) -> str:
+        return self._epoch
+
+    async def query(self, query: ClaimQuery) -> Tuple[List[RoutingDecision], Optional[str]]:
+        sql, params = _select(query, FULL_COLUMNS)
+        rows = await self._fetch(f"{sql} LIMIT %s", (*params, query.limit + 1))
+        next_cursor = None
+        if len(rows) > query.limit:
+            rows = rows[:query.limit]
+            next_cursor = _cursor(query.sort, rows[-1])
+        return _claims(rows), next_cursor
+
+    async def query_json(self, query: ClaimQuery) -> Tuple[bytes, Optional[str]]:
+        fields = parse_fields(query.fields) if query.fields else None
+        sql, params = _select(query, _columns(query, fields))
+        rows = await self._fetch(f"{sql} LIMIT %s", (*params, query.limit + 1))
+        next_cursor = None
+        if len(rows) > query.limit:
+            rows = rows[:query.limit]
+            next_cursor = _cursor(query.sort, rows[-1])
+        return json_array(_encodings(rows, query, fields)), next_cursor
+
+    async def export_json(self, query: ClaimQuery) -> AsyncIterator[List[bytes]]:
+        """Reads through a server-side cursor, EXPORT_CHUNK_SIZE rows at a time"""
+        fields = parse_fields(query.fields) if query.fields else None
+        sql, params = _select(query.model_copy(update={"cursor": None}), _columns(query, fields))
+        async with self.pool.connection() as connection:
+            async with connection.transaction():
+                async with connection.cursor(name="claim_export", row_factory=dict_row) as cursor:
+                    cursor.itersize = EXPORT_CHUNK_SIZE
+                    await cursor.execute(sql, params)
+                    while True:
+                        rows = await cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                        if not rows:
+                            return
+                        yield _encodings(rows, query, fields)
+
+    async def _fetch(self, sql: str, params: tuple = ()) -> List[Dict]:
+        async with self.pool.connection() as connection:
+            cursor = connection.cursor(row_factory=dict_row)
+            await cursor.execute(sql, params)
+            return await cursor.fetchall()
+
+
+def _select(query: ClaimQuery, columns: str) -> Tuple[str, list]:
+    """
+    SELECT statement and parameters for the claims matching the query, in its
+    sort order, starting after its cursor
+    Pages are read with keyset pagination on the sort key, so a page costs
+    the same however deep into the results it is
+    """
+    after = decode_cursor(query.sort, query.cursor) if query.cursor else None
+    clauses, params = [], []
+
+    for column, value in [
+        ("assigned_team", query.team),
+        ("customer_value", query.customer_value),
+        ("is_potential_fraud", query.is_potential_fraud),
+    ]:
+        if value is not None:
+            clauses.append(f"{column} = %s")
+            params.append(value)
+    if query.urgency is not None:
+        clauses.append("urgency_rank = %s AND urgency = %s")
+        params.extend([URGENCY_RANK.get(query.urgency, len(URGENCY_ORDER)), query.urgency])
+    if query.min_risk is not None:
+        clauses.append("risk_score >= %s")
+        params.append(query.min_risk)
+    if query.max_risk is not None:
+        clauses.append("risk_score <= %s")
+        params.append(query.max_risk)
+    if query.min_amount is not None:
+        clauses.append("claim_amount >= %s")
+        params.append(query.min_amount)
+    if query.max_amount is not None:
+        clauses.append("claim_amount <= %s AND claim_amount > %s")
+        params.extend([query.max_amount, NO_AMOUNT])
+    if query.date_from is not None:
+        clauses.append("claim_date >= %s")
+        params.append(query.date_from)
+    if query.date_to is not None:
+        clauses.append("claim_date <= %s")
+        params.append(query.date_to)
+
+    if after is not None:
+        if query.sort == "submitted":
+            clauses.append("seq > %s")
+            params.append(after[0])
+        elif query.sort == "risk":
+            # The leading range lets Postgres start the scan of the risk index at the cursor
+            clauses.append("risk_score <= %s AND (risk_score < %s OR seq > %s)")
+            params.extend([-after[0], -after[0], after[1]])
+        elif query.sort == "amount":
+            clauses.append("claim_amount <= %s AND (claim_amount < %s OR seq > %s)")
+            params.extend([-after[0], -after[0], after[1]])
+        else:
+            clauses.append("(urgency_rank, seq) > (%s, %s)")
+            params.extend([after[0], after[1]])
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT {columns} FROM claims {where} ORDER BY {SORT_ORDER[query.sort]}", params
+
+
+def _columns(query: ClaimQuery, fields: Optional[List[str]]) -> str:
+    """Columns needed to encode the claims as the query asks; summaries need no JSONB columns"""
+    if fields is None:
+        return SUMMARY_COLUMNS if query.view == "summary" else FULL_COLUMNS
+    return SUMMARY_COLUMNS if SUMMARY_FIELDS.issuperset(fields) else FULL_COLUMNS
+
+
+def _encodings(rows: List[Dict], query: ClaimQuery, fields: Optional[List[str]]) -> List[bytes]:
+    """JSON encodings of the claims in these rows (see _columns), projected as the query asks"""
+    if fields is None and query.view == "summary":
+        fields = SUMMARY_FIELD_ORDER
+    if fields is not None and SUMMARY_FIELDS.issuperset(fields):
+        return [encode({field: row[field] for field in fields}) for row in rows]
+    include = set(fields) if fields is not None else None
+    return [claim.model_dump_json(include=include).encode() for claim in _claims(rows)]
+
+
+def _claims(rows: List[Dict]) -> List[RoutingDecision]:
+    """Rebuild routing decisions from rows of FULL_COLUMNS"""
+    return claim_list_adapter.validate_python([
+        {
+            "assigned_team": row["assigned_team"],
+            "urgency": row["urgency"],
+            "risk_score": row["risk_score"],
+            "customer_value": row["customer_value"],
+            "reasoning": row["reasoning"],
+            "claim_data": row["claim_data"],
+            "claim_id": row["claim_id"],
+            "is_potential_fraud": row["is_potential_fraud"],
+            "fraud_indicators": row["fraud_indicators"],
+        }
+        for row in rows
+    ])
+
+
+def _cursor(sort: str, row: Dict) -> str:
+    """Cursor after the given row"""
+    if sort == "risk":
+        return encode_cursor(sort, (-row["risk_score"], row["seq"]))
+    if sort == "amount":
+        return encode_cursor(sort, (-row["claim_amount"], row["seq"]))
+    if sort == "urgency":
+        return encode_cursor(sort, (row["urgency_rank"], row["seq"]))
+    return encode_cursor(sort, (row["seq"],))
+
+
+def _row(claim: RoutingDecision) -> tuple:
+    """Column values of a claim, in CLAIM_COLUMNS order"""
+    return (
+        claim.claim_id,
+        claim.assigned_team,
+        claim.urgency,
+        URGENCY_RANK.get(claim.urgency, len(URGENCY_ORDER)),
+        claim.customer_value,
+        claim.is_potential_fraud,
+        claim.risk_score,
+        parse_claim_date(claim.claim_data.claim_date),
+        Jsonb(claim.reasoning),
+        Jsonb(claim.fraud_indicators),
+        Jsonb(claim.claim_data.model_dump()),
+    )
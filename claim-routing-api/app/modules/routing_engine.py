@@ -1,74 +1,99 @@
 import uuid
+from typing import List, Optional, Tuple, Dict, Any
 from app.models.claim import ClaimData, RoutingDecision, FraudIndicator
 from app.modules.scoring_engine import ScoringEngine
 from app.modules.ml_routing_engine import ml_routing_engine
 
+DEGRADED_REASON = "Routed by business rules only (system under heavy load)"
+
 
 class RoutingEngine:
     """Route claims to appropriate teams based on claim data and scores"""
 
     @staticmethod
-    def route_claim(claim_data: ClaimData) -> RoutingDecision:
+    def route_claim(claim_data: ClaimData, use_ml: bool = True) -> RoutingDecision:
         """
         Determine the appropriate team for a claim based on its characteristics
-        Uses a hybrid approach combining ML predictions and rule-based routing
+        Same as route_claims for a batch of one claim
         Returns a RoutingDecision with team assignment and reasoning
         """
-        urgency_score, urgency_level, urgency_reasons = ScoringEngine.calculate_urgency(claim_data)
-        risk_score, risk_reasons = ScoringEngine.calculate_risk(claim_data)
-        customer_value, value_reasons = ScoringEngine.calculate_customer_value(claim_data)
-        
-        fraud_indicator = ScoringEngine.detect_fraud(claim_data)
-        claim_data.fraud_indicator = fraud_indicator
-        
-        all_reasons = urgency_reasons + risk_reasons + value_reasons
+        return RoutingEngine.route_claims([claim_data], use_ml)[0]
+    
+    @staticmethod
+    def route_claims(claims: List[ClaimData], use_ml: bool = True) -> List[RoutingDecision]:
+        """
+        Determine the appropriate team for each claim based on its characteristics
+        Uses a hybrid approach combining ML predictions and rule-based routing,
+        with a single ML call for all claims
+        With use_ml=False (degraded mode) only the business rules are used
+        Returns the RoutingDecisions in the same order as the input claims
+        """
+        scores = ScoringEngine.score_batch(claims)
         
-        if fraud_indicator.is_potential_fraud:
-            all_reasons.extend(fraud_indicator.fraud_indicators)
+        if use_ml and ml_routing_engine.is_model_available:
+            ml_predictions = ml_routing_engine.predict_departments(
+                [RoutingEngine._ml_features(claim_data) for claim_data in claims]
+            )
+        else:
+            ml_predictions = [None] * len(claims)
         
-        ml_reasons = []
-        if ml_routing_engine.is_model_available:
-            claim_dict = {
-                'policyholder_age': claim_data.policyholder_age,
-                'policyholder_gender': claim_data.policyholder_gender,
-                'warranty': claim_data.warranty,
-                'claim_region': claim_data.claim_region,
-                'claim_province': claim_data.claim_province,
-                'vehicle_brand': claim_data.vehicle_brand,
-                'vehicle_model': claim_data.vehicle_model,
-                'claim_amount_paid': claim_data.claim_amount_paid,
-                'premium_amount_paid': claim_data.premium_amount_paid,
-                'claim_date': claim_data.claim_date
-            }
+        decisions = []
+        for claim_data, score, ml_prediction in zip(claims, scores, ml_predictions):
+            (_, urgency_level, urgency_reasons, risk_score, risk_reasons,
+             customer_value, value_reasons, fraud_indicator) = score
+            claim_data.fraud_indicator = fraud_indicator
             
-            _, _, ml_reasons = ml_routing_engine.predict_department(claim_dict)
+            all_reasons = urgency_reasons + risk_reasons + value_reasons
             
-            if ml_reasons and ml_reasons[0] != "ML model not available":
-                all_reasons.extend([f"ML: {reason}" for reason in ml_reasons])
-        
-        assigned_team = RoutingEngine._assign_team(
-            claim_data, 
-            urgency_level, 
-            risk_score, 
-            customer_value, 
-            fraud_indicator
-        )
-        
-        claim_id = claim_data.claim_id or f"CLAIM-{uuid.uuid4().hex[:8].upper()}"
-        
-        decision = RoutingDecision(
-            assigned_team=assigned_team,
-            urgency=urgency_level,
-            risk_score=risk_score,
-            customer_value=customer_value,
-            reasoning=all_reasons,
-            claim_data=claim_data,
-            claim_id=claim_id,
-            is_potential_fraud=fraud_indicator.is_potential_fraud,
-            fraud_indicators=fraud_indicator.fraud_indicators
-        )
-        
-        return decision
+            if fraud_indicator.is_potential_fraud:
+                all_reasons.extend(fraud_indicator.fraud_indicators)
+            
+            if ml_prediction is not None:
+                ml_reasons = ml_prediction[2]
+                if ml_reasons and ml_reasons[0] != "ML model not available":
+                    all_reasons.extend([f"ML: {reason}" for reason in ml_reasons])
+            
+            assigned_team = RoutingEngine._assign_team(
+                claim_data,
+                urgency_level,
+                risk_score,
+                customer_value,
+                fraud_indicator,
+                ml_prediction,
+                use_ml
+            )
+            if not use_ml:
+                all_reasons.append(DEGRADED_REASON)
+            
+            decisions.append(RoutingDecision(
+                assigned_team=assigned_team,
+                urgency=urgency_level,
+                risk_score=risk_score,
+                customer_value=customer_value,
+                reasoning=all_reasons,
+                claim_data=claim_data,
+                claim_id=claim_data.claim_id or f"CLAIM-{uuid.uuid4().hex[:8].upper()}",
+                is_potential_fraud=fraud_indicator.is_potential_fraud,
+                fraud_indicators=fraud_indicator.fraud_indicators
+            ))
+        
+        return decisions
+    
+    @staticmethod
+    def _ml_features(claim_data: ClaimData) -> Dict[str, Any]:
+        """Build the feature dictionary expected by the ML routing engine"""
+        return {
+            'policyholder_age': claim_data.policyholder_age,
+            'policyholder_gender': claim_data.policyholder_gender,
+            'warranty': claim_data.warranty,
+            'claim_region': claim_data.claim_region,
+            'claim_province': claim_data.claim_province,
+            'vehicle_brand': claim_data.vehicle_brand,
+            'vehicle_model': claim_data.vehicle_model,
+            'claim_amount_paid': claim_data.claim_amount_paid,
+            'premium_amount_paid': claim_data.premium_amount_paid,
+            'claim_date': claim_data.claim_date
+        }
     
     @staticmethod
     def _assign_team(
@@ -76,28 +101,24 @@ class RoutingEngine:
         urgency: str, 
         risk_score: float, 
         customer_value: str,
-        fraud_indicator: FraudIndicator
+        fraud_indicator: FraudIndicator,
+        ml_prediction: Optional[Tuple[Optional[str], float, List[str]]] = None,
+        use_ml: bool = True
     ) -> str:
-        """Assign claim to appropriate team based on ML predictions and business rules"""
+        """
+        Assign claim to appropriate team based on ML predictions and business rules
+        An ML prediction already made for this claim can be passed in to avoid predicting twice
+        With use_ml=False the ML routing engine is skipped and only the rules apply
+        """
         
         if fraud_indicator.is_potential_fraud:
             return "Fraud Investigation Team"
         
-        if ml_routing_engine.is_model_available:
-            claim_dict = {
-                'policyholder_age': claim_data.policyholder_age,
-                'policyholder_gender': claim_data.policyholder_gender,
-                'warranty': claim_data.warranty,
-                'claim_region': claim_data.claim_region,
-                'claim_province': claim_data.claim_province,
-                'vehicle_brand': claim_data.vehicle_brand,
-                'vehicle_model': claim_data.vehicle_model,
-                'claim_amount_paid': claim_data.claim_amount_paid,
-                'premium_amount_paid': claim_data.premium_amount_paid,
-                'claim_date': claim_data.claim_date
-            }
+        if use_ml and ml_routing_engine.is_model_available:
+            if ml_prediction is None:
+                ml_prediction = ml_routing_engine.predict_department(RoutingEngine._ml_features(claim_data))
             
-            ml_department, confidence, ml_reasons = ml_routing_engine.predict_department(claim_dict)
+            ml_department, confidence, ml_reasons = ml_prediction
             
             if ml_department and confidence > 0.7:
                 if ml_department == "High Value Claims":
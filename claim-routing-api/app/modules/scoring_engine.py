@@ -1,3 +1,5 @@
+from typing import List
+
 from app.models.claim import ClaimData, FraudIndicator
 
 
@@ -157,3 +159,17 @@ class ScoringEngine:
         fraud_indicator.is_potential_fraud = fraud_score >= 0.5
         
         return fraud_indicator
+
+    @staticmethod
+    def score_batch(claims: List[ClaimData]) -> List[tuple]:
+        """
+        Calculate urgency, risk, customer value and fraud indicators for many claims at once
+        Uses the per-claim methods, so batch and single scoring share the same thresholds
+        Returns: list of (urgency_score, urgency_level, urgency_reasons, risk_score, risk_reasons,
+                 customer_value, value_reasons, fraud_indicator), one tuple per claim
+        """
+        return [
+            (*ScoringEngine.calculate_urgency(claim), *ScoringEngine.calculate_risk(claim),
+             *ScoringEngine.calculate_customer_value(claim), ScoringEngine.detect_fraud(claim))
+            for claim in claims
+        ]
@@ -0,0 +1,244 @@
+import asyncio
+import fcntl
+import mmap
+import os
+import struct
+import uuid
+from contextlib import contextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+from app.models.claim import RoutingDecision, ClaimQuery
+from app.modules.claim_backend import MemoryClaimBackend
+from app import config
+
+MAGIC = b"SCOPECL1"
+# Header: magic, epoch, publication sequence and end of the committed records
+HEADER = struct.Struct("<8s8sQQ")
+# The sequence is odd while a writer publishes a new end (a seqlock)
+SEQUENCE_OFFSET = 16
+END_OFFSET = 24
+COUNTER = struct.Struct("<Q")
+# The header takes one page, mapped into every worker; records start after it
+HEADER_SIZE = 4096
+RECORD_LENGTH = struct.Struct("<I")
+# Seqlock retries before a reader takes the writer lock, in case a writer died mid-publish
+SEQLOCK_SPINS = 1000
+# Bytes of records read at a time when catching up with other workers
+CATCH_UP_BYTES = 16 * 1024 * 1024
+
+
+class SharedClaimBackend(MemoryClaimBackend):
+    """
+    Claims shared by several uvicorn worker processes through one append-only file
+
+    The file starts with a header page, mapped into every worker, followed by
+    the JSON encoding of each stored claim, prefixed with its length. One
+    worker at a time appends, under an exclusive flock on the file, and then
+    publishes the new end of the committed records in the header. Readers
+    never lock: they read the committed end through the header's sequence
+    counter and add the records appended since their last read to their own
+    in-memory store, indexes and columns. Every read in every worker therefore
+    sees every claim committed before it. Within a worker, adding those
+    records is a write like any other, under the store's write lock.
+
+    Waiting for the flock, appending and adding other workers' records all
+    happen on a worker thread, so the event loop never waits for another
+    process; a read only checks the header on the loop, and goes to a thread
+    if there is anything to catch up with. get_columns and get_stats cannot
+    wait, so callers await catch_up() first, as ClaimDatabase does.
+
+    Each worker keeps its own copy of the claims, as with the memory store,
+    including its own segments of the claims past hot_claims. Records appended
+    by a writer that died before publishing them are overwritten by the next
+    writer.
+    """
+
+    def __init__(
+        self, path: str, hot_claims: int = 0, segment_directory: Optional[str] = None, segment_claims: int = 10000
+    ):
+        super().__init__(hot_claims, segment_directory, segment_claims)
+        self.path = path
+        self.fd: Optional[int] = None
+        self.header: Optional[mmap.mmap] = None
+        # End of the records already added to this worker's store
+        self.read_end = HEADER_SIZE
+
+    async def open(self) -> None:
+        await asyncio.to_thread(self._open)
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._locked():
+            if os.fstat(self.fd).st_size < HEADER_SIZE:
+                os.ftruncate(self.fd, HEADER_SIZE)
+                os.pwrite(self.fd, HEADER.pack(MAGIC, uuid.uuid4().hex[:8].encode(), 0, HEADER_SIZE), 0)
+                os.fsync(self.fd)
+            self.header = mmap.mmap(self.fd, HEADER_SIZE)
+            magic, epoch, _, _ = HEADER.unpack_from(self.header)
+            if magic != MAGIC:
+                raise RuntimeError(f"{self.path} is not a shared claim store")
+            self.claim_versions.epoch = epoch.decode()
+            self._repair()
+        self._catch_up()
+
+    async def close(self) -> None:
+        await super().close()
+        if self.header is not None:
+            self.header.close()
+            self.header = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    async def wait_durable(self, always: bool = False) -> None:
+        """
+        Wait until every claim added so far is on disk
+        Only waits with CLAIM_LOG_SYNC_COMMIT, unless always is set
+        """
+        if always or config.CLAIM_LOG_SYNC_COMMIT:
+            await asyncio.to_thread(os.fsync, self.fd)
+
+    def open_log(self, directory: str) -> int:
+        raise RuntimeError("The shared claim store is already on disk and does not use the claim log")
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the writer lock; blocks while another worker appends, so never on the event loop
+        An flock does not exclude threads of the same worker: they take the store's write lock first
+        """
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def _repair(self) -> None:
+        """Close a publication left open by a writer that died; only with the writer lock held"""
+        sequence = COUNTER.unpack_from(self.header, SEQUENCE_OFFSET)[0]
+        if sequence % 2:
+            COUNTER.pack_into(self.header, SEQUENCE_OFFSET, sequence + 1)
+
+    def _caught_up(self) -> bool:
+        """Whether this worker has every committed record; reads the header once, without locking or waiting"""
+        sequence = COUNTER.unpack_from(self.header, SEQUENCE_OFFSET)[0]
+        end = COUNTER.unpack_from(self.header, END_OFFSET)[0]
+        if sequence % 2 or end != self.read_end:
+            return False
+        return COUNTER.unpack_from(self.header, SEQUENCE_OFFSET)[0] == sequence
+
+    def _committed_end(self) -> int:
+        """End of the committed records, read without locking unless a writer died mid-publish"""
+        for _ in range(SEQLOCK_SPINS):
+            sequence = COUNTER.unpack_from(self.header, SEQUENCE_OFFSET)[0]
+            if sequence % 2 == 0:
+                end = COUNTER.unpack_from(self.header, END_OFFSET)[0]
+                if COUNTER.unpack_from(self.header, SEQUENCE_OFFSET)[0] == sequence:
+                    return end
+        with self._locked():
+            self._repair()
+            return COUNTER.unpack_from(self.header, END_OFFSET)[0]
+
+    def _publish(self, end: int) -> None:
+        """Make the records up to end visible to readers; only with the writer lock held"""
+        sequence = COUNTER.unpack_from(self.header, SEQUENCE_OFFSET)[0]
+        COUNTER.pack_into(self.header, SEQUENCE_OFFSET, sequence + 1)
+        COUNTER.pack_into(self.header, END_OFFSET, end)
+        COUNTER.pack_into(self.header, SEQUENCE_OFFSET, sequence + 2)
+
+    async def catch_up(self) -> None:
+        """Add the claims other workers committed since the last read to this worker's store"""
+        if not self._caught_up():
+            await asyncio.to_thread(self._catch_up)
+
+    def _catch_up(self) -> None:
+        """catch_up itself, which waits for the write lock and reads the file"""
+        with self._write_lock:
+            self._read_committed()
+
+    def _read_committed(self) -> None:
+        """Add the committed records past read_end; only with the write lock held"""
+        end = self._committed_end()
+        while self.read_end < end:
+            data = os.pread(self.fd, min(end - self.read_end, CATCH_UP_BYTES), self.read_end)
+            records, offset = [], 0
+            while offset + RECORD_LENGTH.size <= len(data):
+                (length,) = RECORD_LENGTH.unpack_from(data, offset)
+                start = offset + RECORD_LENGTH.size
+                if start + length > len(data):
+                    break
+                records.append(data[start:start + length])
+                offset = start + length
+            if not records:
+                # A single record larger than the read
+                (length,) = RECORD_LENGTH.unpack_from(data)
+                records = [os.pread(self.fd, length, self.read_end + RECORD_LENGTH.size)]
+                offset = RECORD_LENGTH.size + length
+            self.read_end += offset
+            self._add_records(records)
+
+    def _write(self, records: List[bytes]) -> None:
+        """Append records after the committed end and publish them; only with the writer lock held"""
+        if not records:
+            return
+        payload = memoryview(b"".join(RECORD_LENGTH.pack(len(record)) + record for record in records))
+        written = 0
+        while written < len(payload):
+            written += os.pwrite(self.fd, payload[written:], self.read_end + written)
+        self.read_end += len(payload)
+        self._publish(self.read_end)
+
+    async def add_many(self, claims: List[RoutingDecision]) -> List[Tuple[RoutingDecision, bool]]:
+        """Catches up and stores the claims new to every worker, all under the writer lock, on another thread"""
+        return await asyncio.to_thread(self._add_many, claims)
+
+    def _add_many(self, claims: List[RoutingDecision]) -> List[Tuple[RoutingDecision, bool]]:
+        with self._write_lock, self._locked():
+            self._repair()
+            self._read_committed()
+            start = len(self.claim_tiers)
+            try:
+                results = super()._add_many(claims)
+            finally:
+                # Claims stored before one that failed are shared all the same
+                self._write(self.claim_tiers.encodings_at(range(start, len(self.claim_tiers))))
+        return results
+
+    async def find_existing(self, claim_id: str) -> Optional[RoutingDecision]:
+        await self.catch_up()
+        return await super().find_existing(claim_id)
+
+    async def get(self, claim_id: str) -> Optional[RoutingDecision]:
+        await self.catch_up()
+        return await super().get(claim_id)
+
+    async def get_json(self, claim_id: str) -> Optional[bytes]:
+        await self.catch_up()
+        return await super().get_json(claim_id)
+
+    async def get_all(self, team: Optional[str] = None) -> List[RoutingDecision]:
+        await self.catch_up()
+        return await super().get_all(team)
+
+    async def count(self, team: Optional[str] = None) -> int:
+        await self.catch_up()
+        return await super().count(team)
+
+    async def version(self, team: Optional[str] = None) -> str:
+        await self.catch_up()
+        return await super().version(team)
+
+    async def query(self, query: ClaimQuery) -> Tuple[List[RoutingDecision], Optional[str]]:
+        await self.catch_up()
+        return await super().query(query)
+
+    async def query_json(self, query: ClaimQuery) -> Tuple[bytes, Optional[str]]:
+        await self.catch_up()
+        return await super().query_json(query)
+
+    async def export_json(self, query: ClaimQuery) -> AsyncIterator[List[bytes]]:
+        await self.catch_up()
+        async for encodings in super().export_json(query):
+            yield encodings
@@ -0,0 +1,370 @@
+import asyncio
+import os
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, TypeVar
+from pydantic_core import from_json
+from app.models.claim import RoutingDecision, ClaimQuery
+from app.modules.claim_backend import (
+    ClaimBackend, EXPORT_CHUNK_SIZE, SUMMARY_FIELDS, claim_list_adapter, encode, json_array, parse_fields, summarize
+)
+from app.modules.claim_index import (
+    NO_AMOUNT, URGENCY_ORDER, URGENCY_RANK, decode_cursor, encode_cursor, parse_claim_date
+)
+
+T = TypeVar("T")
+
+# Claim IDs looked up per statement when checking a batch for stored claims
+ID_LOOKUP_CHUNK = 500
+BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS claims (
+        seq INTEGER PRIMARY KEY,
+        claim_id TEXT UNIQUE NOT NULL,
+        assigned_team TEXT NOT NULL,
+        urgency TEXT NOT NULL,
+        urgency_rank INTEGER NOT NULL,
+        customer_value TEXT NOT NULL,
+        is_potential_fraud INTEGER NOT NULL,
+        risk_score REAL NOT NULL,
+        claim_date TEXT,
+        claim_json BLOB NOT NULL,
+        summary_json BLOB NOT NULL,
+        claim_amount REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS claims_by_team ON claims (assigned_team, seq)",
+    "CREATE INDEX IF NOT EXISTS claims_by_urgency ON claims (urgency_rank, seq)",
+    "CREATE INDEX IF NOT EXISTS claims_by_risk ON claims (risk_score DESC, seq)",
+    "CREATE INDEX IF NOT EXISTS claims_by_date ON claims (claim_date)",
+    "CREATE INDEX IF NOT EXISTS claims_by_amount ON claims (claim_amount DESC, seq)",
+    # Team dashboards sorted by risk or urgency read these in order instead of sorting the team's claims
+    "CREATE INDEX IF NOT EXISTS claims_by_team_risk ON claims (assigned_team, risk_score DESC, seq)",
+    "CREATE INDEX IF NOT EXISTS claims_by_team_urgency ON claims (assigned_team, urgency_rank, seq)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+]
+
+# claim_amount holds the claim amount paid, NO_AMOUNT for claims without one; databases
+# created before it existed get it filled in from the stored claims
+ADD_CLAIM_AMOUNT = [
+    f"ALTER TABLE claims ADD COLUMN claim_amount REAL NOT NULL DEFAULT {NO_AMOUNT!r}",
+    "UPDATE claims SET claim_amount = json_extract(CAST(claim_json AS TEXT), '$.claim_data.claim_amount_paid') "
+    "WHERE json_extract(CAST(claim_json AS TEXT), '$.claim_data.claim_amount_paid') IS NOT NULL",
+]
+
+INSERT_CLAIM = (
+    "INSERT INTO claims (claim_id, assigned_team, urgency, urgency_rank, customer_value, is_potential_fraud, "
+    "risk_score, claim_date, claim_json, summary_json, claim_amount) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# ORDER BY clause of each sort order; the cursor key is (sort column, seq) or (seq,)
+SORT_ORDER = {
+    "submitted": "seq",
+    "risk": "risk_score DESC, seq",
+    "urgency": "urgency_rank, seq",
+    "amount": "claim_amount DESC, seq",
+}
+
+
+class SQLiteClaimBackend(ClaimBackend):
+    """
+    Claims stored in a SQLite database in WAL mode
+
+    Each claim is one row holding its JSON encoding and summary encoding, next
+    to the columns the dashboard filters and sorts on, which are indexed. Since
+    WAL readers do not block the writer, several uvicorn workers can share one
+    database file. Batches of claims are inserted in one transaction with one
+    prepared statement, and sqlite3 keeps the prepared query statements cached
+    on the connection.
+
+    Every statement runs on a thread of the store's own, one at a time, so a
+    write waiting up to BUSY_TIMEOUT_MS for another worker's transaction does
+    not stall the event loop, and calls never interleave on the shared
+    connection.
+
+    Claims are stored for good, so the epoch is kept in the database and ETags
+    stay valid across restarts and workers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._epoch: Optional[str] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        """Run func(*args) on the store's thread"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="claim-sqlite")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Open the database on first use"""
+        if self._connection is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None, cached_statements=256
+            )
+            connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            connection.execute("PRAGMA journal_mode=WAL")
+            # With WAL, NORMAL only skips the fsync on commit; a crash of the process loses nothing
+            connection.execute("PRAGMA synchronous=NORMAL")
+            _add_claim_amount(connection)
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.execute("INSERT OR IGNORE INTO meta VALUES ('epoch', ?)", (uuid.uuid4().hex[:8],))
+            self._connection = connection
+        return self._connection
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            await self._run(self._close)
+            self._executor.shutdown()
+            self._executor = None
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def add_many(self, claims: List[RoutingDecision]) -> List[Tuple[RoutingDecision, bool]]:
+        return await self._run(self._add_many, claims)
+
+    def _add_many(self, claims: List[RoutingDecision]) -> List[Tuple[RoutingDecision, bool]]:
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            stored = self._find_many([claim.claim_id for claim in claims])
+            results, rows = [], []
+            for claim in claims:
+                existing = stored.get(claim.claim_id)
+                if existing is not None:
+                    results.append((existing, False))
+                    continue
+                stored[claim.claim_id] = claim
+                rows.append(_row(claim))
+                results.append((claim, True))
+            connection.executemany(INSERT_CLAIM, rows)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return results
+
+    def _find_many(self, claim_ids: List[str]) -> Dict[str, RoutingDecision]:
+        """Get the stored claims among the given IDs"""
+        found = {}
+        for start in range(0, len(claim_ids), ID_LOOKUP_CHUNK):
+            chunk = claim_ids[start:start + ID_LOOKUP_CHUNK]
+            rows = self.connection.execute(
+                f"SELECT claim_id, claim_json FROM claims WHERE claim_id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for claim_id, claim_json in rows:
+                found[claim_id] = RoutingDecision.model_validate_json(claim_json)
+        return found
+
+    async def get(self, claim_id: str) -> Optional[RoutingDecision]:
+        encoded = await self.get_json(claim_id)
+        return RoutingDecision.model_validate_json(encoded) if encoded is not None else None
+
+    async def get_json(self, claim_id: str) -> Optional[bytes]:
+        row = await self._run(self._fetchone, "SELECT claim_json FROM claims WHERE claim_id = ?", (claim_id,))
+        return row[0] if row is not None else None
+
+    async def get_all(self, team: Optional[str] = None) -> List[RoutingDecision]:
+        if team is None:
+            rows = await self._run(self._fetchall, "SELECT claim_json FROM claims ORDER BY seq")
+        else:
+            rows = await self._run(
+                self._fetchall, "SELECT claim_json FROM claims WHERE assigned_team = ? ORDER BY seq", (team,)
+            )
+        return claim_list_adapter.validate_json(json_array([row[0] for row in rows]))
+
+    async def count(self, team: Optional[str] = None) -> int:
+        if team is None:
+            return (await self._run(self._fetchone, "SELECT COUNT(*) FROM claims"))[0]
+        return (await self._run(self._fetchone, "SELECT COUNT(*) FROM claims WHERE assigned_team = ?", (team,)))[0]
+
+    async def version(self, team: Optional[str] = None) -> str:
+        # seq only grows, so the latest seq (of the team) changes exactly when claims are added
+        if team is None:
+            latest = (await self._run(self._fetchone, "SELECT MAX(seq) FROM claims"))[0]
+        else:
+            latest = (await self._run(
+                self._fetchone, "SELECT MAX(seq) FROM claims WHERE assigned_team = ?", (team,)
+            ))[0]
+        return f"{await self.epoch()}-{latest or 0}"
+
+    async def epoch(self) -> str:
+        if self._epoch is None:
+            self._epoch = (await self._run(self._fetchone, "SELECT value FROM meta WHERE key = 'epoch'"))[0]
+        return self._epoch
+
+    def _fetchone(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        return self.connection.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql: str, params: tuple = ()) -> List[tuple]:
+        return self.connection.execute(sql, params).fetchall()
+
+    async def query(self, query: ClaimQuery) -> Tuple[List[RoutingDecision], Optional[str]]:
+        content, next_cursor = await self.query_json(query.model_copy(update={"view": "full", "fields": None}))
+        return claim_list_adapter.validate_json(content), next_cursor
+
+    async def query_json(self, query: ClaimQuery) -> Tuple[bytes, Optional[str]]:
+        fields = parse_fields(query.fields) if query.fields else None
+        encodings, next_cursor = await self._run(self._page, query, fields)
+        return json_array(encodings), next_cursor
+
+    async def export_json(self, query: ClaimQuery) -> AsyncIterator[List[bytes]]:
+        # Read page by page rather than through one open cursor, so that the shared
+        # connection can still start write transactions between chunks
+        fields = parse_fields(query.fields) if query.fields else None
+        query = query.model_copy(update={"limit": EXPORT_CHUNK_SIZE, "cursor": None})
+        while True:
+            encodings, next_cursor = await self._run(self._page, query, fields)
+            yield encodings
+            if next_cursor is None:
+                return
+            query = query.model_copy(update={"cursor": next_cursor})
+
+    def _page(self, query: ClaimQuery, fields: Optional[List[str]]) -> Tuple[List[bytes], Optional[str]]:
+        """Encodings of one page of claims matching the query and the cursor for the next page"""
+        sql, params = self._select(query, _encoding_column(query, fields))
+        rows = self.connection.execute(f"{sql} LIMIT ?", [*params, query.limit + 1]).fetchall()
+
+        next_cursor = None
+        if len(rows) > query.limit:
+            rows = rows[:query.limit]
+            next_cursor = _cursor(query.sort, rows[-1])
+        return _project([row[4] for row in rows], fields), next_cursor
+
+    def _select(self, query: ClaimQuery, column: str) -> Tuple[str, list]:
+        """
+        SELECT statement and parameters for the claims matching the query, in its
+        sort order, starting after its cursor; rows are (seq, risk_score, urgency_rank, claim_amount, column)
+        Pages are read with keyset pagination on the sort key, so a page costs
+        the same however deep into the results it is
+        """
+        after = decode_cursor(query.sort, query.cursor) if query.cursor else None
+        clauses, params = [], []
+
+        for column_name, value in [
+            ("assigned_team", query.team),
+            ("customer_value", query.customer_value),
+        ]:
+            if value is not None:
+                clauses.append(f"{column_name} = ?")
+                params.append(value)
+        if query.urgency is not None:
+            clauses.append("urgency_rank = ? AND urgency = ?")
+            params.extend([URGENCY_RANK.get(query.urgency, len(URGENCY_ORDER)), query.urgency])
+        if query.is_potential_fraud is not None:
+            clauses.append("is_potential_fraud = ?")
+            params.append(int(query.is_potential_fraud))
+        if query.min_risk is not None:
+            clauses.append("risk_score >= ?")
+            params.append(query.min_risk)
+        if query.max_risk is not None:
+            clauses.append("risk_score <= ?")
+            params.append(query.max_risk)
+        if query.min_amount is not None:
+            clauses.append("claim_amount >= ?")
+            params.append(query.min_amount)
+        if query.max_amount is not None:
+            clauses.append("claim_amount <= ? AND claim_amount > ?")
+            params.extend([query.max_amount, NO_AMOUNT])
+        if query.date_from is not None:
+            clauses.append("claim_date >= ?")
+            params.append(query.date_from.isoformat())
+        if query.date_to is not None:
+            clauses.append("claim_date <= ?")
+            params.append(query.date_to.isoformat())
+
+        if after is not None:
+            if query.sort == "submitted":
+                clauses.append("seq > ?")
+                params.append(after[0])
+            elif query.sort == "risk":
+                # The leading range lets SQLite start the scan of the risk index at the cursor
+                clauses.append("risk_score <= ? AND (risk_score < ? OR seq > ?)")
+                params.extend([-after[0], -after[0], after[1]])
+            elif query.sort == "amount":
+                clauses.append("claim_amount <= ? AND (claim_amount < ? OR seq > ?)")
+                params.extend([-after[0], -after[0], after[1]])
+            else:
+                clauses.append("urgency_rank >= ? AND (urgency_rank > ? OR seq > ?)")
+                params.extend([after[0], after[0], after[1]])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return (
+            f"SELECT seq, risk_score, urgency_rank, claim_amount, {column} FROM claims {where} ORDER BY {SORT_ORDER[query.sort]}",
+            params
+        )
+
+
+def _encoding_column(query: ClaimQuery, fields: Optional[List[str]]) -> str:
+    """Stored encoding that a page is built from: summaries for the summary view and summary field projections"""
+    if fields is None:
+        return "summary_json" if query.view == "summary" else "claim_json"
+    return "summary_json" if SUMMARY_FIELDS.issuperset(fields) else "claim_json"
+
+
+def _project(encodings: List[bytes], fields: Optional[List[str]]) -> List[bytes]:
+    """Project stored claim or summary encodings (see _encoding_column) to the requested fields"""
+    if fields is None:
+        return encodings
+    if SUMMARY_FIELDS.issuperset(fields):
+        return [encode({field: summary[field] for field in fields}) for summary in map(from_json, encodings)]
+    include = set(fields)
+    return [
+        claim.model_dump_json(include=include).encode()
+        for claim in claim_list_adapter.validate_json(json_array(encodings))
+    ]
+
+
+def _add_claim_amount(connection: sqlite3.Connection) -> None:
+    """Add the claim_amount column to a claims table created without it"""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(claims)")]
+        if columns and "claim_amount" not in columns:
+            for statement in ADD_CLAIM_AMOUNT:
+                connection.execute(statement)
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+
+
+def _cursor(sort: str, row: tuple) -> str:
+    """Cursor after the row (seq, risk_score, urgency_rank, claim_amount, ...)"""
+    seq, risk_score, urgency_rank, claim_amount = row[:4]
+    if sort == "risk":
+        return encode_cursor(sort, (-risk_score, seq))
+    if sort == "amount":
+        return encode_cursor(sort, (-claim_amount, seq))
+    if sort == "urgency":
+        return encode_cursor(sort, (urgency_rank, seq))
+    return encode_cursor(sort, (seq,))
+
+
+def _row(claim: RoutingDecision) -> tuple:
+    """Column values of a claim, in INSERT_CLAIM order"""
+    claim_date = parse_claim_date(claim.claim_data.claim_date)
+    return (
+        claim.claim_id,
+        claim.assigned_team,
+        claim.urgency,
+        URGENCY_RANK.get(claim.urgency, len(URGENCY_ORDER)),
+        claim.customer_value,
+        int(claim.is_potential_fraud),
+        claim.risk_score,
+        claim_date.isoformat() if claim_date is not None else None,
+        claim.model_dump_json().encode(),
+        encode(summarize(claim)),
+        claim.claim_data.claim_amount_paid if claim.claim_data.claim_amount_paid is not None else NO_AMOUNT,
+    )
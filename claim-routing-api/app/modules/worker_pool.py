@@ -0,0 +1,116 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, BrokenExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app import config
+
+T = TypeVar("T")
+
+
+class WorkerPoolFull(Exception):
+    """Raised when a job is submitted while all workers are busy and the queue is full"""
+
+
+class RoutingWorkerPool:
+    """
+    Bounded worker pool for CPU-bound claim processing
+
+    Runs spaCy extraction, scoring and ML inference outside the asyncio event loop
+    so that slow claims do not stall other requests. At most max_workers jobs run
+    at once and at most max_queue more wait for a worker; beyond that, submissions
+    are rejected with WorkerPoolFull. A job holds its capacity until it has run,
+    even if the caller stops waiting for it.
+
+    kind is "thread" or "process". Functions run in a process pool must be
+    importable module-level callables and their arguments and results picklable.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown worker pool kind: {kind}")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self.pending = 0
+        self.waiting = 0
+        self.capacity = max(max_workers, 1) + max_queue
+        self._executor: Optional[Executor] = None
+        self._capacity = asyncio.Semaphore(self.capacity)
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        """Create the executor on first use"""
+        if self._executor is None and self.max_workers > 0:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="claim-routing")
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any, wait: bool = False) -> T:
+        """
+        Run func(*args) on a worker and return its result
+
+        With wait=False a full pool raises WorkerPoolFull immediately; with wait=True
+        the caller waits for capacity instead (used by streaming ingestion, where
+        waiting is the backpressure).
+        """
+        if not wait and self._capacity.locked():
+            raise WorkerPoolFull("All routing workers are busy")
+
+        self.waiting += 1
+        try:
+            await self._capacity.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.pending += 1
+        executor = self.executor
+        if executor is None:
+            try:
+                return func(*args)
+            finally:
+                self._release()
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the job is done, not when the caller stops waiting: a cancelled
+        # caller cancels a job still queued, but one already running goes on
+        future.add_done_callback(lambda _: self._release_from(loop))
+        try:
+            return await asyncio.wrap_future(future, loop=loop)
+        except BrokenExecutor:
+            # A worker process died; start a fresh pool for the next jobs
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False)
+            raise
+
+    def _release(self) -> None:
+        """Give back the capacity taken by a job; only on the event loop"""
+        self.pending -= 1
+        self._capacity.release()
+
+    def _release_from(self, loop: asyncio.AbstractEventLoop) -> None:
+        """_release, from the thread that finished the job"""
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # The loop is closed, so nothing waits for capacity any more
+            pass
+
+    def shutdown(self) -> None:
+        """Stop the workers once running jobs have finished"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+routing_pool = RoutingWorkerPool(config.ROUTING_WORKERS, config.ROUTING_QUEUE_LIMIT, config.ROUTING_POOL)
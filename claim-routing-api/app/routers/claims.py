@@ -1,16 +1,51 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any, Optional
+import asyncio
+import hashlib
+from fastapi import APIRouter, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from starlette.types import Scope, Receive, Send
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Annotated
 
-from app.models.claim import ClaimInput, RoutingDecision
-from app.modules.claim_extractor import ClaimExtractor
-from app.modules.routing_engine import RoutingEngine
+from app import config
+from app.models.claim import (
+    ClaimInput, AsyncClaimInput, ClaimJob, RoutingDecision, BatchClaimResult, ClaimQuery,
+    ClaimExportQuery, ClaimAnalyticsQuery, ClaimGroupStats, ClaimStats
+)
 from app.modules.database import ClaimDatabase
+from app.modules.claim_backend import parse_fields
+from app.modules.claim_export import EXPORT_FORMATS, export_claims
+from app.modules.pipeline import ClaimPipeline, MAX_NDJSON_LINE_BYTES
+from app.modules.worker_pool import routing_pool, WorkerPoolFull
+from app.modules.admission import admission_controller, Overloaded
+from app.modules.job_queue import claim_jobs, JobQueueFull, check_callback_url
+from app.modules.dedupe import claim_key
+from app.modules.claim_feed import claim_feed
 
 router = APIRouter()
 
+MAX_BATCH_SIZE = 10000
+NDJSON_CHUNK_SIZE = 500
+FEED_RETRY_MS = 3000
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streaming response whose body iterator reads the request body itself
+    
+    StreamingResponse normally listens for client disconnects by reading from
+    the ASGI receive channel, which would swallow the request body messages.
+    Here the body iterator owns that channel and sees disconnects through
+    request.stream() instead.
+    """
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        
+        if self.background is not None:
+            await self.background()
+
 
 @router.post("/submit-claim", response_model=RoutingDecision)
-async def submit_claim(claim_input: ClaimInput) -> RoutingDecision:
+async def submit_claim(claim_input: ClaimInput, response: Response) -> RoutingDecision:
     """
     Submit a new insurance claim for processing and routing
     
@@ -19,44 +54,418 @@ async def submit_claim(claim_input: ClaimInput) -> RoutingDecision:
     - Analyzes the claim for urgency, risk, and customer value
     - Routes the claim to the appropriate team
     - Returns the routing decision with explanation
+    - Is idempotent: resubmitting a claim (same CLAIM_ID, or same content when
+      there is no ID) returns the stored decision with Idempotent-Replayed: true
+    - Under heavy load, routes with business rules only, then answers 503
+      with Retry-After
     """
+    input_data = claim_input.dict()
+    existing = await ClaimDatabase.find_existing(claim_key(input_data))
+    if existing is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return existing
+    
     try:
-        claim_data = ClaimExtractor.extract(claim_input.dict())
+        degraded = admission_controller.admit()
+        routing_decision = await routing_pool.run(ClaimPipeline.route_input, input_data, degraded)
         
-        routing_decision = RoutingEngine.route_claim(claim_data)
-        
-        ClaimDatabase.add_claim(routing_decision)
+        routing_decision = await ClaimDatabase.add_claim(routing_decision)
+        await ClaimDatabase.wait_durable()
         
         return routing_decision
+    except (Overloaded, WorkerPoolFull) as e:
+        raise _overloaded_error(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
+@router.post("/submit-claim/async", response_model=ClaimJob, status_code=202)
+async def submit_claim_async(claim_input: AsyncClaimInput, response: Response) -> ClaimJob:
+    """
+    Submit a new insurance claim for processing in the background
+    
+    - Returns 202 with a job ID as soon as the claim is queued
+    - Poll /jobs/{job_id} for the routing decision, or pass callback_url to
+      have the finished job POSTed to it
+    - Queued jobs are stored on disk and survive a crash or restart
+    """
+    if not claim_input.text and not claim_input.structured_data:
+        raise HTTPException(status_code=400, detail="Input must contain either 'text' or 'structured_data'")
+    if claim_input.callback_url:
+        try:
+            await check_callback_url(claim_input.callback_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        job = await claim_jobs.submit(claim_input.dict(exclude={"callback_url"}), claim_input.callback_url)
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(config.ADMISSION_RETRY_AFTER_SECONDS)}
+        )
+    
+    response.headers["Location"] = f"/jobs/{job.job_id}"
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=ClaimJob)
+async def get_job(job_id: str) -> ClaimJob:
+    """Get the status of an asynchronously submitted claim, with its routing decision once done"""
+    job = await claim_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
+    
+    return job
+
+
+@router.post("/submit-claims", response_model=List[BatchClaimResult])
+async def submit_claims(claim_inputs: List[ClaimInput]) -> List[BatchClaimResult]:
+    """
+    Submit many insurance claims for processing and routing in one request
+    
+    - Runs extraction, scoring and ML inference once over the whole batch
+    - Returns one result per claim, in input order
+    - A claim that cannot be processed gets an error instead of a decision;
+      the rest of the batch is still routed and stored
+    - Claims that are already stored, or repeated within the batch, are not
+      routed again and get the stored decision
+    """
+    if len(claim_inputs) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds the maximum of {MAX_BATCH_SIZE} claims")
+    
+    results = [BatchClaimResult(index=i) for i in range(len(claim_inputs))]
+    new_items = []
+    repeats = []
+    first_index: Dict[str, int] = {}
+    for i, claim_input in enumerate(claim_inputs):
+        input_data = claim_input.dict()
+        key = claim_key(input_data)
+        existing = await ClaimDatabase.find_existing(key)
+        if existing is not None:
+            results[i].decision = existing
+        elif key in first_index:
+            repeats.append((i, first_index[key]))
+        else:
+            first_index[key] = i
+            new_items.append((i, input_data))
+    
+    try:
+        if new_items:
+            degraded = admission_controller.admit()
+            for result in await _store_results(await routing_pool.run(ClaimPipeline.route_batch, new_items, degraded)):
+                results[result.index] = result
+            await ClaimDatabase.wait_durable()
+        
+        for i, first in repeats:
+            results[i] = results[first].model_copy(update={"index": i})
+        
+        return results
+    except (Overloaded, WorkerPoolFull) as e:
+        raise _overloaded_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.post("/submit-claims/stream")
+async def submit_claims_stream(request: Request) -> StreamingResponse:
+    """
+    Submit a stream of insurance claims as NDJSON (one ClaimInput per line)
+    
+    - Reads the request body incrementally and routes claims in chunks of
+      NDJSON_CHUNK_SIZE as they arrive
+    - Streams one result line per claim back as NDJSON, in input order
+    - The body is only read as fast as results are consumed, so memory use
+      stays flat regardless of upload size
+    - Under heavy load, chunks are routed with business rules only; chunks
+      wait for capacity rather than being rejected
+    """
+    return NDJSONStreamingResponse(_stream_batch_results(request), media_type="application/x-ndjson")
+
+
+async def _read_ndjson_lines(request: Request) -> AsyncIterator[Optional[bytes]]:
+    """
+    Yield the lines of an NDJSON request body as they arrive
+    Lines longer than MAX_NDJSON_LINE_BYTES are skipped and yielded as None
+    """
+    buffer = b""
+    oversized = False
+    
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if oversized:
+                oversized = False
+                yield None
+            else:
+                yield line
+        if len(buffer) > MAX_NDJSON_LINE_BYTES:
+            oversized = True
+            buffer = b""
+    
+    if oversized:
+        yield None
+    elif buffer:
+        yield buffer
+
+
+async def _stream_batch_results(request: Request) -> AsyncIterator[bytes]:
+    """Route NDJSON claims from the request body chunk by chunk, yielding result lines"""
+    chunk = []
+    index = 0
+    
+    async for line in _read_ndjson_lines(request):
+        if line is not None and not line.strip():
+            continue
+        chunk.append((index, line))
+        index += 1
+        if len(chunk) >= NDJSON_CHUNK_SIZE:
+            yield await _route_ndjson_chunk(chunk)
+            chunk = []
+    
+    if chunk:
+        yield await _route_ndjson_chunk(chunk)
+
+
+async def _route_ndjson_chunk(lines: List[Tuple[int, Optional[bytes]]]) -> bytes:
+    """Route and store one chunk of (index, line) pairs and return the NDJSON result lines"""
+    degraded = admission_controller.admit(can_shed=False)
+    results = await _store_results(await routing_pool.run(ClaimPipeline.route_ndjson_lines, lines, degraded, wait=True))
+    await ClaimDatabase.wait_durable()
+    
+    return b"".join(result.model_dump_json().encode() + b"\n" for result in results)
+
+
 @router.get("/adjuster-dashboard", response_model=List[RoutingDecision])
-async def adjuster_dashboard(team: Optional[str] = None) -> List[RoutingDecision]:
+async def adjuster_dashboard(
+    query: Annotated[ClaimQuery, Query()], request: Request
+) -> Response:
     """
-    Get all claims for the adjuster dashboard
+    Get a page of claims for the adjuster dashboard
     
-    - Returns all claims if no team is specified
-    - Returns claims for a specific team if team parameter is provided
+    - Filters by team, urgency, customer value, fraud flag, risk score range
+      and claim date range; all filters are combined
+    - Sorts by submission order (default), risk (riskiest first) or urgency
+      (most urgent first)
+    - Returns at most `limit` claims; when more claims match, the
+      X-Next-Cursor response header holds the cursor for the next page
+    - view=summary returns compact records (ID, team, urgency, risk, value and
+      fraud flag); fields=a,b,c returns only the listed fields and overrides view
+    - Supports conditional requests: the ETag changes only when claims are
+      added (for the filtered team, if any), and If-None-Match answers 304
     """
-    if team:
-        claims = ClaimDatabase.get_claims_by_team(team)
-    else:
-        claims = ClaimDatabase.get_all_claims()
+    query_hash = hashlib.sha1(str(sorted(request.query_params.multi_items())).encode()).hexdigest()[:16]
+    etag = f'W/"{await ClaimDatabase.get_version(query.team)}-{query_hash}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    
+    try:
+        content, next_cursor = await ClaimDatabase.query_claims_json(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    
+    # Stored claims are already encoded; returning a Response skips response_model serialization
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+@router.get("/adjuster-dashboard/export")
+async def export_dashboard(query: Annotated[ClaimQuery, Query()]) -> StreamingResponse:
+    """
+    Export every claim matching the dashboard filters as NDJSON
+    
+    - Takes the same filters, sort, view and fields as /adjuster-dashboard,
+      but streams all matching claims instead of one page; limit and cursor
+      are ignored
+    - Claims are read from the store in chunks while the response is sent,
+      so large exports are never held in memory at once
+    """
+    try:
+        if query.fields:
+            parse_fields(query.fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(_stream_export(query), media_type="application/x-ndjson")
+
+
+async def _stream_export(query: ClaimQuery) -> AsyncIterator[bytes]:
+    """Yield the NDJSON lines of a dashboard export, one chunk of claims at a time"""
+    async for encodings in ClaimDatabase.export_claims_json(query):
+        if encodings:
+            yield b"\n".join(encodings) + b"\n"
+
+
+@router.get("/claims/export")
+async def export_claims_file(query: Annotated[ClaimExportQuery, Query()]) -> StreamingResponse:
+    """
+    Export every claim matching the dashboard filters as CSV or Parquet, for reporting
+    
+    - Takes the same filters and sort as /adjuster-dashboard; limit, cursor,
+      view and fields are ignored
+    - One row per claim, with the claim data flattened into columns
+    - Streams the file in chunks of claims, one Parquet row group each, so
+      memory use does not grow with the number of claims
+    - format=parquet needs pyarrow on the server (501 otherwise)
+    """
+    try:
+        export = EXPORT_FORMATS[query.format]()
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    headers = {"Content-Disposition": f'attachment; filename="claims.{export.extension}"'}
+    return StreamingResponse(export_claims(query, export), media_type=export.media_type, headers=headers)
+
+
+@router.get("/analytics", response_model=List[ClaimGroupStats])
+async def claim_analytics(query: Annotated[ClaimAnalyticsQuery, Query()]) -> List[Dict[str, Any]]:
+    """
+    Aggregate stored claims per team, urgency, customer value, region, brand or warranty
     
-    return claims
+    - For each group: claim count, fraud rate, mean risk score, total claim
+      amount and claim amount p50/p90/p99, largest groups first
+    - Filters by team, region, brand, warranty, fraud flag, claim amount range
+      and claim date range; all filters are combined
+    - Runs as vectorized NumPy operations over a columnar mirror of the
+      stored claims, which only the in-memory store keeps (501 otherwise)
+    """
+    try:
+        return await ClaimDatabase.get_group_stats(query)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+
+@router.get("/stats", response_model=ClaimStats)
+async def claim_stats(request: Request, response: Response) -> Any:
+    """
+    Running totals of the stored claims for ops dashboards
+    
+    - Overall and per team, urgency, customer value, region and fraud flag:
+      claim and fraud counts, and claim amount count, sum, min and max
+    - Kept up to date as claims are stored, so the cost does not grow with
+      the number of claims; only the in-memory store keeps them (501 otherwise)
+    - Supports conditional requests like /adjuster-dashboard: the ETag
+      changes only when claims are added
+    """
+    # Read the version first, so that the ETag never claims newer totals than the ones sent
+    etag = f'W/"{await ClaimDatabase.get_version()}-stats"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    try:
+        stats = await ClaimDatabase.get_stats()
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return stats
+
+
+@router.get("/adjuster-dashboard/stream")
+async def adjuster_dashboard_stream(team: Optional[str] = None) -> StreamingResponse:
+    """
+    Live feed of newly routed claims as Server-Sent Events
+    
+    - Sends a `claim` event with the RoutingDecision JSON for every claim stored
+      from now on, for one team or for all teams if no team is given
+    - Sends keep-alive comments while no claims arrive
+    - A client that falls too far behind receives a `dropped` event and the
+      stream ends; it should reconnect and reload the dashboard
+    """
+    return StreamingResponse(
+        _stream_claim_feed(team),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _stream_claim_feed(team: Optional[str]) -> AsyncIterator[str]:
+    """Yield Server-Sent Events for the claims published to a feed subscription"""
+    subscription = claim_feed.subscribe(team)
+    try:
+        yield f"retry: {FEED_RETRY_MS}\n\n"
+        while True:
+            try:
+                payload = await asyncio.wait_for(subscription.queue.get(), config.FEED_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if subscription.dropped:
+                yield "event: dropped\ndata: {}\n\n"
+                return
+            yield f"event: claim\ndata: {payload}\n\n"
+    finally:
+        claim_feed.unsubscribe(subscription)
 
 
 @router.get("/claim/{claim_id}", response_model=RoutingDecision)
-async def get_claim(claim_id: str) -> RoutingDecision:
+async def get_claim(claim_id: str, request: Request) -> Response:
     """
     Get a specific claim by ID
+    
+    Stored claims never change, so the ETag only depends on the claim ID and
+    the store's epoch; If-None-Match with it answers 304 without sending the
+    claim again, once the claim is found
     """
-    claim = ClaimDatabase.get_claim_by_id(claim_id)
-    if not claim:
+    content = await ClaimDatabase.get_claim_json(claim_id)
+    if content is None:
         raise HTTPException(status_code=404, detail=f"Claim with ID {claim_id} not found")
     
-    return claim
+    claim_hash = hashlib.sha1(claim_id.encode()).hexdigest()[:16]
+    etag = f'W/"{await ClaimDatabase.get_epoch()}-{claim_hash}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    
+    return Response(
+        content=content, media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+
+async def _store_results(results: List[BatchClaimResult]) -> List[BatchClaimResult]:
+    """
+    Store the decisions of routed batch results; claims that were already stored get the stored decision
+    A decision that cannot be stored turns into an error for its own result only
+    """
+    routed = [result for result in results if result.decision]
+    try:
+        for result, stored in zip(routed, await ClaimDatabase.add_claims([result.decision for result in routed])):
+            result.decision = stored
+    except Exception:
+        # Store claims one by one so that only the claims that actually fail get an error
+        for result in routed:
+            try:
+                result.decision = await ClaimDatabase.add_claim(result.decision)
+            except Exception as e:
+                result.decision = None
+                result.error = f"An error occurred: {str(e)}"
+    return results
+
+
+def _overloaded_error(error: Exception) -> HTTPException:
+    """503 response for a claim rejected because the system is overloaded"""
+    if isinstance(error, Overloaded):
+        retry_after = error.retry_after
+    else:
+        retry_after = admission_controller.reject().retry_after
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(retry_after)})
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the request's If-None-Match header matches the ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+    
+    return opaque(etag) in {opaque(tag) for tag in if_none_match.split(",")}
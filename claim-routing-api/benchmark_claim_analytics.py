@@ -0,0 +1,125 @@
+"""
+Benchmark for analytical queries over stored claims.
+
+Compares per-group statistics (claim count, fraud rate, mean risk, total
+claim amount and amount quantiles) computed by a Python loop over
+RoutingDecision objects with the same statistics computed over the columnar
+NumPy mirror kept by the in-memory store, with and without filters.
+
+Usage: python benchmark_claim_analytics.py [--claims 1000000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+from benchmark_claim_log import make_claim
+from app.modules.claim_columns import ClaimColumns, CATEGORY_FIELDS, QUANTILES
+
+REPEATS = 5
+REGIONS = ["Milan", "Rome", "Naples", "Turin", "Florence", "Bologna"]
+BRANDS = ["BMW", "Fiat", "Audi", "Toyota", "Ford"]
+
+
+def make_claims(count: int) -> list:
+    rng = random.Random(2)
+    claims = []
+    for i in range(count):
+        claim = make_claim(rng, i)
+        claim.claim_data.claim_region = rng.choice(REGIONS)
+        claim.claim_data.vehicle_brand = rng.choice(BRANDS)
+        claim.is_potential_fraud = rng.random() < 0.1
+        claims.append(claim)
+    return claims
+
+
+def loop_stats(claims: list, by: str, matches) -> list:
+    """Per-group statistics as a plain loop over RoutingDecision objects"""
+    get = CATEGORY_FIELDS[by]
+    groups = {}
+    for claim in claims:
+        if matches(claim):
+            groups.setdefault(get(claim), []).append(claim)
+    stats = []
+    for group, members in groups.items():
+        amounts = sorted(claim.claim_data.claim_amount_paid for claim in members
+                         if claim.claim_data.claim_amount_paid is not None)
+        stats.append({
+            "group": group,
+            "claims": len(members),
+            "fraud_rate": sum(claim.is_potential_fraud for claim in members) / len(members),
+            "mean_risk_score": sum(claim.risk_score for claim in members) / len(members),
+            "total_claim_amount": sum(amounts),
+            "quantiles": [amounts[int(q * (len(amounts) - 1))] for q in QUANTILES] if amounts else None,
+        })
+    stats.sort(key=lambda group_stats: -group_stats["claims"])
+    return stats
+
+
+def best_of(function) -> float:
+    """Best wall time of REPEATS runs, in milliseconds"""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=1000000)
+    args = parser.parse_args()
+
+    print(f"Generating {args.claims:,} claims...")
+    claims = make_claims(args.claims)
+    columns = ClaimColumns()
+    start = time.perf_counter()
+    columns.add_many(claims)
+    print(f"Built columns in {time.perf_counter() - start:.2f}s "
+          f"({sum(array.nbytes for array in _arrays(columns)) / 2**20:.0f} MiB)")
+
+    date_from, date_to = date(2024, 4, 1), date(2024, 9, 30)
+    cases = [
+        ("team, all claims", "team", lambda claim: True, lambda: None),
+        ("region, all claims", "region", lambda claim: True, lambda: None),
+        (
+            "brand, Milan Apr-Sep > 10k", "brand",
+            lambda claim: (
+                claim.claim_data.claim_region == "Milan"
+                and claim.claim_data.claim_amount_paid > 10000
+                and date_from <= date.fromisoformat(claim.claim_data.claim_date) <= date_to
+            ),
+            lambda: columns.mask({"region": "Milan"}, {"claim_amount": (10000, None)}, date_from, date_to),
+        ),
+    ]
+
+    print(f"{'query':>28}   {'loop (ms)':>10} {'numpy (ms)':>10} {'speedup':>8}")
+    for name, by, matches, mask in cases:
+        # The loop is slow enough that one run is representative
+        start = time.perf_counter()
+        expected = loop_stats(claims, by, matches)
+        loop_ms = (time.perf_counter() - start) * 1000
+        numpy_ms = best_of(lambda: columns.group_stats(by, mask()))
+        stats = columns.group_stats(by, mask())
+        assert [(group["group"], group["claims"]) for group in stats] == \
+            [(group["group"], group["claims"]) for group in expected]
+        print(f"{name:>28}   {loop_ms:>10.1f} {numpy_ms:>10.1f} {loop_ms / numpy_ms:>7.0f}x")
+
+
+def _arrays(columns: ClaimColumns) -> list:
+    arrays = [column.codes.values for column in columns.categories.values()]
+    arrays += [array.values for array in columns.numbers.values()]
+    arrays += [columns.is_potential_fraud.values, columns.claim_day.values]
+    return [np.asarray(array) for array in arrays]
+
+
+if __name__ == "__main__":
+    main()
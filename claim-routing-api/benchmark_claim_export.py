@@ -0,0 +1,100 @@
+"""
+Benchmark for the streaming CSV and Parquet claim exports.
+
+Fills the in-memory store with N claims, then times a full CSV and Parquet
+export written to a temporary file, and reports rows per second and the peak
+memory the export allocated (Python objects traced with tracemalloc, plus
+Arrow buffers for Parquet). For comparison, it measures building the whole
+claim list as one JSON document, as pulling everything through
+/adjuster-dashboard did.
+
+Usage: python benchmark_claim_export.py [--claims 1000000] [--chunk-rows 16384]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from benchmark_claim_log import make_claim
+
+BATCH_SIZE = 1000
+
+
+async def export_to_file(backend, export, chunk_rows: int, path: str) -> int:
+    """Bytes written by a full export of the store"""
+    from app.models.claim import ClaimQuery
+    from app.modules.claim_export import encode_chunks
+
+    size = 0
+    with open(path, "wb") as output:
+        async for data in encode_chunks(backend.export_json(ClaimQuery()), export, chunk_rows):
+            output.write(data)
+            size += len(data)
+    return size
+
+
+async def measure(claims_count: int, chunk_rows: int) -> None:
+    from app.modules.claim_backend import MemoryClaimBackend, claim_list_adapter
+    from app.modules.claim_export import CSVExport, ParquetExport
+
+    rng = random.Random(12)
+    backend = MemoryClaimBackend()
+    for start in range(0, claims_count, BATCH_SIZE):
+        await backend.add_many([make_claim(rng, i) for i in range(start, min(start + BATCH_SIZE, claims_count))])
+
+    exports = [("CSV", CSVExport)]
+    try:
+        import pyarrow
+        exports.append(("Parquet", ParquetExport))
+    except ImportError:
+        print("pyarrow is not installed, Parquet is skipped")
+
+    print(f"{claims_count:,} claims, {chunk_rows:,} per chunk")
+    print(f"{'export':<22} {'seconds':>8} {'rows/s':>10} {'MB written':>10} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, export_class in exports:
+            path = os.path.join(directory, f"claims.{export_class.extension}")
+            start = time.perf_counter()
+            size = await export_to_file(backend, export_class(), chunk_rows, path)
+            seconds = time.perf_counter() - start
+
+            # Memory is measured in a second run, since tracing slows it down
+            tracemalloc.start()
+            if name == "Parquet":
+                pool = pyarrow.default_memory_pool()
+                arrow_before = pool.max_memory()
+            await export_to_file(backend, export_class(), chunk_rows, path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if name == "Parquet":
+                peak += pool.max_memory() - arrow_before
+            print(f"{name:<22} {seconds:>8.1f} {claims_count / seconds:>10,.0f} {size / 1e6:>10.0f} {peak / 1e6:>8.0f}")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = len(claim_list_adapter.dump_json(await backend.get_all()))
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{'one JSON list':<22} {seconds:>8.1f} {claims_count / seconds:>10,.0f} {size / 1e6:>10.0f} {peak / 1e6:>8.0f}")
+    await backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=1000000)
+    parser.add_argument("--chunk-rows", type=int, default=16384)
+    args = parser.parse_args()
+    asyncio.run(measure(args.claims, args.chunk_rows))
+
+
+if __name__ == "__main__":
+    main()
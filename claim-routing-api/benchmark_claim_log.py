@@ -0,0 +1,156 @@
+"""
+Benchmark for the claim write-ahead log.
+
+Measures how much logging adds to ClaimDatabase.add_claim, and how long it
+takes to restore N claims on startup from a snapshot plus a log tail of
+CLAIM_LOG_SNAPSHOT_EVERY claims: with the store state written next to the
+snapshot, and without it, replaying every record of the snapshot. Each
+measurement runs in a fresh interpreter.
+
+Usage: python benchmark_claim_log.py [--claims 1000000]
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+TEAMS = ["Fraud Investigation Team", "Legal Claims Department", "VIP Customer Service",
+         "Standard Claims Processing", "Regional Team - South", "Senior High-Risk Claims"]
+APPENDS = 20000
+
+
+def make_claim(rng: random.Random, i: int):
+    from app.models.claim import ClaimData, RoutingDecision
+    return RoutingDecision(
+        assigned_team=TEAMS[i % len(TEAMS)],
+        urgency=rng.choice(["High", "Medium", "Low"]),
+        risk_score=rng.choice([0.0, 0.3, 0.5, 0.7, 1.0]),
+        customer_value=rng.choice(["VIP", "Premium", "Standard"]),
+        reasoning=["Claim amount > €15,000", "Vehicle brand = BMW"],
+        claim_data=ClaimData(policyholder_age=rng.randint(18, 90), claim_region="Milan",
+                             vehicle_brand="BMW", claim_amount_paid=rng.uniform(500, 30000),
+                             claim_date=f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"),
+        claim_id=f"CLAIM-{i:08d}"
+    )
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def measure_append(directory: str) -> dict:
+    """Time add_claim, with the log open if a directory is given"""
+    from app.modules.database import ClaimDatabase
+
+    if directory:
+        ClaimDatabase.open_log(directory)
+    rng = random.Random(1)
+    claims = [make_claim(rng, i) for i in range(APPENDS)]
+
+    async def add_claims():
+        latencies = []
+        for claim in claims:
+            start = time.perf_counter_ns()
+            await ClaimDatabase.add_claim(claim)
+            latencies.append((time.perf_counter_ns() - start) / 1000)
+        await ClaimDatabase.close()
+        return latencies
+
+    latencies = asyncio.run(add_claims())
+    return {"p50": percentile(latencies, 50), "p99": percentile(latencies, 99)}
+
+
+def write_log(directory: str, claims: int) -> None:
+    """Write a snapshot with the store state next to it, and a log tail, holding the given number of claims"""
+    from app import config
+    from app.modules.claim_backend import MemoryClaimBackend
+
+    rng = random.Random(2)
+    tail = min(claims, config.CLAIM_LOG_SNAPSHOT_EVERY)
+    snapshot_size = claims - tail
+    backend = MemoryClaimBackend()
+    for start in range(0, snapshot_size, APPENDS):
+        batch = [make_claim(rng, i) for i in range(start, min(start + APPENDS, snapshot_size))]
+        asyncio.run(backend.add_many(batch))
+    with gzip.open(Path(directory) / f"snapshot-{snapshot_size:012d}.ndjson.gz", "wb", compresslevel=1) as snapshot:
+        for encoded in backend.claim_tiers.encodings:
+            snapshot.write(encoded + b"\n")
+    if snapshot_size:
+        with open(Path(directory) / f"snapshot-{snapshot_size:012d}.state", "wb") as state:
+            backend._write_state(snapshot_size, state)
+    with open(Path(directory) / f"wal-{snapshot_size:012d}.log", "wb") as segment:
+        for i in range(snapshot_size, claims):
+            segment.write(make_claim(rng, i).model_dump_json().encode() + b"\n")
+
+
+def measure_recovery(directory: str) -> dict:
+    """Time restoring the claims in the log directory"""
+    from app.modules.database import ClaimDatabase
+
+    start = time.perf_counter()
+    restored = ClaimDatabase.open_log(directory)
+    elapsed = time.perf_counter() - start
+    asyncio.run(ClaimDatabase.close())
+    return {"restored": restored, "seconds": elapsed}
+
+
+def run_worker(*args) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", *map(str, args)],
+        capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=1000000)
+    parser.add_argument("--worker", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        task, directory, *rest = args.worker
+        if task == "append":
+            result = measure_append(directory if directory != "-" else "")
+        elif task == "write":
+            write_log(directory, int(rest[0]))
+            result = {}
+        else:
+            result = measure_recovery(directory)
+        print(json.dumps(result))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        without_log = run_worker("append", "-")
+        with_log = run_worker("append", str(Path(directory) / "append"))
+        print(f"add_claim without log: p50 {without_log['p50']:.1f} us   p99 {without_log['p99']:.1f} us")
+        print(f"add_claim with log:    p50 {with_log['p50']:.1f} us   p99 {with_log['p99']:.1f} us")
+
+        recovery_directory = Path(directory) / "recovery"
+        recovery_directory.mkdir()
+        start = time.perf_counter()
+        run_worker("write", recovery_directory, args.claims)
+        print(f"\nWrote a log of {args.claims} claims in {time.perf_counter() - start:.1f} s")
+        result = run_worker("recover", recovery_directory)
+        print(f"Restored {result['restored']} claims in {result['seconds']:.1f} s "
+              f"({result['restored'] / result['seconds']:,.0f} claims/s) with the snapshot's store state")
+        for state in recovery_directory.glob("*.state"):
+            os.remove(state)
+        result = run_worker("recover", recovery_directory)
+        print(f"Restored {result['restored']} claims in {result['seconds']:.1f} s "
+              f"({result['restored'] / result['seconds']:,.0f} claims/s) replaying every record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark for claim lookups as the claim store grows.
+
+Fills the claim store with N claims and measures the latency of
+ClaimDatabase.get_claim_by_id (primary index), a team-filtered dashboard page
+(secondary index) and, for comparison, the linear scan that get_claim_by_id
+used before the primary index. Each size runs in a fresh interpreter.
+
+With --store sqlite, claims are stored in a temporary SQLite database in
+batches of FILL_BATCH, and the linear scan is skipped.
+
+Usage: python benchmark_claim_lookups.py [--sizes 1000 10000 100000 1000000] [--store memory|sqlite]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+TEAMS = ["Fraud Investigation Team", "Legal Claims Department", "VIP Customer Service",
+         "Standard Claims Processing", "Regional Team - South", "Senior High-Risk Claims"]
+LOOKUPS = 10000
+SCAN_LOOKUPS = 20
+FILL_BATCH = 1000
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def timed_us(func, args_list):
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter_ns()
+        await func(*args)
+        latencies.append((time.perf_counter_ns() - start) / 1000)
+    return {"p50": percentile(latencies, 50), "p99": percentile(latencies, 99)}
+
+
+async def run_size(size: int) -> dict:
+    """Fill the database with size claims and time lookups"""
+    from app.models.claim import ClaimData, RoutingDecision, ClaimQuery
+    from app.modules.database import ClaimDatabase, claim_backend
+
+    rng = random.Random(size)
+    start = time.perf_counter()
+    for batch_start in range(0, size, FILL_BATCH):
+        await ClaimDatabase.add_claims([
+            RoutingDecision(
+                assigned_team=TEAMS[i % len(TEAMS)],
+                urgency=rng.choice(["High", "Medium", "Low"]),
+                risk_score=rng.choice([0.0, 0.3, 0.5, 0.7, 1.0]),
+                customer_value=rng.choice(["VIP", "Premium", "Standard"]),
+                reasoning=["Benchmark claim"],
+                claim_data=ClaimData(claim_amount_paid=1000.0),
+                claim_id=f"CLAIM-{i:08d}"
+            )
+            for i in range(batch_start, min(batch_start + FILL_BATCH, size))
+        ])
+    fill_seconds = time.perf_counter() - start
+
+    async def linear_scan(claim_id):
+        for claim in await claim_backend.get_all():
+            if claim.claim_id == claim_id:
+                return claim
+        return None
+
+    ids = [(f"CLAIM-{rng.randrange(size):08d}",) for _ in range(LOOKUPS)]
+    queries = [(ClaimQuery(team=rng.choice(TEAMS), urgency="High", limit=100),) for _ in range(LOOKUPS // 10)]
+    return {
+        "fill_s": fill_seconds,
+        "get_claim_by_id": await timed_us(ClaimDatabase.get_claim_by_id, ids),
+        "missing_id": await timed_us(ClaimDatabase.get_claim_by_id, [("CLAIM-MISSING",)] * LOOKUPS),
+        "team_page": await timed_us(ClaimDatabase.query_claims, queries),
+        "linear_scan": await timed_us(linear_scan, ids[:SCAN_LOOKUPS]) if os.environ["CLAIM_STORE"] == "memory" else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(run_size(args.worker))))
+        return
+
+    print(f"{'claims':>9} {'fill':>8}   {'by id p50/p99 (us)':>20}   {'missing id':>14}"
+          f"   {'team page':>16}   {'linear scan':>18}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, CLAIM_STORE=args.store, CLAIM_DB_PATH=os.path.join(directory, "claims.db"))
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", str(size)],
+                capture_output=True, text=True, check=True, cwd=Path(__file__).parent, env=env
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        def fmt(stats):
+            return f"{stats['p50']:.1f}/{stats['p99']:.1f}" if stats else "-"
+
+        print(f"{size:>9} {result['fill_s']:>7.1f}s   {fmt(result['get_claim_by_id']):>20}   "
+              f"{fmt(result['missing_id']):>14}   {fmt(result['team_page']):>16}   {fmt(result['linear_scan']):>18}")
+
+
+if __name__ == "__main__":
+    main()
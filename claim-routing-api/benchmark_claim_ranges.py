@@ -0,0 +1,116 @@
+"""
+Benchmark for the sorted range indexes of the in-memory claim store.
+
+First inserts claim amounts one at a time into a plain sorted list (insort,
+as the risk index did before) and into SortedIndex, and reports the total
+fill time and the cost of the last inserts. Then fills a ClaimIndex with
+--query-claims claims and times range and top-K dashboard queries against
+filtering and sorting the whole claim list, as they ran before the indexes.
+
+Usage: python benchmark_claim_ranges.py [--sizes 10000 100000 1000000] [--insort-limit 300000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from bisect import insort
+from datetime import date
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from benchmark_claim_log import TEAMS, make_claim, percentile
+
+# Inserts timed one by one at the end of each fill
+TAIL_INSERTS = 1000
+QUERY_RUNS = 50
+
+
+def fill_seconds(size: int, insert) -> tuple:
+    """Seconds to insert size random amount pairs, and the p50 latency of the last inserts in microseconds"""
+    rng = random.Random(2)
+    pairs = [(-rng.uniform(500, 30000), position) for position in range(size)]
+    start = time.perf_counter()
+    for pair in pairs[:-TAIL_INSERTS]:
+        insert(pair)
+    latencies = []
+    for pair in pairs[-TAIL_INSERTS:]:
+        insert_start = time.perf_counter_ns()
+        insert(pair)
+        latencies.append((time.perf_counter_ns() - insert_start) / 1000)
+    return time.perf_counter() - start, percentile(latencies, 50)
+
+
+def compare_inserts(sizes: list, insort_limit: int) -> None:
+    from app.modules.claim_index import SortedIndex
+
+    print(f"{'claims':>10}   {'insort (s)':>10} {'last (us)':>9}   {'SortedIndex (s)':>15} {'last (us)':>9}")
+    for size in sizes:
+        plain = "-", "-"
+        if size <= insort_limit:
+            by_amount = []
+            seconds, last = fill_seconds(size, lambda pair: insort(by_amount, pair))
+            plain = f"{seconds:.2f}", f"{last:.2f}"
+        seconds, last = fill_seconds(size, SortedIndex().add)
+        print(f"{size:>10,}   {plain[0]:>10} {plain[1]:>9}   {seconds:>15.2f} {last:>9.2f}")
+
+
+def compare_queries(claims_count: int) -> None:
+    from app.models.claim import ClaimQuery
+    from app.modules.claim_index import ClaimIndex, parse_claim_date
+    from app.modules.claim_records import ClaimRecord
+
+    rng = random.Random(3)
+    claims = [make_claim(rng, i) for i in range(claims_count)]
+    records = [ClaimRecord(claim) for claim in claims]
+    index = ClaimIndex()
+    start = time.perf_counter()
+    index.add_many(0, claims)
+    print(f"\n{claims_count:,} claims indexed in {time.perf_counter() - start:.1f} s")
+
+    week = (date(2024, 6, 3), date(2024, 6, 9))
+    queries = [
+        ("top 50 riskiest for a team", ClaimQuery(team=TEAMS[0], sort="risk", limit=50),
+         lambda claim: claim.assigned_team == TEAMS[0], lambda claim: -claim.risk_score),
+        ("over 15,000 this week", ClaimQuery(min_amount=15000, date_from=week[0], date_to=week[1], limit=100),
+         lambda claim: claim.claim_data.claim_amount_paid >= 15000
+         and week[0] <= parse_claim_date(claim.claim_data.claim_date) <= week[1], None),
+        ("top 50 amounts", ClaimQuery(sort="amount", limit=50),
+         lambda claim: True, lambda claim: -claim.claim_data.claim_amount_paid),
+        ("top 50 amounts over 0.7 risk", ClaimQuery(min_risk=0.7, sort="amount", limit=50),
+         lambda claim: claim.risk_score >= 0.7, lambda claim: -claim.claim_data.claim_amount_paid),
+    ]
+
+    print(f"{'query':<30} {'full scan (ms)':>14} {'indexed (ms)':>12}")
+    for name, query, matches, sort_key in queries:
+        scans, searches = [], []
+        for run in range(QUERY_RUNS):
+            if run < 3:
+                scan_start = time.perf_counter()
+                page = [claim for claim in claims if matches(claim)]
+                if sort_key is not None:
+                    page.sort(key=sort_key)
+                page = page[:query.limit]
+                scans.append((time.perf_counter() - scan_start) * 1000)
+            search_start = time.perf_counter()
+            positions, _ = index.search(records, query)
+            searches.append((time.perf_counter() - search_start) * 1000)
+        assert [claims[position].claim_id for position in positions] == [claim.claim_id for claim in page], name
+        print(f"{name:<30} {percentile(scans, 50):>14.1f} {percentile(searches, 50):>12.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--insort-limit", type=int, default=300000,
+                        help="largest fill to time with insort, which takes minutes at a million claims")
+    parser.add_argument("--query-claims", type=int, default=1000000)
+    args = parser.parse_args()
+
+    compare_inserts(args.sizes, args.insort_limit)
+    compare_queries(args.query_claims)
+
+
+if __name__ == "__main__":
+    main()
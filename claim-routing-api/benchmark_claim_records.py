@@ -0,0 +1,131 @@
+"""
+Benchmark for the memory taken by stored claims.
+
+Routes N random claims with the business rules, then measures with
+tracemalloc the bytes per claim of:
+- the routing decisions as the in-memory store used to keep them (a pydantic
+  RoutingDecision, decoded from JSON, plus its summary dict)
+- the compact ClaimRecord the store keeps now
+- the whole in-memory store filled with the claims, laid out as it used to
+  be (routing decisions, summary dicts and summary JSON) and as it is now
+  (claim records); both have the same indexes and columns, and share the
+  JSON encodings, which are made before measuring and so not counted
+and the time to build a record and to turn it back into a routing decision.
+
+Usage: python benchmark_claim_records.py [--claims 20000]
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+REGIONS = ["Lombardia", "Lazio", "Campania", "Sicilia", "Puglia", "Veneto", "Piemonte", "Toscana"]
+PROVINCES = ["Milano", "Roma", "Napoli", "Palermo", "Bari", "Venezia", "Torino", "Firenze"]
+BRANDS = ["Fiat", "BMW", "Audi", "Mercedes", "Volkswagen", "Toyota", "Ferrari", "Renault"]
+WARRANTIES = ["Third Party Liability", "Theft", "Fire", "Comprehensive"]
+
+
+def routed_encodings(count: int) -> list:
+    """JSON encodings of count claims routed by the business rules"""
+    from app.models.claim import ClaimData
+    from app.modules.routing_engine import RoutingEngine
+
+    rng = random.Random(8)
+    encodings = []
+    for i in range(count):
+        claim_data = ClaimData(
+            policyholder_age=rng.randint(18, 90),
+            warranty=rng.choice(WARRANTIES),
+            claim_amount_paid=round(rng.uniform(200, 30000), 2),
+            premium_amount_paid=round(rng.uniform(200, 1500), 2),
+            claim_region=rng.choice(REGIONS),
+            claim_province=rng.choice(PROVINCES),
+            vehicle_brand=rng.choice(BRANDS),
+            vehicle_model=f"Model {rng.randint(1, 40)}",
+            policyholder_gender=rng.choice(["M", "F"]),
+            claim_id=f"CLAIM-{i:08d}",
+            claim_date=f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        )
+        encodings.append(RoutingEngine.route_claim(claim_data, use_ml=False).model_dump_json().encode())
+    return encodings
+
+
+def traced_bytes(build) -> tuple:
+    """Bytes still allocated by build() once it returns, and the object it built"""
+    gc.collect()
+    tracemalloc.start()
+    built = build()
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return allocated, built
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=20000)
+    args = parser.parse_args()
+
+    from app.models.claim import RoutingDecision
+    from app.modules.claim_backend import MemoryClaimBackend, encode, summarize
+    from app.modules.claim_records import ClaimRecord
+
+    encodings = routed_encodings(args.claims)
+    count = len(encodings)
+
+    def decisions():
+        claims = [RoutingDecision.model_validate_json(encoded) for encoded in encodings]
+        return claims, [summarize(claim) for claim in claims]
+
+    def records():
+        # Decoded here too, so that the record is measured with every object it keeps
+        return [ClaimRecord(RoutingDecision.model_validate_json(encoded)) for encoded in encodings]
+
+    def store():
+        backend = MemoryClaimBackend()
+        backend._add_records(encodings)
+        return backend
+
+    def store_before():
+        backend = store()
+        # Each claim as a routing decision with its summary, as a dict and as JSON, instead of a record
+        backend.claim_records = [RoutingDecision.model_validate_json(encoded) for encoded in encodings]
+        backend.claim_summaries = [summarize(claim) for claim in backend.claim_records]
+        backend.claim_summary_json = [encode(summary) for summary in backend.claim_summaries]
+        return backend
+
+    decision_bytes, (claims, _) = traced_bytes(decisions)
+    record_bytes, built = traced_bytes(records)
+    store_before_bytes, _ = traced_bytes(store_before)
+    store_bytes, _ = traced_bytes(store)
+
+    start = time.perf_counter()
+    for claim in claims:
+        ClaimRecord(claim)
+    pack_us = (time.perf_counter() - start) / count * 1e6
+    start = time.perf_counter()
+    for record in built:
+        record.decision()
+    unpack_us = (time.perf_counter() - start) / count * 1e6
+    assert all(record.decision() == claim for record, claim in zip(built, claims))
+
+    print(f"{count:,} routed claims, {sum(map(len, encodings)) / count:.0f} JSON bytes each")
+    print(f"{'RoutingDecision + summary dict':<34} {decision_bytes / count:>8.0f} bytes per claim")
+    print(f"{'ClaimRecord':<34} {record_bytes / count:>8.0f} bytes per claim"
+          f"   ({decision_bytes / record_bytes:.1f}x smaller)")
+    print(f"{'whole store, before':<34} {store_before_bytes / count:>8.0f} bytes per claim")
+    print(f"{'whole store, now':<34} {store_bytes / count:>8.0f} bytes per claim"
+          f"   ({store_before_bytes / store_bytes:.1f}x smaller)")
+    print(f"{'  of which indexes and columns':<34} {(store_bytes - record_bytes) / count:>8.0f} bytes per claim")
+    print(f"build a record {pack_us:.1f} us, build a RoutingDecision from it {unpack_us:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark for the running claim totals behind /stats.
+
+Fills the in-memory store with N claims and times reading the running
+totals against computing the same totals from get_all_claims(), as ops
+dashboards did before, and the cost the totals add to storing a claim.
+
+Usage: python benchmark_claim_stats.py [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from benchmark_claim_log import make_claim, percentile
+
+BATCH_SIZE = 1000
+RUNS = 20
+
+
+def totals_from_claims(claims: list) -> dict:
+    """Per-team claim and fraud counts and claim amount sums, from the full claim list"""
+    totals = {}
+    for claim in claims:
+        team = totals.setdefault(claim.assigned_team, [0, 0, 0.0])
+        team[0] += 1
+        team[1] += claim.is_potential_fraud
+        team[2] += claim.claim_data.claim_amount_paid or 0.0
+    return totals
+
+
+async def measure(size: int) -> dict:
+    from app.modules.claim_backend import MemoryClaimBackend
+    from app.modules.claim_stats import ClaimStats
+
+    rng = random.Random(6)
+    claims = [make_claim(rng, i) for i in range(size)]
+    backend = MemoryClaimBackend()
+    for start in range(0, size, BATCH_SIZE):
+        await backend.add_many(claims[start:start + BATCH_SIZE])
+
+    stats = ClaimStats()
+    start = time.perf_counter()
+    for claim in claims[:min(size, 100000)]:
+        stats.add(claim)
+    add_us = (time.perf_counter() - start) / min(size, 100000) * 1e6
+
+    scans, reads = [], []
+    for run in range(RUNS):
+        if run < 3:
+            scan_start = time.perf_counter()
+            totals_from_claims(await backend.get_all())
+            scans.append((time.perf_counter() - scan_start) * 1000)
+        read_start = time.perf_counter()
+        backend.get_stats().snapshot()
+        reads.append((time.perf_counter() - read_start) * 1000)
+    await backend.close()
+    return {"add_us": add_us, "scan_ms": percentile(scans, 50), "read_ms": percentile(reads, 50)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'claims':>10}   {'from get_all (ms)':>17} {'running totals (ms)':>19} {'per add (us)':>12}")
+    for size in args.sizes:
+        result = asyncio.run(measure(size))
+        print(f"{size:>10,}   {result['scan_ms']:>17.1f} {result['read_ms']:>19.3f} {result['add_us']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
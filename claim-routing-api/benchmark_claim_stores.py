@@ -0,0 +1,140 @@
+"""
+Throughput benchmark for the claim storage backends.
+
+For each store, measures single-claim inserts (ClaimDatabase.add_claim),
+batch inserts (ClaimDatabase.add_claims, which the Postgres store streams in
+with COPY), a team-filtered dashboard page and a full export. Each store runs
+in a fresh interpreter.
+
+The Postgres store only runs with --postgres-url; it works in a temporary
+schema that is dropped afterwards.
+
+Usage: python benchmark_claim_stores.py [--claims 100000] [--postgres-url postgresql://localhost/postgres]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from benchmark_claim_log import TEAMS, make_claim, percentile
+
+SINGLE_INSERTS = 2000
+BATCH_SIZE = 1000
+PAGE_QUERIES = 200
+
+
+async def measure(claims: int) -> dict:
+    """Fill the configured store and time inserts, pages and an export"""
+    from app.models.claim import ClaimQuery
+    from app.modules.database import ClaimDatabase
+
+    await ClaimDatabase.open()
+    rng = random.Random(3)
+    try:
+        singles = [make_claim(rng, i) for i in range(SINGLE_INSERTS)]
+        latencies = []
+        start = time.perf_counter()
+        for claim in singles:
+            claim_start = time.perf_counter_ns()
+            await ClaimDatabase.add_claim(claim)
+            latencies.append((time.perf_counter_ns() - claim_start) / 1000)
+        single_rate = SINGLE_INSERTS / (time.perf_counter() - start)
+
+        batch_seconds = 0.0
+        for batch_start in range(SINGLE_INSERTS, claims, BATCH_SIZE):
+            batch = [make_claim(rng, i) for i in range(batch_start, min(batch_start + BATCH_SIZE, claims))]
+            start = time.perf_counter()
+            await ClaimDatabase.add_claims(batch)
+            batch_seconds += time.perf_counter() - start
+        batch_rate = (claims - SINGLE_INSERTS) / batch_seconds if batch_seconds else 0.0
+
+        page_latencies = []
+        for _ in range(PAGE_QUERIES):
+            query = ClaimQuery(team=rng.choice(TEAMS), sort="risk", limit=100)
+            start = time.perf_counter_ns()
+            await ClaimDatabase.query_claims_json(query)
+            page_latencies.append((time.perf_counter_ns() - start) / 1000)
+
+        exported = 0
+        start = time.perf_counter()
+        async for encodings in ClaimDatabase.export_claims_json(ClaimQuery()):
+            exported += len(encodings)
+        export_rate = exported / (time.perf_counter() - start)
+    finally:
+        await ClaimDatabase.close()
+
+    return {
+        "single_p50": percentile(latencies, 50),
+        "single_p99": percentile(latencies, 99),
+        "single_rate": single_rate,
+        "batch_rate": batch_rate,
+        "page_p50": percentile(page_latencies, 50),
+        "export_rate": export_rate,
+    }
+
+
+def postgres_schema(url: str, create: bool) -> str:
+    """Create (or drop) the benchmark schema and return its connection string"""
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+
+    schema = os.environ.get("BENCHMARK_SCHEMA") or f"claims_benchmark_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(url, autocommit=True) as connection:
+        connection.execute(f"CREATE SCHEMA {schema}" if create else f"DROP SCHEMA {schema} CASCADE")
+    os.environ["BENCHMARK_SCHEMA"] = schema
+    return make_conninfo(url, options=f"-c search_path={schema}")
+
+
+def run_worker(store: str, claims: int, env: dict) -> dict:
+    env = dict(os.environ, CLAIM_STORE=store, CLAIM_LOG_DIR="", **env)
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", "--claims", str(claims)],
+        capture_output=True, text=True, check=True, cwd=Path(__file__).parent, env=env
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=100000)
+    parser.add_argument("--postgres-url", help="Postgres database to benchmark in a temporary schema")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(measure(args.claims))))
+        return
+
+    print(f"{'store':>9}   {'add_claim p50/p99 (us)':>22} {'single/s':>9} {'batch/s':>9}"
+          f"   {'page p50 (us)':>13} {'export/s':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [
+            ("memory", {}),
+            ("shared", {"CLAIM_SHARED_PATH": os.path.join(directory, "claims.shared")}),
+            ("sqlite", {"CLAIM_DB_PATH": os.path.join(directory, "claims.db")}),
+        ]
+        if args.postgres_url:
+            runs.append(("postgres", {"CLAIM_DB_URL": postgres_schema(args.postgres_url, create=True)}))
+        try:
+            for store, env in runs:
+                result = run_worker(store, args.claims, env)
+                latency = f"{result['single_p50']:.1f}/{result['single_p99']:.1f}"
+                print(f"{store:>9}   {latency:>22} {result['single_rate']:>9,.0f} {result['batch_rate']:>9,.0f}"
+                      f"   {result['page_p50']:>13.1f} {result['export_rate']:>9,.0f}")
+        finally:
+            if args.postgres_url:
+                postgres_schema(args.postgres_url, create=False)
+
+
+if __name__ == "__main__":
+    main()
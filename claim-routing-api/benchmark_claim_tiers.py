@@ -0,0 +1,118 @@
+"""
+Benchmark for hot/cold claim tiering in the in-memory store.
+
+Fills the store with and without a hot claim limit and reports the resident
+memory of the process, the time to look up a claim that is still in memory
+and one that was moved to disk, and the time for a full dashboard page.
+Each configuration runs in a fresh interpreter.
+
+Usage: python benchmark_claim_tiers.py [--claims 300000] [--hot-claims 20000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from benchmark_claim_log import TEAMS, make_claim, percentile
+
+BATCH_SIZE = 1000
+LOOKUPS = 2000
+
+
+def resident_mib() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def measure(claims: int) -> dict:
+    from app.models.claim import ClaimQuery
+    from app.modules.database import ClaimDatabase, claim_backend
+
+    await ClaimDatabase.open()
+    rng = random.Random(4)
+    start = time.perf_counter()
+    for batch_start in range(0, claims, BATCH_SIZE):
+        await ClaimDatabase.add_claims([make_claim(rng, i) for i in range(batch_start, min(batch_start + BATCH_SIZE, claims))])
+    claim_backend.claim_tiers.wait()
+    fill_seconds = time.perf_counter() - start
+    memory = resident_mib()
+
+    async def lookup_latencies(low: int, high: int) -> list:
+        latencies = []
+        for _ in range(LOOKUPS):
+            claim_id = f"CLAIM-{rng.randrange(low, high):08d}"
+            lookup_start = time.perf_counter_ns()
+            await ClaimDatabase.get_claim_by_id(claim_id)
+            latencies.append((time.perf_counter_ns() - lookup_start) / 1000)
+        return latencies
+
+    hot_start = claim_backend.claim_tiers.hot_start
+    hot = await lookup_latencies(max(hot_start, claims - 1000), claims)
+    cold = await lookup_latencies(0, hot_start) if hot_start else []
+
+    pages = []
+    for _ in range(200):
+        query = ClaimQuery(team=rng.choice(TEAMS), sort="risk", limit=100)
+        page_start = time.perf_counter_ns()
+        await ClaimDatabase.query_claims_json(query)
+        pages.append((time.perf_counter_ns() - page_start) / 1000)
+    await ClaimDatabase.close()
+
+    return {
+        "fill_seconds": fill_seconds,
+        "memory_mib": memory,
+        "hot_claims": len(claim_backend.claim_tiers.encodings),
+        "hot_p50": percentile(hot, 50),
+        "cold_p50": percentile(cold, 50) if cold else None,
+        "page_p50": percentile(pages, 50),
+    }
+
+
+def run_worker(claims: int, hot_claims: int, directory: str) -> dict:
+    env = dict(
+        os.environ, CLAIM_STORE="memory", CLAIM_LOG_DIR="", CLAIM_HOT_CLAIMS=str(hot_claims),
+        CLAIM_SEGMENT_DIR=directory, CLAIM_SEGMENT_CLAIMS=str(max(1000, hot_claims // 4))
+    )
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", "--claims", str(claims)],
+        capture_output=True, text=True, check=True, cwd=Path(__file__).parent, env=env
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=300000)
+    parser.add_argument("--hot-claims", type=int, default=20000)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(measure(args.claims))))
+        return
+
+    print(f"{args.claims:,} claims")
+    print(f"{'hot limit':>10}   {'RSS (MiB)':>9} {'in memory':>9} {'fill (s)':>8}"
+          f"   {'hot get (us)':>12} {'cold get (us)':>13} {'page (us)':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for hot_claims in (0, args.hot_claims):
+            result = run_worker(args.claims, hot_claims, directory)
+            cold = f"{result['cold_p50']:.1f}" if result["cold_p50"] is not None else "-"
+            print(f"{hot_claims or 'none':>10}   {result['memory_mib']:>9.0f} {result['hot_claims']:>9,}"
+                  f" {result['fill_seconds']:>8.1f}   {result['hot_p50']:>12.1f} {cold:>13} {result['page_p50']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark for request latency under concurrent mixed traffic.
+
+Sends a steady stream of slow text claims to /submit-claim while probing
+/healthz and /claim/{claim_id}, and reports p50/p99 latency per request type.
+The run is repeated with the routing pipeline inline on the event loop
+(ROUTING_WORKERS=0, the old behaviour), on a thread pool and on a process pool.
+
+Usage: python benchmark_event_loop.py [--claims 200] [--concurrency 16]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+CLAIM_TEXT = (
+    "I'm a 67-year-old policyholder living in Milan. My BMW 5 Series was hit by another "
+    "vehicle at a junction while I was waiting at a red light. Claim type: third-party liability. "
+    "The rear bumper, boot lid and both tail lights were damaged badly and the car had to be towed. "
+) * 8 + "The repair estimate is around €18,000."
+
+PROBE_INTERVAL_S = 0.01
+
+claim_numbers = itertools.count()
+
+
+def claim_text() -> str:
+    """A unique claim text, so that resubmission detection does not skip routing"""
+    return f"{CLAIM_TEXT} Reference {next(claim_numbers)}."
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run_load(claims: int, concurrency: int) -> dict:
+    """Run the mixed workload against the app in this process and collect latencies"""
+    import httpx
+    from app.main import app
+
+    latencies = {"submit-claim": [], "healthz": [], "claim": []}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        seed = await client.post("/submit-claim", json={"structured_data": {"CLAIM_ID": "BENCH-SEED"}})
+        seed.raise_for_status()
+
+        # Warm up: start every worker (and load its models) before measuring
+        warmup = [client.post("/submit-claim", json={"text": claim_text()}) for _ in range(concurrency)]
+        for response in await asyncio.gather(*warmup):
+            response.raise_for_status()
+
+        async def timed(kind, request, scheduled=None):
+            start = scheduled if scheduled is not None else time.perf_counter()
+            response = await request
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+            return response
+
+        queue = asyncio.Queue()
+        for _ in range(claims):
+            queue.put_nowait(None)
+
+        async def submitter():
+            while not queue.empty():
+                queue.get_nowait()
+                await timed("submit-claim", client.post("/submit-claim", json={"text": claim_text()}))
+
+        async def prober(stop):
+            # Open loop: probes are due every PROBE_INTERVAL_S and their latency is measured
+            # from when they were due, so time spent waiting for a blocked event loop counts.
+            probes = []
+            due = time.perf_counter()
+            while not stop.is_set():
+                probes.append(asyncio.create_task(timed("healthz", client.get("/healthz"), due)))
+                probes.append(asyncio.create_task(timed("claim", client.get("/claim/BENCH-SEED"), due)))
+                due += PROBE_INTERVAL_S
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await asyncio.gather(*probes)
+
+        stop = asyncio.Event()
+        probers = [asyncio.create_task(prober(stop))]
+        start = time.perf_counter()
+        await asyncio.gather(*(submitter() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*probers)
+
+    return {
+        "elapsed_s": elapsed,
+        "throughput": claims / elapsed,
+        "latency_ms": {
+            kind: {"p50": percentile(values, 50), "p99": percentile(values, 99), "count": len(values)}
+            for kind, values in latencies.items()
+        },
+    }
+
+
+def run_configuration(workers: int, kind: str, args) -> dict:
+    """Run the workload in a fresh interpreter with the given worker pool settings"""
+    env = dict(os.environ, ROUTING_WORKERS=str(workers), ROUTING_POOL=kind)
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", "--claims", str(args.claims), "--concurrency", str(args.concurrency)],
+        env=env, capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(run_load(args.claims, args.concurrency))))
+        return
+
+    print(f"Mixed traffic: {args.claims} text claims, concurrency {args.concurrency}, "
+          f"probes every {PROBE_INTERVAL_S * 1000:.0f} ms\n")
+    configurations = [
+        ("inline on event loop", 0, "thread"),
+        (f"thread pool ({args.workers} workers)", args.workers, "thread"),
+        (f"process pool ({args.workers} workers)", args.workers, "process"),
+    ]
+    for label, workers, kind in configurations:
+        result = run_configuration(workers, kind, args)
+        print(f"{label}: {result['throughput']:.1f} claims/s")
+        for kind, stats in result["latency_ms"].items():
+            print(f"  {kind:<13} p50 {stats['p50']:8.2f} ms   p99 {stats['p99']:8.2f} ms   (n={stats['count']})")
+        print()
+
+
+if __name__ == "__main__":
+    main()
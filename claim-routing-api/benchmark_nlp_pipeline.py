@@ -0,0 +1,145 @@
+"""
+Benchmark for the spaCy pipeline used by text claim extraction.
+
+Compares the full pipeline of the configured model (SPACY_EXCLUDE and
+SPACY_DISABLE empty) with the trimmed one loaded by default, each in a fresh
+interpreter: how long importing app.routers.claims takes, how long the first
+text claim waits for the model to load, and the latency of extract_from_text
+per claim after that. Also checks that both pipelines extract the same claim
+data.
+
+Then compares the throughput of extracting texts one at a time with
+extract_from_text against extract_many, for several batch sizes and numbers
+of processes, with the trimmed pipeline.
+
+Usage: python benchmark_nlp_pipeline.py [--texts 500] [--batch-texts 5000]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from benchmark_claim_log import percentile
+
+AGES = range(18, 90)
+REGIONS = ["Milan", "Rome", "Naples", "Turin", "Florence", "Bari"]
+VEHICLES = ["BMW 5 Series", "Mercedes C-Class", "Audi A4", "Fiat Panda", "Toyota Yaris", "Ferrari Roma"]
+WARRANTIES = ["third-party liability", "comprehensive", "collision", "fire and theft"]
+DAMAGES = [
+    "The rear bumper was damaged badly and the car had to be towed.",
+    "Both front doors and the windscreen need to be replaced.",
+    "The engine caught fire while parked outside my house overnight.",
+    "Another vehicle ran a red light and hit the passenger side.",
+]
+
+
+def claim_texts(count: int) -> list:
+    """Claim texts of varying content and length"""
+    rng = random.Random(3)
+    return [
+        f"I'm a {rng.choice(AGES)}-year-old policyholder living in {rng.choice(REGIONS)}. "
+        f"My {rng.choice(VEHICLES)} was damaged on {rng.randint(1, 28)} March. "
+        f"Claim type: {rng.choice(WARRANTIES)}. "
+        + " ".join(rng.sample(DAMAGES, rng.randint(1, len(DAMAGES))))
+        + f" The repair estimate is around €{rng.randint(500, 40000):,}."
+        for _ in range(count)
+    ]
+
+
+def measure(texts_count: int) -> dict:
+    """Time the import, the first text claim and the following ones, in this interpreter"""
+    start = time.perf_counter()
+    import app.routers.claims  # noqa: F401
+    import_seconds = time.perf_counter() - start
+    spacy_imported = "spacy" in sys.modules
+
+    from app.modules.claim_extractor import ClaimExtractor
+
+    texts = claim_texts(texts_count)
+    start = time.perf_counter()
+    extracted = [ClaimExtractor.extract_from_text(texts[0])]
+    first_seconds = time.perf_counter() - start
+
+    latencies = []
+    for text in texts[1:]:
+        start = time.perf_counter_ns()
+        extracted.append(ClaimExtractor.extract_from_text(text))
+        latencies.append((time.perf_counter_ns() - start) / 1e6)
+
+    return {
+        "import": import_seconds,
+        "spacy_at_import": spacy_imported,
+        "first": first_seconds,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "components": ClaimExtractor.get_nlp().pipe_names,
+        "extracted": [claim_data.model_dump(mode="json") for claim_data in extracted],
+    }
+
+
+def measure_throughput(texts_count: int) -> list:
+    """Claims per second extracted one at a time, and by extract_many with each batch size and process count"""
+    from app.modules.claim_extractor import ClaimExtractor
+
+    texts = claim_texts(texts_count)
+    ClaimExtractor.get_nlp()
+    start = time.perf_counter()
+    expected = [ClaimExtractor.extract_from_text(text) for text in texts]
+    results = [{"name": "extract_from_text loop", "rate": len(texts) / (time.perf_counter() - start), "same": True}]
+
+    processes = sorted({1, 2, os.cpu_count() or 1})
+    for batch_size, n_process in [(16, 1), (64, 1), (256, 1), *((64, n) for n in processes if n > 1)]:
+        start = time.perf_counter()
+        extracted = ClaimExtractor.extract_many(texts, batch_size=batch_size, n_process=n_process)
+        results.append({
+            "name": f"extract_many {batch_size} x {n_process}",
+            "rate": len(texts) / (time.perf_counter() - start),
+            "same": extracted == expected,
+        })
+    return results
+
+
+def run_worker(task: str, texts_count: int, env: dict):
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", task, "--texts", str(texts_count)],
+        capture_output=True, text=True, check=True, cwd=Path(__file__).parent, env={**os.environ, **env}
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=500)
+    parser.add_argument("--batch-texts", type=int, default=5000)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = measure(args.texts) if args.worker == "startup" else measure_throughput(args.texts)
+        print(json.dumps(result))
+        return
+
+    full = run_worker("startup", args.texts, {"SPACY_EXCLUDE": "", "SPACY_DISABLE": ""})
+    trimmed = run_worker("startup", args.texts, {})
+    print(f"{'pipeline':<10} {'import s':>9} {'first claim s':>14} {'p50 ms':>8} {'p99 ms':>8}  components")
+    for name, result in [("full", full), ("trimmed", trimmed)]:
+        print(f"{name:<10} {result['import']:>9.2f} {result['first']:>14.2f} "
+              f"{result['p50']:>8.2f} {result['p99']:>8.2f}  {', '.join(result['components'])}")
+    print(f"\nspaCy imported by app.routers.claims: {'yes' if trimmed['spacy_at_import'] else 'no'}")
+    print(f"Same claim data from both pipelines: {'yes' if full['extracted'] == trimmed['extracted'] else 'NO'}")
+
+    print(f"\n{args.batch_texts:,} texts, {os.cpu_count()} CPUs")
+    print(f"{'extraction':<26} {'claims/s':>9}  same claim data")
+    for result in run_worker("throughput", args.batch_texts, {}):
+        print(f"{result['name']:<26} {result['rate']:>9,.0f}  {'yes' if result['same'] else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
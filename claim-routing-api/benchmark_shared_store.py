@@ -0,0 +1,102 @@
+"""
+Benchmark for the claim store shared between worker processes.
+
+Runs 1, 2 and 4 processes against one shared claim file at the same time, as
+uvicorn workers would. Each process adds its share of the claims one at a
+time and, after every claim, reads a few claims by ID and a dashboard page,
+including claims added by the other processes. Reports the combined add and
+read throughput and checks that every process ends up seeing every claim.
+
+Usage: python benchmark_shared_store.py [--claims 20000] [--workers 1,2,4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from benchmark_claim_log import TEAMS, make_claim
+
+READS_PER_ADD = 4
+
+
+async def measure(path: str, worker: int, workers: int, claims: int) -> dict:
+    """Add this worker's claims one by one, reading other claims in between"""
+    from app.models.claim import ClaimQuery
+    from app.modules.shared_backend import SharedClaimBackend
+
+    backend = SharedClaimBackend(path)
+    await backend.open()
+    rng = random.Random(worker)
+    mine = [make_claim(rng, i) for i in range(worker, claims, workers)]
+    # Start together once every worker has loaded, so start-up time is not measured
+    Path(f"{path}.ready{worker}").touch()
+    while len(list(Path(path).parent.glob("*.ready*"))) < workers:
+        await asyncio.sleep(0.01)
+    reads = 0
+    start = time.time()
+    for claim in mine:
+        await backend.add_many([claim])
+        for _ in range(READS_PER_ADD - 1):
+            await backend.get_json(f"CLAIM-{rng.randrange(claims):08d}")
+        await backend.query_json(ClaimQuery(team=rng.choice(TEAMS), sort="risk", limit=20))
+        reads += READS_PER_ADD
+    finish = time.time()
+
+    # Wait for the other workers, then check this one sees every claim
+    while await backend.count() < claims:
+        await asyncio.sleep(0.01)
+    await backend.close()
+    return {"adds": len(mine), "reads": reads, "start": start, "finish": finish}
+
+
+def run(claims: int, workers: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "claims.shared")
+        processes = [
+            subprocess.Popen(
+                [sys.executable, __file__, "--worker", str(worker), "--workers", str(workers),
+                 "--claims", str(claims), "--path", path],
+                stdout=subprocess.PIPE, text=True, cwd=Path(__file__).parent
+            )
+            for worker in range(workers)
+        ]
+        results = [json.loads(process.communicate()[0].strip().splitlines()[-1]) for process in processes]
+    elapsed = max(result["finish"] for result in results) - min(result["start"] for result in results)
+    return {
+        "adds_per_second": sum(result["adds"] for result in results) / elapsed,
+        "reads_per_second": sum(result["reads"] for result in results) / elapsed,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=20000)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(asyncio.run(measure(args.path, args.worker, int(args.workers), args.claims))))
+        return
+
+    print(f"{os.cpu_count()} CPU cores")
+    print(f"{'workers':>7}   {'adds/s':>9} {'reads/s':>9} {'time (s)':>9}")
+    for workers in (int(count) for count in args.workers.split(",")):
+        result = run(args.claims, workers)
+        print(f"{workers:>7}   {result['adds_per_second']:>9,.0f} {result['reads_per_second']:>9,.0f}"
+              f" {result['seconds']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Test script for admission control.
+
+Checks that the admission controller switches from normal to degraded mode and
+then sheds load as the routing worker pool fills up, that the pool holds a
+job's capacity until the job has run, even once its caller is cancelled, that
+a broken executor is shut down and replaced, and that degraded routing skips
+the NLP pipeline and the ML model.
+"""
+
+import asyncio
+import sys
+import threading
+from concurrent.futures import BrokenExecutor, Future, ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.modules.admission import AdmissionController, Overloaded
+from app.modules.worker_pool import RoutingWorkerPool, WorkerPoolFull
+from app.modules.pipeline import ClaimPipeline
+from app.modules.routing_engine import DEGRADED_REASON
+
+
+def test_modes_follow_pool_load():
+    """Normal below the degrade threshold, degraded above it, rejected past the shed threshold"""
+    print("Testing admission modes...")
+    pool = RoutingWorkerPool(max_workers=2, max_queue=8)
+    controller = AdmissionController(pool, degrade_load=0.5, shed_load=0.9, retry_after=2)
+
+    assert controller.admit() is False and controller.mode == "normal"
+
+    pool.pending = 5
+    assert controller.admit() is True and controller.mode == "degraded"
+
+    pool.pending, pool.waiting = 8, 1
+    try:
+        controller.admit()
+    except Overloaded as e:
+        assert e.retry_after == 2
+    else:
+        raise AssertionError("Claim was admitted past the shed threshold")
+    assert controller.admit(can_shed=False) is True
+
+    metrics = controller.metrics()
+    print(f"  {metrics}")
+    assert metrics["mode"] == "shedding" and metrics["queue_depth"] == 7
+    assert (metrics["admitted"], metrics["degraded"], metrics["shed"]) == (3, 2, 1)
+    print("  ✅ PASS")
+
+
+def test_cancelled_job_keeps_capacity():
+    """A running job whose caller was cancelled counts against the pool until it finishes"""
+    print("Testing capacity of cancelled jobs...")
+    pool = RoutingWorkerPool(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def run():
+        job = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        job.cancel()
+        await asyncio.sleep(0.05)
+        assert job.cancelled() and pool.pending == 1
+        try:
+            await pool.run(abs, -1)
+        except WorkerPoolFull:
+            pass
+        else:
+            raise AssertionError("A job was admitted while a cancelled one still ran")
+
+        release.set()
+        for _ in range(100):
+            if pool.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.pending == 0
+        assert await pool.run(abs, -1) == 1
+
+    try:
+        asyncio.run(run())
+    finally:
+        release.set()
+        pool.shutdown()
+    print("  ✅ PASS")
+
+
+class BrokenPool(ThreadPoolExecutor):
+    """Executor whose workers have all died, as a process pool after a crash"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenExecutor("A worker died"))
+        return future
+
+
+def test_broken_executor_replaced():
+    """A broken executor is shut down, and the next job runs on a new one"""
+    print("Testing broken executors...")
+    pool = RoutingWorkerPool(max_workers=1, max_queue=0)
+    broken = pool._executor = BrokenPool(max_workers=1)
+
+    async def run():
+        try:
+            await pool.run(abs, -1)
+        except BrokenExecutor:
+            pass
+        else:
+            raise AssertionError("The job ran on a broken executor")
+        await asyncio.sleep(0)
+        assert broken._shutdown and pool._executor is None and pool.pending == 0
+        assert await pool.run(abs, -1) == 1
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+    print("  ✅ PASS")
+
+
+def test_degraded_routing_is_rules_only():
+    """Degraded routing extracts with regular expressions and adds no ML reasons"""
+    print("Testing degraded routing...")
+    text = ("I'm a 67-year-old policyholder from Milan. My BMW 5 Series was hit. "
+            "Claim type: third-party liability. The repair is around €18,000.")
+
+    decision = ClaimPipeline.route_input({"text": text}, degraded=True)
+    claim_data = decision.claim_data
+
+    assert (claim_data.policyholder_age, claim_data.claim_region, claim_data.vehicle_brand) == (67, "Milan", "BMW")
+    assert claim_data.claim_amount_paid == 18000
+    assert decision.reasoning[-1] == DEGRADED_REASON
+    assert not any(reason.startswith("ML: ") for reason in decision.reasoning)
+    assert decision.assigned_team == "High Value Claims - Milan"
+    print(f"  {decision.assigned_team}")
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_modes_follow_pool_load()
+    test_cancelled_job_keeps_capacity()
+    test_broken_executor_replaced()
+    test_degraded_routing_is_rules_only()
@@ -0,0 +1,119 @@
+"""
+Test script for batch claim routing.
+
+Checks that extracting, scoring and routing a batch of claims gives exactly
+the same results as processing each claim on its own, and that a decision
+that cannot be stored only fails its own claim.
+"""
+
+import asyncio
+import copy
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.models.claim import BatchClaimResult, ClaimData
+from app.modules.claim_extractor import ClaimExtractor
+from app.modules.scoring_engine import ScoringEngine
+from app.modules.routing_engine import RoutingEngine
+from app.modules.database import ClaimDatabase
+from app.routers.claims import _store_results
+
+test_claims = [
+    ClaimData(policyholder_age=65, claim_region="Milan", vehicle_brand="BMW",
+              warranty="third-party liability", claim_amount_paid=18000),
+    ClaimData(policyholder_age=42, claim_region="Naples", vehicle_brand="Mercedes",
+              premium_amount_paid=1200, claim_amount_paid=8500),
+    ClaimData(claim_region="Caserta", claim_amount_paid=30000),
+    ClaimData(policyholder_age=75, vehicle_brand="Ferrari", claim_amount_paid=12000,
+              warranty="third-party liability"),
+    ClaimData(vehicle_brand="Fiat", premium_amount_paid=300),
+    ClaimData()
+]
+
+test_texts = [
+    "I'm a 65-year-old policyholder. I live in Milan. My BMW 5 Series was hit by another vehicle. "
+    "Claim type: third-party liability. Claim is around €18,000.",
+    "Policyholder age 42, residing in Naples. Mercedes C-Class damaged in collision. Claim amount: 8500 euros.",
+    "Ferrari crashed in Rome. 35 year old driver. Comprehensive insurance. Repair costs 25k.",
+    "Fiat Panda scratched in a car park in Turin.",
+    "",
+]
+
+
+def test_extract_many_matches_extract_from_text():
+    """Batch extraction must match extracting each text on its own, in input order"""
+    print("Testing batch extraction...")
+    expected = [ClaimExtractor.extract_from_text(text) for text in test_texts]
+    assert ClaimExtractor.extract_many(test_texts) == expected
+    assert ClaimExtractor.extract_many(test_texts, batch_size=2, n_process=2) == expected
+    assert ClaimExtractor.extract_many(test_texts, use_nlp=False) == [
+        ClaimExtractor.extract_from_text(text, use_nlp=False) for text in test_texts
+    ]
+    assert ClaimExtractor.extract_many([]) == []
+    print("  ✅ PASS")
+
+
+def test_score_batch_matches_single_scoring():
+    """Batch scoring must match the per-claim scoring methods"""
+    print("Testing batch scoring...")
+    batch_scores = ScoringEngine.score_batch(test_claims)
+
+    for claim, scores in zip(test_claims, batch_scores):
+        urgency_score, urgency_level, urgency_reasons = ScoringEngine.calculate_urgency(claim)
+        risk_score, risk_reasons = ScoringEngine.calculate_risk(claim)
+        customer_value, value_reasons = ScoringEngine.calculate_customer_value(claim)
+        fraud_indicator = ScoringEngine.detect_fraud(claim)
+
+        expected = (urgency_score, urgency_level, urgency_reasons, risk_score, risk_reasons,
+                    customer_value, value_reasons, fraud_indicator)
+        assert scores == expected, f"{scores} != {expected}"
+
+    print("  ✅ PASS")
+
+
+def test_route_claims_matches_route_claim():
+    """Batch routing must return the same decisions, in input order"""
+    print("Testing batch routing...")
+    single_claims = copy.deepcopy(test_claims)
+    batch_claims = copy.deepcopy(test_claims)
+    for i, (single, batch) in enumerate(zip(single_claims, batch_claims)):
+        single.claim_id = batch.claim_id = f"CLAIM-TEST-{i}"
+
+    expected = [RoutingEngine.route_claim(claim) for claim in single_claims]
+    decisions = RoutingEngine.route_claims(batch_claims)
+
+    assert [d.model_dump() for d in decisions] == [d.model_dump() for d in expected]
+    for decision in decisions:
+        print(f"  {decision.claim_id}: {decision.assigned_team}")
+
+    print("  ✅ PASS")
+
+
+def test_store_results_keeps_errors_per_claim():
+    """A batch decision that cannot be stored becomes an error for that claim only"""
+    print("Testing batch storage errors...")
+    good, bad = RoutingEngine.route_claims(copy.deepcopy(test_claims[:2]))
+    good.claim_id, bad.claim_id = "CLAIM-STORE-0", "CLAIM-STORE-1"
+    # A reason that is not a string cannot be stored
+    bad = bad.model_copy(update={"reasoning": [*bad.reasoning, 1]})
+    results = asyncio.run(_store_results([
+        BatchClaimResult(index=0, decision=good),
+        BatchClaimResult(index=1, decision=bad),
+        BatchClaimResult(index=2, error="Invalid claim input"),
+    ]))
+
+    assert results[0].decision == good and results[0].error is None
+    assert results[1].decision is None and results[1].error
+    assert results[2].decision is None and results[2].error == "Invalid claim input"
+    assert asyncio.run(ClaimDatabase.get_claim_by_id("CLAIM-STORE-0")) == good
+    assert asyncio.run(ClaimDatabase.get_claim_by_id("CLAIM-STORE-1")) is None
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_extract_many_matches_extract_from_text()
+    test_score_batch_matches_single_scoring()
+    test_route_claims_matches_route_claim()
+    test_store_results_keeps_errors_per_claim()
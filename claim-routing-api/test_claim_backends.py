@@ -0,0 +1,204 @@
+"""
+Test script for the claim storage backends.
+
+Runs the same claims and dashboard queries against the in-memory and SQLite
+backends and checks that they store claims once, page through results in the
+same order and return the same JSON.
+"""
+
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.models.claim import ClaimQuery
+from app.modules.claim_backend import MemoryClaimBackend
+from app.modules.sqlite_backend import SQLiteClaimBackend
+from test_claim_index import TEAMS, URGENCIES, VALUES, expected_ids, make_claims
+
+
+async def fill(backend, claims):
+    for start in range(0, len(claims), 300):
+        await backend.add_many(claims[start:start + 300])
+    return backend
+
+
+async def paged_ids(backend, query):
+    ids = []
+    while True:
+        page, cursor = await backend.query(query)
+        ids.extend(claim.claim_id for claim in page)
+        if cursor is None:
+            return ids
+        query = query.model_copy(update={"cursor": cursor})
+
+
+async def paged_json(backend, query):
+    pages = []
+    while True:
+        page, cursor = await backend.query_json(query)
+        pages.append(page)
+        if cursor is None:
+            return pages
+        query = query.model_copy(update={"cursor": cursor})
+
+
+async def exported_json(backend, query):
+    return [encoding async for chunk in backend.export_json(query) for encoding in chunk]
+
+
+def random_query(rng):
+    return ClaimQuery(
+        team=rng.choice([None, None] + TEAMS),
+        urgency=rng.choice([None, None] + URGENCIES),
+        customer_value=rng.choice([None, None] + VALUES),
+        is_potential_fraud=rng.choice([None, None, True, False]),
+        min_risk=rng.choice([None, 0.3, 0.5]),
+        max_risk=rng.choice([None, 0.7, 0.9]),
+        min_amount=rng.choice([None, None, 1000.0, 15000.0]),
+        max_amount=rng.choice([None, None, 15000.0, 50000.0]),
+        date_from=rng.choice([None, date(2024, 3, 1)]),
+        date_to=rng.choice([None, date(2024, 9, 30)]),
+        sort=rng.choice(["submitted", "risk", "urgency", "amount"]),
+        limit=rng.choice([1, 7, 50, 1000]),
+        view=rng.choice(["full", "summary"]),
+        fields=rng.choice([None, None, "claim_id,risk_score", "claim_id,reasoning"])
+    )
+
+
+async def check_queries_match(backend, claims, queries=200):
+    """Compare a filled backend with the in-memory store and the expected results"""
+    memory = await fill(MemoryClaimBackend(), claims)
+    assert await backend.count() == len(claims)
+    assert await backend.count(TEAMS[0]) == await memory.count(TEAMS[0])
+
+    rng = random.Random(5)
+    for _ in range(queries):
+        query = random_query(rng)
+        full_query = query.model_copy(update={"view": "full", "fields": None})
+        assert await paged_ids(backend, full_query) == expected_ids(claims, query), query
+        assert b"".join(await paged_json(backend, query)) == b"".join(await paged_json(memory, query)), query
+        assert await exported_json(backend, query) == await exported_json(memory, query), query
+
+
+def test_queries_match():
+    """Both backends return the expected claims, page by page, with identical JSON"""
+    print("Testing SQLite queries against the in-memory store...")
+    claims = make_claims(1500)
+
+    async def run():
+        await check_queries_match(await fill(SQLiteClaimBackend(":memory:"), claims), claims)
+
+    asyncio.run(run())
+    print("  ✅ PASS")
+
+
+def test_claims_are_stored_once():
+    """Adding a stored claim ID, in a later batch or the same one, keeps the first claim"""
+    print("Testing duplicate claim IDs...")
+    claims = make_claims(3)
+
+    async def run():
+        for backend in (MemoryClaimBackend(), SQLiteClaimBackend(":memory:")):
+            await check_stored_once(backend, claims)
+
+    asyncio.run(run())
+    print("  ✅ PASS")
+
+
+async def check_stored_once(backend, claims):
+    repeat = claims[0].model_copy(update={"assigned_team": "Other Team"})
+    results = await backend.add_many([claims[0], claims[1], claims[1]])
+    assert [added for _, added in results] == [True, True, False]
+    stored, added = (await backend.add_many([repeat, claims[2]]))[0]
+    assert not added and stored.assigned_team == claims[0].assigned_team
+    assert await backend.count() == 3
+    assert await backend.get(claims[2].claim_id) == claims[2]
+    assert await backend.get("CLAIM-MISSING") is None
+
+
+def test_sqlite_persists():
+    """Claims and the epoch survive reopening the database; versions change when claims are added"""
+    print("Testing SQLite persistence...")
+    claims = make_claims(20)
+
+    async def run(path):
+        backend = SQLiteClaimBackend(path)
+        await backend.add_many(claims[:10])
+        version, epoch = await backend.version(), await backend.epoch()
+        await backend.close()
+
+        backend = SQLiteClaimBackend(path)
+        assert (await backend.version(), await backend.epoch()) == (version, epoch)
+        assert [claim.claim_id for claim in await backend.get_all()] == [claim.claim_id for claim in claims[:10]]
+        await backend.add_many(claims[10:])
+        assert await backend.version() != version
+        assert await backend.get_json(claims[15].claim_id) == claims[15].model_dump_json().encode()
+        await backend.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(os.path.join(directory, "claims.db")))
+    print("  ✅ PASS")
+
+
+def test_sqlite_adds_claim_amounts():
+    """A database created before the claim_amount column gets it filled in from the stored claims"""
+    print("Testing the claim_amount column for older SQLite databases...")
+    claims = make_claims(300)
+
+    async def run(path):
+        backend = await fill(SQLiteClaimBackend(path), claims)
+        await backend.close()
+        connection = sqlite3.connect(path)
+        connection.execute("DROP INDEX claims_by_amount")
+        connection.execute("ALTER TABLE claims DROP COLUMN claim_amount")
+        connection.close()
+
+        backend = SQLiteClaimBackend(path)
+        query = ClaimQuery(min_amount=1000.0, sort="amount", limit=1000)
+        assert await paged_ids(backend, query) == expected_ids(claims, query)
+        await backend.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(os.path.join(directory, "claims.db")))
+    print("  ✅ PASS")
+
+
+def test_sqlite_waits_off_the_event_loop():
+    """A write waiting for another connection's transaction leaves the event loop free"""
+    print("Testing SQLite writes waiting for a lock...")
+    claims = make_claims(2)
+
+    async def run(path):
+        backend = await fill(SQLiteClaimBackend(path), claims[:1])
+        other = sqlite3.connect(path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        adding = asyncio.create_task(backend.add_many(claims[1:]))
+        ticks = 0
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert ticks == 20 and not adding.done()
+        other.execute("COMMIT")
+        other.close()
+        assert [added for _, added in await adding] == [True]
+        assert await backend.count() == 2
+        await backend.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(os.path.join(directory, "claims.db")))
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_queries_match()
+    test_claims_are_stored_once()
+    test_sqlite_persists()
+    test_sqlite_adds_claim_amounts()
+    test_sqlite_waits_off_the_event_loop()
@@ -0,0 +1,170 @@
+"""
+Test script for the columnar claim mirror.
+
+Checks filters and per-group statistics computed over the NumPy columns
+against the same aggregation written as a Python loop over the claims.
+"""
+
+import asyncio
+import random
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.models.claim import ClaimData, RoutingDecision
+from app.modules.claim_backend import MemoryClaimBackend
+from app.modules.claim_columns import ClaimColumns, CATEGORY_FIELDS, QUANTILES
+
+TEAMS = ["Fraud Investigation Team", "Legal Claims Department", "VIP Customer Service", "Standard Claims Processing"]
+REGIONS = [None, "Milan", "Rome", "Naples", "Turin"]
+BRANDS = [None, "BMW", "Fiat", "Audi"]
+WARRANTIES = [None, "Basic", "Comprehensive"]
+
+
+def make_claims(count: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    claims = []
+    for i in range(count):
+        claim_date = rng.choice([None, "garbage", f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"])
+        claims.append(RoutingDecision(
+            assigned_team=rng.choice(TEAMS),
+            urgency=rng.choice(["High", "Medium", "Low"]),
+            risk_score=rng.choice([0.0, 0.2, 0.5, 0.7, 1.0]),
+            customer_value=rng.choice(["VIP", "Premium", "Standard"]),
+            reasoning=[],
+            claim_data=ClaimData(
+                claim_region=rng.choice(REGIONS),
+                vehicle_brand=rng.choice(BRANDS),
+                warranty=rng.choice(WARRANTIES),
+                claim_amount_paid=rng.choice([None, round(rng.uniform(100, 30000), 2)]),
+                claim_date=claim_date
+            ),
+            claim_id=f"CLAIM-{i}",
+            is_potential_fraud=rng.random() < 0.2
+        ))
+    return claims
+
+
+def loop_stats(claims: list, by: str, matches) -> dict:
+    """Per-group statistics as a plain loop over RoutingDecision objects"""
+    groups = {}
+    for claim in claims:
+        if matches(claim):
+            groups.setdefault(CATEGORY_FIELDS[by](claim), []).append(claim)
+    stats = {}
+    for group, members in groups.items():
+        amounts = [claim.claim_data.claim_amount_paid for claim in members
+                   if claim.claim_data.claim_amount_paid is not None]
+        stats[group] = {
+            "claims": len(members),
+            "fraud_rate": sum(claim.is_potential_fraud for claim in members) / len(members),
+            "mean_risk_score": sum(claim.risk_score for claim in members) / len(members),
+            "total_claim_amount": sum(amounts),
+            "quantiles": list(np.quantile(amounts, QUANTILES)) if amounts else [None] * len(QUANTILES),
+        }
+    return stats
+
+
+def check_matches_loop(columns: ClaimColumns, claims: list, by: str, mask, matches):
+    expected = loop_stats(claims, by, matches)
+    stats = columns.group_stats(by, mask)
+    assert [group["claims"] for group in stats] == sorted((group["claims"] for group in stats), reverse=True)
+    assert {group["group"] for group in stats} == set(expected), (by, stats)
+    for group in stats:
+        wanted = expected[group["group"]]
+        assert group["claims"] == wanted["claims"]
+        assert np.isclose(group["fraud_rate"], wanted["fraud_rate"])
+        assert np.isclose(group["mean_risk_score"], wanted["mean_risk_score"])
+        assert np.isclose(group["total_claim_amount"], wanted["total_claim_amount"])
+        quantiles = [group["claim_amount_p50"], group["claim_amount_p90"], group["claim_amount_p99"]]
+        if wanted["quantiles"][0] is None:
+            assert quantiles == wanted["quantiles"]
+        else:
+            assert np.allclose(quantiles, wanted["quantiles"])
+
+
+def test_group_stats_match_loop():
+    """Grouping by every category column matches a Python loop"""
+    print("Testing columnar group statistics against a Python loop...")
+    claims = make_claims(3000)
+    columns = ClaimColumns()
+    columns.add_many(claims[:1000])
+    for claim in claims[1000:]:
+        columns.add(claim)
+    assert len(columns) == len(claims)
+
+    for by in CATEGORY_FIELDS:
+        check_matches_loop(columns, claims, by, None, lambda claim: True)
+    print("  ✅ PASS")
+
+
+def test_filters_match_loop():
+    """Category, amount, date and fraud filters select the same claims as a Python loop"""
+    print("Testing columnar filters against a Python loop...")
+    claims = make_claims(3000)
+    columns = ClaimColumns()
+    columns.add_many(claims)
+
+    def parsed(claim):
+        claim_date = claim.claim_data.claim_date
+        return date.fromisoformat(claim_date) if claim_date and claim_date[0].isdigit() else None
+
+    rng = random.Random(5)
+    for _ in range(100):
+        region = rng.choice(REGIONS[1:] + [None, "Atlantis"])
+        brand = rng.choice(BRANDS)
+        low = rng.choice([None, 5000.0])
+        high = rng.choice([None, 20000.0])
+        date_from = rng.choice([None, date(2024, 3, 1)])
+        date_to = rng.choice([None, date(2024, 9, 30)])
+        fraud = rng.choice([None, True, False])
+
+        def matches(claim):
+            amount = claim.claim_data.claim_amount_paid
+            claim_date = parsed(claim)
+            return (
+                (region is None or claim.claim_data.claim_region == region)
+                and (brand is None or claim.claim_data.vehicle_brand == brand)
+                and (low is None or (amount is not None and amount >= low))
+                and (high is None or (amount is not None and amount <= high))
+                and (date_from is None or (claim_date is not None and claim_date >= date_from))
+                and (date_to is None or (claim_date is not None and claim_date <= date_to))
+                and (fraud is None or claim.is_potential_fraud == fraud)
+            )
+
+        equals = {name: value for name, value in (("region", region), ("brand", brand)) if value is not None}
+        ranges = {"claim_amount": (low, high)} if low is not None or high is not None else {}
+        mask = columns.mask(equals, ranges, date_from, date_to, fraud)
+        assert np.flatnonzero(mask).tolist() == [i for i, claim in enumerate(claims) if matches(claim)]
+        check_matches_loop(columns, claims, rng.choice(list(CATEGORY_FIELDS)), mask, matches)
+    print("  ✅ PASS")
+
+
+def test_store_keeps_columns():
+    """The in-memory store mirrors every added claim once, in storage order"""
+    print("Testing the columnar mirror of the in-memory store...")
+    claims = make_claims(50)
+
+    async def run():
+        backend = MemoryClaimBackend()
+        await backend.add_many(claims[:20])
+        for claim in claims[10:]:
+            await backend.add_many([claim])
+        return backend
+
+    backend = asyncio.run(run())
+    columns = backend.claim_columns
+    assert len(columns) == len(claims)
+    teams = columns.categories["team"]
+    assert [teams.categories[code] for code in teams.codes.values] == [claim.assigned_team for claim in claims]
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_group_stats_match_loop()
+    test_filters_match_loop()
+    test_store_keeps_columns()
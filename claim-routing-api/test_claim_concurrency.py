@@ -0,0 +1,191 @@
+"""
+Stress test for the in-memory claim store shared between threads.
+
+Writer threads add claims in small batches, some of them the same claims at
+the same time, while reader threads look claims up, page through queries and
+read counts and totals. Writers also try to add claims that cannot be
+stored. Readers check that every answer is consistent with some moment of
+the store, and once the writers are done the store must hold each claim
+exactly once, none of the failed ones, and answer every query like a store
+filled from a single thread. Prints the add and read throughput.
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.models.claim import ClaimQuery
+from app.modules.claim_backend import MemoryClaimBackend
+from test_claim_backends import check_queries_match
+from test_claim_index import TEAMS, make_claims
+from test_claim_stats import check_totals
+
+WRITERS = 4
+READERS = 4
+CLAIMS = 6000
+# Claims every writer adds, to race on the same claim IDs
+SHARED_CLAIMS = 300
+HOT_CLAIMS = 1000
+SEGMENT_CLAIMS = 500
+# Each writer tries to add a claim that cannot be stored after this many batches
+BROKEN_EVERY = 25
+
+
+def broken_claim(claim, claim_id: str):
+    """A copy of the claim, under another ID, with a reason that is not a string, so it cannot be stored"""
+    return claim.model_copy(update={"claim_id": claim_id, "reasoning": [*claim.reasoning, 1]})
+
+
+def run_threads(targets: list) -> None:
+    """Run each coroutine function on its own thread and event loop, re-raising the first failure"""
+    errors = []
+
+    def run(target):
+        try:
+            asyncio.run(target())
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def check_page(claims: list, query: ClaimQuery) -> None:
+    """A page holds distinct claims matching the query, in its sort order"""
+    assert len({claim.claim_id for claim in claims}) == len(claims)
+    assert all(claim.assigned_team == query.team for claim in claims)
+    risks = [claim.risk_score for claim in claims]
+    assert risks == sorted(risks, reverse=True)
+
+
+def test_concurrent_writers_and_readers():
+    """Claims added from many threads are stored once and readers never see a half-added claim"""
+    print("Testing concurrent writers and readers...")
+    claims = make_claims(CLAIMS, seed=9)
+    by_id = {claim.claim_id: claim for claim in claims}
+    shared, own = claims[:SHARED_CLAIMS], claims[SHARED_CLAIMS:]
+    writing = threading.Event()
+    writing.set()
+    counts = {"adds": 0, "reads": 0}
+    counts_lock = threading.Lock()
+
+    def writer(number: int):
+        async def write():
+            rng = random.Random(number)
+            batch = shared + own[number::WRITERS]
+            rng.shuffle(batch)
+            start = batches = 0
+            while start < len(batch):
+                size = rng.randint(1, 20)
+                for stored, added in await backend.add_many(batch[start:start + size]):
+                    assert stored == by_id[stored.claim_id]
+                start += size
+                batches += 1
+                if batches % BROKEN_EVERY == 0:
+                    try:
+                        await backend.add_many([broken_claim(batch[0], f"BROKEN-{number}-{batches}")])
+                        raise AssertionError("A claim that cannot be stored was added")
+                    except TypeError:
+                        pass
+            with counts_lock:
+                counts["adds"] += len(batch)
+        return write
+
+    def reader(number: int):
+        async def read():
+            rng = random.Random(100 + number)
+            reads, last_count = 0, 0
+            while writing.is_set():
+                count = await backend.count()
+                assert count >= last_count
+                last_count = count
+                claim = rng.choice(claims)
+                stored = await backend.get(claim.claim_id)
+                assert stored is None or stored == claim
+                encoded = await backend.get_json(claim.claim_id)
+                assert encoded is None or encoded == claim.model_dump_json().encode()
+                query = ClaimQuery(team=rng.choice(TEAMS), sort="risk", limit=50)
+                page, _ = await backend.query(query)
+                check_page(page, query)
+                assert all(by_id[claim.claim_id] == claim for claim in page)
+                stats = backend.get_stats().snapshot()
+                assert stats["total"]["claims"] >= count
+                reads += 5
+            with counts_lock:
+                counts["reads"] += reads
+        return read
+
+    async def check_store():
+        assert await backend.count() == CLAIMS
+        stored = [by_id[record.claim_id] for record in backend.claim_records]
+        assert sorted(claim.claim_id for claim in stored) == sorted(by_id)
+        assert not any(claim_id.startswith("BROKEN-") for claim_id in backend.claim_index.by_id)
+        assert len(backend.claim_columns) == len(backend.claim_index.claim_amounts) == CLAIMS
+        await check_queries_match(backend, stored, queries=50)
+        check_totals(backend.get_stats().snapshot(), stored)
+        await backend.close()
+
+    switch_interval = sys.getswitchinterval()
+    # Switch threads far more often than usual, to interleave writers and readers mid-update
+    sys.setswitchinterval(1e-5)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            backend = MemoryClaimBackend(HOT_CLAIMS, directory, SEGMENT_CLAIMS)
+            start = time.perf_counter()
+
+            async def write_all():
+                try:
+                    run_threads([writer(number) for number in range(WRITERS)])
+                finally:
+                    writing.clear()
+
+            run_threads([write_all] + [reader(number) for number in range(READERS)])
+            seconds = time.perf_counter() - start
+            asyncio.run(check_store())
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    print(f"  {counts['adds'] / seconds:,.0f} adds/s and {counts['reads'] / seconds:,.0f} reads/s "
+          f"with {WRITERS} writers and {READERS} readers")
+    print("  ✅ PASS")
+
+
+def test_failed_insert_leaves_no_trace():
+    """A claim that cannot be stored takes no position, so the next claim is stored and found as usual"""
+    print("Testing a failed claim insert...")
+    first, second = make_claims(2, seed=10)
+
+    async def run():
+        backend = MemoryClaimBackend()
+        try:
+            await backend.add_many([broken_claim(first, first.claim_id)])
+            raise AssertionError("A claim that cannot be stored was added")
+        except TypeError:
+            pass
+        assert await backend.add_many([second]) == [(second, True)]
+        assert await backend.get(first.claim_id) is None
+        assert await backend.get(second.claim_id) == second
+        assert await backend.add_many([first]) == [(first, True)]
+        assert await backend.get(first.claim_id) == first
+        assert len(backend.claim_columns) == 2
+        check_totals(backend.get_stats().snapshot(), [second, first])
+        await backend.close()
+
+    asyncio.run(run())
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_concurrent_writers_and_readers()
+    test_failed_insert_leaves_no_trace()
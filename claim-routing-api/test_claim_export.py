@@ -0,0 +1,93 @@
+"""
+Test script for the CSV and Parquet claim exports.
+
+Exports claims from an in-memory store in small chunks and checks that every
+claim comes back, in order, with its claim data flattened into columns.
+Parquet is only checked when pyarrow is installed.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.models.claim import ClaimQuery
+from app.modules.claim_backend import MemoryClaimBackend
+from app.modules.claim_export import EXPORT_COLUMN_NAMES, CSVExport, ParquetExport, encode_chunks
+from test_claim_backends import fill
+from test_claim_index import make_claims
+
+CHUNK_ROWS = 300
+
+
+def exported(claims: list, export, query: ClaimQuery = ClaimQuery()) -> bytes:
+    async def run():
+        backend = await fill(MemoryClaimBackend(), claims)
+        return b"".join([data async for data in encode_chunks(backend.export_json(query), export, CHUNK_ROWS)])
+
+    return asyncio.run(run())
+
+
+def expected_row(claim) -> dict:
+    data = claim.claim_data
+    return {
+        "claim_id": claim.claim_id,
+        "assigned_team": claim.assigned_team,
+        "risk_score": claim.risk_score,
+        "reasoning": claim.reasoning,
+        "claim_amount_paid": data.claim_amount_paid,
+        "claim_region": data.claim_region,
+        "claim_date": data.claim_date,
+        "extracted_claim_id": data.claim_id,
+        "fraud_score": data.fraud_indicator.fraud_score if data.fraud_indicator else None,
+    }
+
+
+def test_csv_export():
+    """Every claim is one CSV line, in store order"""
+    print("Testing CSV claim export...")
+    claims = make_claims(2000)
+    claims[3].reasoning = ['Quoted "reason", with a comma']
+    rows = list(csv.DictReader(io.StringIO(exported(claims, CSVExport()).decode())))
+    assert list(rows[0]) == EXPORT_COLUMN_NAMES
+    assert len(rows) == len(claims)
+    for row, claim in zip(rows, claims):
+        for name, value in expected_row(claim).items():
+            if name == "reasoning":
+                assert json.loads(row[name]) == value, name
+            elif isinstance(value, float):
+                assert float(row[name]) == value, name
+            else:
+                assert row[name] == ("" if value is None else value), name
+    print("  ✅ PASS")
+
+
+def test_parquet_export():
+    """Every claim is one Parquet row, in row groups of the chunk size"""
+    print("Testing Parquet claim export...")
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        print("  pyarrow is not installed, skipped")
+        return
+    claims = make_claims(2000)
+    team = claims[0].assigned_team
+    parquet = pyarrow.parquet.ParquetFile(io.BytesIO(exported(claims, ParquetExport(), ClaimQuery(team=team))))
+    team_claims = [claim for claim in claims if claim.assigned_team == team]
+    assert parquet.metadata.num_rows == len(team_claims)
+    row_groups = [parquet.metadata.row_group(i).num_rows for i in range(parquet.metadata.num_row_groups)]
+    assert len(row_groups) > 1 and set(row_groups[:-1]) == {CHUNK_ROWS}
+    rows = parquet.read().to_pylist()
+    assert list(rows[0]) == EXPORT_COLUMN_NAMES
+    for row, claim in zip(rows, team_claims):
+        assert {name: row[name] for name in expected_row(claim)} == expected_row(claim)
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_csv_export()
+    test_parquet_export()
@@ -0,0 +1,75 @@
+"""
+Test script for the live claim feed.
+
+Checks per-team delivery and that a subscriber whose buffer overflows is dropped.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.models.claim import ClaimData, RoutingDecision
+from app.modules.claim_feed import ClaimFeed
+
+
+def make_claim(claim_id: str, team: str) -> RoutingDecision:
+    return RoutingDecision(
+        assigned_team=team,
+        urgency="Low",
+        risk_score=0.0,
+        customer_value="Standard",
+        reasoning=[],
+        claim_data=ClaimData(),
+        claim_id=claim_id
+    )
+
+
+def test_team_subscriptions():
+    """Team subscribers only get their team's claims; all-team subscribers get everything"""
+    print("Testing per-team subscriptions...")
+
+    async def run():
+        feed = ClaimFeed(buffer_size=10)
+        legal = feed.subscribe("Legal Claims Department")
+        everyone = feed.subscribe()
+
+        feed.publish(make_claim("C-1", "Legal Claims Department"))
+        feed.publish(make_claim("C-2", "VIP Customer Service"))
+
+        assert legal.queue.qsize() == 1 and '"C-1"' in legal.queue.get_nowait()
+        assert everyone.queue.qsize() == 2
+
+        feed.unsubscribe(legal)
+        feed.unsubscribe(everyone)
+        assert feed.subscriber_count == 0
+
+    asyncio.run(run())
+    print("  ✅ PASS")
+
+
+def test_slow_subscriber_is_dropped():
+    """A subscriber that does not keep up is dropped without affecting the others"""
+    print("Testing slow subscriber handling...")
+
+    async def run():
+        feed = ClaimFeed(buffer_size=3)
+        slow = feed.subscribe()
+        fast = feed.subscribe()
+
+        for i in range(5):
+            feed.publish(make_claim(f"C-{i}", "Standard Claims Processing"))
+            fast.queue.get_nowait()
+
+        assert slow.dropped and not fast.dropped
+        assert feed.dropped_count == 1
+        assert feed.subscriber_count == 1
+
+    asyncio.run(run())
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_team_subscriptions()
+    test_slow_subscriber_is_dropped()
@@ -0,0 +1,191 @@
+"""
+Test script for dashboard queries over the claim indexes.
+
+Pages through claims with every combination of filters and sort orders and
+checks the result against filtering and sorting the full claim list.
+"""
+
+import random
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.models.claim import ClaimData, RoutingDecision, ClaimQuery
+from app.modules.claim_records import ClaimRecord
+from app.modules.claim_index import ClaimIndex, SortedIndex, URGENCY_RANK
+
+TEAMS = ["Fraud Investigation Team", "Legal Claims Department", "VIP Customer Service", "Standard Claims Processing"]
+URGENCIES = ["High", "Medium", "Low"]
+VALUES = ["VIP", "Premium", "Standard"]
+
+
+def make_claims(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    claims = []
+    for i in range(count):
+        claim_date = rng.choice([None, "garbage", f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"])
+        claim_amount = rng.choice([None, 0.0, 800.0, 4500.5, 15000.0, 15000.0, 62000.0])
+        claims.append(RoutingDecision(
+            assigned_team=rng.choice(TEAMS),
+            urgency=rng.choice(URGENCIES),
+            risk_score=rng.choice([0.0, 0.2, 0.3, 0.5, 0.7, 0.9, 1.0]),
+            customer_value=rng.choice(VALUES),
+            reasoning=[],
+            claim_data=ClaimData(claim_date=claim_date, claim_amount_paid=claim_amount),
+            claim_id=f"CLAIM-{i}",
+            is_potential_fraud=rng.random() < 0.2
+        ))
+    return claims
+
+
+def expected_ids(claims: list, query: ClaimQuery) -> list:
+    def matches(claim):
+        claim_date = claim.claim_data.claim_date
+        amount = claim.claim_data.claim_amount_paid
+        parsed = date.fromisoformat(claim_date) if claim_date and claim_date[0].isdigit() else None
+        return (
+            (query.team is None or claim.assigned_team == query.team)
+            and (query.urgency is None or claim.urgency == query.urgency)
+            and (query.customer_value is None or claim.customer_value == query.customer_value)
+            and (query.is_potential_fraud is None or claim.is_potential_fraud == query.is_potential_fraud)
+            and (query.min_risk is None or claim.risk_score >= query.min_risk)
+            and (query.max_risk is None or claim.risk_score <= query.max_risk)
+            and (query.min_amount is None or (amount is not None and amount >= query.min_amount))
+            and (query.max_amount is None or (amount is not None and amount <= query.max_amount))
+            and (query.date_from is None or (parsed is not None and parsed >= query.date_from))
+            and (query.date_to is None or (parsed is not None and parsed <= query.date_to))
+        )
+
+    keyed = [(position, claim) for position, claim in enumerate(claims) if matches(claim)]
+    if query.sort == "risk":
+        keyed.sort(key=lambda item: (-item[1].risk_score, item[0]))
+    elif query.sort == "urgency":
+        keyed.sort(key=lambda item: (URGENCY_RANK[item[1].urgency], item[0]))
+    elif query.sort == "amount":
+        # Largest first, then claims without an amount
+        keyed.sort(key=lambda item: (
+            item[1].claim_data.claim_amount_paid is None, -(item[1].claim_data.claim_amount_paid or 0), item[0]
+        ))
+    return [claim.claim_id for _, claim in keyed]
+
+
+def paged_ids(index: ClaimIndex, claims: list, records: list, query: ClaimQuery) -> list:
+    ids = []
+    while True:
+        positions, cursor = index.search(records, query)
+        ids.extend(claims[position].claim_id for position in positions)
+        if cursor is None:
+            return ids
+        query = query.model_copy(update={"cursor": cursor})
+
+
+def test_paged_queries_match_full_scan():
+    """Every page sequence must equal filtering and sorting the whole list"""
+    print("Testing indexed dashboard queries...")
+    claims = make_claims(2000)
+    records = [ClaimRecord(claim) for claim in claims]
+    load = SortedIndex.LOAD
+    # Small sublists, so that ranges span many of them
+    SortedIndex.LOAD = 16
+    try:
+        index = ClaimIndex()
+        index.add_many(0, claims[:1000])
+        for position, claim in enumerate(claims[1000:], 1000):
+            index.add(position, claim)
+    finally:
+        SortedIndex.LOAD = load
+
+    rng = random.Random(11)
+    for _ in range(400):
+        query = ClaimQuery(
+            team=rng.choice([None, None] + TEAMS),
+            urgency=rng.choice([None, None] + URGENCIES),
+            customer_value=rng.choice([None, None] + VALUES),
+            is_potential_fraud=rng.choice([None, None, True, False]),
+            min_risk=rng.choice([None, 0.3, 0.5]),
+            max_risk=rng.choice([None, 0.7, 0.9]),
+            min_amount=rng.choice([None, None, 1000.0, 15000.0]),
+            max_amount=rng.choice([None, None, 15000.0, 50000.0]),
+            date_from=rng.choice([None, date(2024, 3, 1)]),
+            date_to=rng.choice([None, date(2024, 9, 30)]),
+            sort=rng.choice(["submitted", "risk", "urgency", "amount"]),
+            limit=rng.choice([1, 7, 50, 1000])
+        )
+        assert paged_ids(index, claims, records, query) == expected_ids(claims, query), query
+
+    print("  ✅ PASS")
+
+
+def test_sorted_index_ranges():
+    """Ranges and counts match a sorted list, across many small sublists filled pair by pair and in batches"""
+    print("Testing the sorted range index...")
+    rng = random.Random(3)
+    index = SortedIndex()
+    index.LOAD = 4
+    items = []
+    for position in range(600):
+        item = (rng.choice([-1.0, -0.5, 0.0, 2.5]), position)
+        items.append(item)
+        index.add(item)
+    batch = [(rng.choice([-1.0, 0.0, 2.5, 7.0]), position) for position in range(600, 620)]
+    items.extend(batch)
+    index.update(batch)
+    items.sort()
+    assert len(index) == len(items) and list(index.irange()) == items
+
+    bounds = [None, (-1.0, -1), (-0.5, 700), (0.0, 300), (2.5, -1), (9.0, -1)]
+    for _ in range(300):
+        low, high, after = rng.choice(bounds), rng.choice(bounds), rng.choice(bounds + items[:50])
+        expected = [
+            item for item in items
+            if (low is None or item >= low) and (high is None or item <= high) and (after is None or item > after)
+        ]
+        assert list(index.irange(low, high, after)) == expected, (low, high, after)
+        assert index.count(low, high, after) == len(expected), (low, high, after)
+
+    print("  ✅ PASS")
+
+
+def test_invalid_cursor_is_rejected():
+    """Cursors from another sort order or garbage cursors raise ValueError"""
+    print("Testing cursor validation...")
+    claims = make_claims(10)
+    records = [ClaimRecord(claim) for claim in claims]
+    index = ClaimIndex()
+    for position, claim in enumerate(claims):
+        index.add(position, claim)
+
+    _, cursor = index.search(records, ClaimQuery(sort="risk", limit=2))
+    for bad_query in [ClaimQuery(sort="urgency", cursor=cursor), ClaimQuery(cursor="not-a-cursor")]:
+        try:
+            index.search(records, bad_query)
+        except ValueError as e:
+            print(f"  Rejected: {e}")
+        else:
+            raise AssertionError("Invalid cursor was accepted")
+
+    print("  ✅ PASS")
+
+
+def test_empty_filters_match_everything():
+    """Empty filter parameters, e.g. team=, are no filter"""
+    print("Testing empty filters...")
+    claims = make_claims(50)
+    records = [ClaimRecord(claim) for claim in claims]
+    index = ClaimIndex()
+    for position, claim in enumerate(claims):
+        index.add(position, claim)
+
+    query = ClaimQuery.model_validate({"team": "", "urgency": "", "customer_value": "", "cursor": "", "fields": ""})
+    assert query == ClaimQuery()
+    assert index.search(records, query) == index.search(records, ClaimQuery())
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_paged_queries_match_full_scan()
+    test_sorted_index_ranges()
+    test_invalid_cursor_is_rejected()
+    test_empty_filters_match_everything()
@@ -0,0 +1,258 @@
+"""
+Test script for the claim write-ahead log.
+
+Checks that logged records are recovered in order, that snapshots replace
+older segments, that a record torn by a crash is dropped, and that the
+in-memory store restored from the state saved with a snapshot matches the
+one rebuilt from every record.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from pydantic_core import to_json
+
+sys.path.append(str(Path(__file__).parent))
+
+from app import config
+from app.models.claim import ClaimData, FraudIndicator, RoutingDecision
+from app.modules.claim_backend import STATE_VERSION, MemoryClaimBackend
+from app.modules.claim_log import ClaimLog
+
+
+def open_log(directory, snapshot_every=1000):
+    """Recover a log and start it, as ClaimDatabase.open_log does"""
+    log = ClaimLog(directory, flush_interval=0.001, snapshot_every=snapshot_every)
+    records = [record for chunk in log.recover() for record in chunk]
+    log.start(records)
+    return log, records
+
+
+def test_recovery():
+    """Records appended before close are recovered in order"""
+    print("Testing recovery...")
+    with tempfile.TemporaryDirectory() as directory:
+        log, records = open_log(directory)
+        for i in range(100):
+            records.append(b'{"n":%d}' % i)
+            log.append(records[-1])
+        log.close()
+
+        log, recovered = open_log(directory)
+        assert recovered == [b'{"n":%d}' % i for i in range(100)]
+        assert log.append(b'{"n":100}') == 101
+        log.close()
+    print("  ✅ PASS")
+
+
+def test_group_commit():
+    """wait_durable returns once the flusher has fsynced the record"""
+    print("Testing group commit...")
+    with tempfile.TemporaryDirectory() as directory:
+        log, records = open_log(directory)
+
+        async def append_and_wait(i):
+            seq = log.append(b'{"n":%d}' % i)
+            await log.wait_durable(seq)
+            return seq
+
+        async def main():
+            return await asyncio.gather(*(append_and_wait(i) for i in range(50)))
+
+        assert sorted(asyncio.run(main())) == list(range(1, 51))
+        assert log.durable == 50
+        log.close()
+    print("  ✅ PASS")
+
+
+def test_snapshot():
+    """A snapshot is written after snapshot_every records and older segments are deleted"""
+    print("Testing snapshots...")
+    with tempfile.TemporaryDirectory() as directory:
+        log, records = open_log(directory, snapshot_every=10)
+        for i in range(25):
+            records.append(b'{"n":%d}' % i)
+            log.append(records[-1])
+            time.sleep(0.005)
+        log.close()
+
+        files = sorted(os.listdir(directory))
+        print(f"  Files: {files}")
+        assert len([name for name in files if name.startswith("snapshot-")]) == 1
+        assert "wal-000000000000.log" not in files
+
+        log, recovered = open_log(directory, snapshot_every=10)
+        assert recovered == [b'{"n":%d}' % i for i in range(25)]
+        log.close()
+    print("  ✅ PASS")
+
+
+def test_torn_record():
+    """A partially written last record is dropped and the segment can be appended to again"""
+    print("Testing torn records...")
+    with tempfile.TemporaryDirectory() as directory:
+        log, records = open_log(directory)
+        log.append(b'{"n":0}')
+        log.close()
+        with open(os.path.join(directory, "wal-000000000000.log"), "ab") as segment:
+            segment.write(b'{"n":1')
+
+        log, recovered = open_log(directory)
+        assert recovered == [b'{"n":0}']
+        log.append(b'{"n":2}')
+        log.close()
+
+        log, recovered = open_log(directory)
+        assert recovered == [b'{"n":0}', b'{"n":2}']
+        log.close()
+    print("  ✅ PASS")
+
+
+def test_snapshot_state():
+    """The state written with a snapshot is found for the latest snapshot only, and deleted with it"""
+    print("Testing snapshot states...")
+    with tempfile.TemporaryDirectory() as directory:
+        log = ClaimLog(directory, flush_interval=0.001, snapshot_every=10)
+        records = [record for chunk in log.recover() for record in chunk]
+        log.start(records, lambda seq, file: file.write(b"state of %d records" % seq))
+        for i in range(25):
+            records.append(b'{"n":%d}' % i)
+            log.append(records[-1])
+            time.sleep(0.005)
+        log.close()
+
+        states = [name for name in os.listdir(directory) if name.endswith(".state")]
+        assert len(states) == 1
+        state = log.latest_state()
+        assert state == os.path.join(directory, states[0])
+        with open(state, "rb") as file:
+            assert file.read() == b"state of %d records" % log.snapshot_seq
+
+        # A state without its snapshot, e.g. after a crash before it was renamed, is not used
+        os.rename(state, os.path.join(directory, "snapshot-000000000001.state"))
+        assert ClaimLog(directory, 0.001, 10).latest_state() is None
+    print("  ✅ PASS")
+
+
+def make_claims(count: int):
+    """Routing decisions with and without amounts, dates and fraud indicators"""
+    rng = random.Random(4)
+    claims = []
+    for i in range(count):
+        fraud = rng.random() < 0.2
+        claims.append(RoutingDecision(
+            assigned_team=rng.choice(["Fraud Investigation Team", "VIP Customer Service", "Standard Claims Processing"]),
+            urgency=rng.choice(["High", "Medium", "Low"]),
+            risk_score=rng.choice([0.0, 0.25, 0.5, 0.75, 1.0]),
+            customer_value=rng.choice(["VIP", "Premium", "Standard"]),
+            reasoning=[f"High-risk region ({rng.choice(['Napoli', 'Bari'])})", "Claim amount > €15,000"],
+            claim_data=ClaimData(
+                claim_amount_paid=rng.choice([None, round(rng.uniform(100, 30000), 2)]),
+                claim_region=rng.choice([None, "Campania", "Puglia", "Lazio"]),
+                vehicle_brand=rng.choice(["Fiat", "BMW"]),
+                claim_date=rng.choice([None, "not a date", f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"]),
+                fraud_indicator=FraudIndicator(
+                    is_potential_fraud=fraud, fraud_score=0.8 if fraud else 0.1,
+                    fraud_indicators=["Claim filed within 30 days of policy start"] if fraud else []
+                ),
+            ),
+            claim_id=f"CLAIM-{i:06d}",
+            is_potential_fraud=fraud,
+            fraud_indicators=["Claim filed within 30 days of policy start"] if fraud else [],
+        ))
+    return claims
+
+
+def store_contents(store: MemoryClaimBackend) -> dict:
+    """Everything a restored store must have rebuilt, in comparable form"""
+    index = store.claim_index
+    return {
+        "claims": store.claim_count,
+        "decisions": [record.decision() for record in store.claim_records],
+        "encodings": store.claim_tiers.encodings_at(range(store.claim_count)),
+        "by_id": index.by_id,
+        "postings": [dict(index.by_team), dict(index.by_urgency), dict(index.by_customer_value), dict(index.by_fraud)],
+        "ranges": [list(index.by_risk.irange()), list(index.by_amount.irange()), list(index.by_date.irange())],
+        "values": [index.claim_amounts, index.claim_dates],
+        # Missing numbers as a value that compares equal, unlike NaN
+        "columns": [np.nan_to_num(array.values, nan=-1).tolist() for array in store.claim_columns._arrays],
+        "categories": [column.categories for column in store.claim_columns.categories.values()],
+        "stats": store.claim_stats.snapshot(),
+        "versions": dict(store.claim_versions.team_versions),
+    }
+
+
+def test_store_restored_from_state():
+    """A store restored from a snapshot's state matches one rebuilt from every record, and keeps logging"""
+    print("Testing store restore from a snapshot state...")
+    snapshot_every = config.CLAIM_LOG_SNAPSHOT_EVERY
+    config.CLAIM_LOG_SNAPSHOT_EVERY = 500
+    claims = make_claims(1300)
+
+    async def run(directory):
+        store = MemoryClaimBackend()
+        store.open_log(directory)
+        for start in range(0, 1200, 100):
+            await store.add_many(claims[start:start + 100])
+            await asyncio.sleep(0.02)
+        await store.close()
+
+        restored = MemoryClaimBackend()
+        assert restored.open_log(directory) == 1200
+        await restored.add_many(claims[1200:])
+        assert (await restored.get("CLAIM-000007")) == claims[7]
+        await restored.close()
+
+        state = ClaimLog(directory, 0.001, 500).latest_state()
+        assert state is not None
+        assert MemoryClaimBackend()._load_state(state) == 1000
+        from_state = MemoryClaimBackend()
+        from_state.open_log(directory)
+        contents = store_contents(from_state)
+        await from_state.close()
+
+        # The same log replayed record by record, without the state
+        os.remove(state)
+        replayed = MemoryClaimBackend()
+        replayed.open_log(directory)
+        assert store_contents(replayed) == contents
+        await replayed.close()
+
+        # An unreadable state, or one of another version, is ignored
+        with open(state, "wb") as file:
+            file.write(b"not a state")
+        assert MemoryClaimBackend()._load_state(state) == 0
+        with open(state, "wb") as file:
+            header = np.frombuffer(to_json({"version": STATE_VERSION + 1, "claims": 1300}), np.uint8)
+            np.savez(file, header=header)
+        assert MemoryClaimBackend()._load_state(state) == 0
+        broken = MemoryClaimBackend()
+        assert broken.open_log(directory) == 1300
+        assert store_contents(broken) == contents
+        await broken.close()
+        return contents
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            contents = asyncio.run(run(directory))
+    finally:
+        config.CLAIM_LOG_SNAPSHOT_EVERY = snapshot_every
+    assert contents["claims"] == 1300 and contents["decisions"] == claims
+    print(f"  {contents['stats']['total']['claims']} claims, "
+          f"total amount {contents['stats']['total']['total_claim_amount']:.2f}")
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_recovery()
+    test_group_commit()
+    test_snapshot()
+    test_torn_record()
+    test_snapshot_state()
+    test_store_restored_from_state()
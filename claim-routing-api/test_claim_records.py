@@ -0,0 +1,154 @@
+"""
+Test script for the compact claim records of the in-memory store.
+
+Checks that a ClaimRecord gives back the exact routing decision it was made
+from, for claims routed by the business rules and for reasons that cannot
+be split into a template and a parameter, that records share repeated risk
+scores and fraud indicators, that structured claims with non-text values in
+text fields can be stored, and that records saved as JSON keep their meaning
+when their reason templates are loaded in a new codebook.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from pydantic_core import from_json, to_json
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.models.claim import ClaimData, FraudIndicator, RoutingDecision
+from app.modules.claim_backend import MemoryClaimBackend
+from app.modules.claim_records import (
+    INTERNED_DATA_FIELDS, RAW_REASON, ClaimRecord, ReasonCodes, reason_codes, shared_values
+)
+from app.modules.pipeline import ClaimPipeline
+from benchmark_claim_records import routed_encodings
+from test_claim_columns import make_claims
+
+
+def assert_round_trip(claim: RoutingDecision) -> None:
+    decision = ClaimRecord(claim).decision()
+    assert decision == claim, claim.claim_id
+    assert decision.model_dump_json() == claim.model_dump_json(), claim.claim_id
+
+
+def test_routed_claims_round_trip():
+    """Records of routed and generated claims give back the same decisions"""
+    print("Testing claim record round trip...")
+    for encoded in routed_encodings(500):
+        assert_round_trip(RoutingDecision.model_validate_json(encoded))
+    for claim in make_claims(500, seed=5):
+        assert_round_trip(claim)
+    print("  ✅ PASS")
+
+
+def test_repeated_values_shared():
+    """Records of claims with the same risk score or fraud indicator share one copy of it"""
+    print("Testing shared record values...")
+    records = [ClaimRecord(RoutingDecision.model_validate_json(encoded)) for encoded in routed_encodings(200)]
+    risk_scores = {record.risk_score for record in records}
+    assert len({id(record.risk_score) for record in records}) == len(risk_scores)
+    fraud_indicators = [record.claim_data_values[-1] for record in records]
+    assert len({id(indicator) for indicator in fraud_indicators}) == len(set(fraud_indicators))
+
+    # Values that are equal but print differently are kept apart
+    assert shared_values.share(-0.0) is not shared_values.share(0.0)
+    assert type(shared_values.share(1)) is int and type(shared_values.share(1.0)) is float
+    print("  ✅ PASS")
+
+
+def test_unusual_reasons_round_trip():
+    """Reasons with braces, zero-padded or non-ASCII numbers and odd amounts are kept exactly"""
+    print("Testing unusual claim reasons...")
+    reasons = [
+        "Template {braces} (1)",
+        "Policy number (007)",
+        "Arabic digits (٣)",
+        "Odd amount (€1.5)",
+        "Amount (€12.30)",
+        "Unclosed (reason",
+        "",
+    ]
+    claim = RoutingDecision(
+        assigned_team="Standard Claims Team",
+        urgency="medium",
+        risk_score=0.5,
+        customer_value="low",
+        reasoning=reasons,
+        claim_data=ClaimData(
+            claim_id="CLAIM-1",
+            claim_amount_paid=12.3,
+            fraud_indicator=FraudIndicator(is_potential_fraud=True, fraud_score=0.9, fraud_indicators=reasons[::-1]),
+        ),
+        claim_id="CLAIM-1",
+        is_potential_fraud=True,
+        fraud_indicators=reasons,
+    )
+    assert_round_trip(claim)
+    assert reason_codes.encode("Template {braces} (1)")[0] == RAW_REASON
+    print("  ✅ PASS")
+
+
+def test_non_text_structured_values():
+    """Numbers in the text fields of structured claims are stored as text"""
+    print("Testing non-text structured values...")
+    fields = {
+        "VEHICLE_BRAND": "vehicle_brand", "VEHICLE_MODEL": "vehicle_model", "CLAIM_REGION": "claim_region",
+        "CLAIM_PROVINCE": "claim_province", "POLICYHOLDER_GENDER": "policyholder_gender", "CLAIM_DATE": "claim_date",
+    }
+    claims = [
+        ClaimPipeline.route_input({"structured_data": {"CLAIM_ID": f"F{i}", "CLAIM_AMOUNT_PAID": 1000.0, key: 500}})
+        for i, key in enumerate(fields)
+    ]
+    for claim, field in zip(claims, fields.values()):
+        assert getattr(claim.claim_data, field) == "500", field
+
+    async def store():
+        backend = MemoryClaimBackend()
+        await backend.add_many(claims)
+        for claim in claims:
+            assert await backend.get(claim.claim_id) == claim
+        await backend.close()
+
+    asyncio.run(store())
+
+    # Decisions built without validation are stored the same way
+    claim = claims[0].model_copy(deep=True)
+    for field in INTERNED_DATA_FIELDS:
+        setattr(claim.claim_data, field, 7)
+    decision = ClaimRecord(claim).decision()
+    assert all(getattr(decision.claim_data, field) == "7" for field in INTERNED_DATA_FIELDS)
+    print("  ✅ PASS")
+
+
+def test_reason_templates_loaded():
+    """Saved templates keep their codes in a codebook they agree with, and are refused by one they clash with"""
+    print("Testing loading reason templates...")
+    saved = ReasonCodes()
+    codes = saved.encode_all(["High-risk region (Napoli)", "Claim amount > €15,000 (€17250.00)", "Vehicle brand = BMW"])
+
+    fresh = ReasonCodes()
+    assert fresh.load(saved.templates[:1]) and fresh.load(saved.templates)
+    assert fresh.decode_all(codes) == saved.decode_all(codes)
+    assert fresh.encode_all(["Vehicle brand = BMW"]) == saved.encode_all(["Vehicle brand = BMW"])
+
+    clashing = ReasonCodes()
+    clashing.encode("Vehicle brand = BMW")
+    assert not clashing.load(saved.templates)
+    assert clashing.templates == ["Vehicle brand = BMW"]
+
+    for encoded in routed_encodings(50):
+        claim = RoutingDecision.model_validate_json(encoded)
+        record = ClaimRecord.from_values(from_json(to_json(ClaimRecord(claim).values())))
+        assert record.decision() == claim
+        assert record.values() == ClaimRecord(claim).values()
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_routed_claims_round_trip()
+    test_repeated_values_shared()
+    test_unusual_reasons_round_trip()
+    test_non_text_structured_values()
+    test_reason_templates_loaded()
@@ -0,0 +1,98 @@
+"""
+Test script for the running claim totals behind /stats.
+
+Checks the totals kept as claims are stored, added one by one, in batches
+and restored from the claim log, against the same totals computed from the
+full claim list.
+"""
+
+import asyncio
+import math
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.models.claim import ClaimStats
+from app.modules.claim_backend import MemoryClaimBackend
+from app.modules.claim_stats import GROUPS
+from test_claim_columns import make_claims
+
+
+def computed_totals(claims: list) -> dict:
+    """Totals of a group of claims, computed from the whole list"""
+    amounts = [claim.claim_data.claim_amount_paid for claim in claims if claim.claim_data.claim_amount_paid is not None]
+    return {
+        "claims": len(claims),
+        "fraud_claims": sum(claim.is_potential_fraud for claim in claims),
+        "claims_with_amount": len(amounts),
+        "total_claim_amount": math.fsum(amounts),
+        "min_claim_amount": min(amounts, default=None),
+        "max_claim_amount": max(amounts, default=None),
+    }
+
+
+def check_totals(snapshot: dict, claims: list) -> None:
+    assert_close(snapshot["total"], computed_totals(claims))
+    for name, value_of in GROUPS.items():
+        groups = {}
+        for claim in claims:
+            if value_of(claim) is not None:
+                groups.setdefault(value_of(claim), []).append(claim)
+        assert set(snapshot[f"by_{name}"]) == set(groups), name
+        for value, members in groups.items():
+            assert_close(snapshot[f"by_{name}"][value], computed_totals(members))
+
+
+def assert_close(totals: dict, expected: dict) -> None:
+    for field, value in expected.items():
+        if field == "total_claim_amount":
+            assert math.isclose(totals[field], value, rel_tol=1e-9), (field, totals[field], value)
+        else:
+            assert totals[field] == value, (field, totals[field], value)
+
+
+def test_totals_match_claims():
+    """Totals kept claim by claim and batch by batch match totals computed from every claim"""
+    print("Testing running claim totals...")
+    claims = make_claims(3000)
+
+    async def run():
+        backend = MemoryClaimBackend()
+        await backend.add_many(claims[:1000])
+        for claim in claims[1000:2000]:
+            await backend.add_many([claim])
+        # Stored claim IDs are not counted again
+        await backend.add_many(claims[:10])
+        check_totals(backend.get_stats().snapshot(), claims[:2000])
+        ClaimStats.model_validate(backend.get_stats().snapshot())
+
+    asyncio.run(run())
+    print("  ✅ PASS")
+
+
+def test_totals_are_restored():
+    """Claims restored from the claim log are counted"""
+    print("Testing running claim totals after a restart...")
+    claims = make_claims(500, seed=3)
+
+    async def run(directory):
+        backend = MemoryClaimBackend()
+        backend.open_log(directory)
+        await backend.add_many(claims)
+        await backend.close()
+
+        restored = MemoryClaimBackend()
+        restored.open_log(directory)
+        check_totals(restored.get_stats().snapshot(), claims)
+        await restored.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(directory))
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_totals_match_claims()
+    test_totals_are_restored()
@@ -0,0 +1,88 @@
+"""
+Test script for hot/cold claim tiering.
+
+Stores claims in a memory store that keeps only the newest claims in memory
+and checks that claims moved to compressed on-disk segments are still read,
+paged and exported exactly like in a store that keeps every claim in memory,
+and that the claim log can snapshot and restore them.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app import config
+from app.modules.claim_backend import MemoryClaimBackend
+from test_claim_backends import check_queries_match, fill
+from test_claim_index import make_claims
+
+HOT_CLAIMS = 100
+SEGMENT_CLAIMS = 150
+
+
+def test_cold_claims_read_like_hot_ones():
+    """Lookups, pages and exports match a store that keeps every claim in memory"""
+    print("Testing reads of claims moved to disk...")
+    claims = make_claims(1500)
+
+    async def run(directory):
+        backend = MemoryClaimBackend(HOT_CLAIMS, directory, SEGMENT_CLAIMS)
+        await fill(backend, claims)
+        tiers = backend.claim_tiers
+        tiers.wait()
+        assert len(tiers.encodings) < HOT_CLAIMS + SEGMENT_CLAIMS
+        assert tiers.hot_start > 0 and len(tiers) == len(claims)
+
+        for claim in [claims[0], claims[517], claims[-1]]:
+            assert await backend.get(claim.claim_id) == claim
+            assert await backend.get_json(claim.claim_id) == claim.model_dump_json().encode()
+        assert await backend.get_all() == claims
+        await check_queries_match(backend, claims, queries=100)
+
+        await backend.close()
+        assert not os.listdir(directory)
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(directory))
+    print("  ✅ PASS")
+
+
+def test_log_restores_cold_claims():
+    """Snapshots include claims on disk, and a restored store moves old claims to disk again"""
+    print("Testing the claim log with claims on disk...")
+    claims = make_claims(1200)
+    snapshot_every = config.CLAIM_LOG_SNAPSHOT_EVERY
+    config.CLAIM_LOG_SNAPSHOT_EVERY = 400
+
+    async def run(directory):
+        log_directory = os.path.join(directory, "log")
+        backend = MemoryClaimBackend(HOT_CLAIMS, os.path.join(directory, "segments"), SEGMENT_CLAIMS)
+        backend.open_log(log_directory)
+        for claim in claims:
+            await backend.add_many([claim])
+        backend.claim_tiers.wait()
+        await backend.close()
+        assert any(name.startswith("snapshot-") for name in os.listdir(log_directory))
+
+        restored = MemoryClaimBackend(HOT_CLAIMS, os.path.join(directory, "segments"), SEGMENT_CLAIMS)
+        assert restored.open_log(log_directory) == len(claims)
+        restored.claim_tiers.wait()
+        assert restored.claim_tiers.hot_start > 0
+        assert await restored.get_all() == claims
+        await restored.close()
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(run(directory))
+    finally:
+        config.CLAIM_LOG_SNAPSHOT_EVERY = snapshot_every
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_cold_claims_read_like_hot_ones()
+    test_log_restores_cold_claims()
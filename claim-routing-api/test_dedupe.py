@@ -0,0 +1,41 @@
+"""
+Test script for duplicate claim detection.
+
+Checks LRU eviction, and that resubmitted claims map to the same
+idempotency key.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.modules.dedupe import LRUCache, claim_key
+
+
+def test_lru_cache():
+    """The least recently used entry is evicted first"""
+    print("Testing LRU cache...")
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c"), len(cache)) == (1, None, 3, 2)
+    print("  ✅ PASS")
+
+
+def test_claim_key():
+    """Claim IDs are used as keys; other claims are keyed on their normalized content"""
+    print("Testing claim keys...")
+    assert claim_key({"structured_data": {"CLAIM_ID": "ABC-1", "CLAIM_AMOUNT_PAID": 10}}) == "ABC-1"
+    assert claim_key({"text": "My BMW  was hit\n"}) == claim_key({"text": " My BMW was hit"})
+    assert claim_key({"text": "My BMW was hit"}) != claim_key({"text": "My Fiat was hit"})
+    assert (claim_key({"structured_data": {"WARRANTY": "collision", "CLAIM_AMOUNT_PAID": 10}})
+            == claim_key({"structured_data": {"CLAIM_AMOUNT_PAID": 10, "WARRANTY": "collision"}}))
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_lru_cache()
+    test_claim_key()
@@ -0,0 +1,201 @@
+"""
+Test script for the asynchronous claim job queue.
+
+Checks that the queue is bounded, that jobs interrupted by a crash are queued
+again when the database is reopened, that workers route and store jobs, that
+failed jobs are retried after a backoff and given up after max_attempts, and
+that callbacks are only sent to public or explicitly allowed hosts, at the
+address that was checked.
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+import httpx
+
+sys.path.append(str(Path(__file__).parent))
+
+from app import config
+from app.modules import job_queue
+from app.modules.job_queue import ClaimJobQueue, JobQueueFull, check_callback_url
+from app.modules.database import ClaimDatabase
+
+
+def make_queue(path: str, max_jobs: int = 2) -> ClaimJobQueue:
+    return ClaimJobQueue(path, max_jobs=max_jobs, workers=1, max_attempts=3, retention_seconds=3600)
+
+
+def test_queue_is_bounded_and_survives_crash():
+    """A full queue rejects jobs; running jobs are queued again after a restart"""
+    print("Testing bounded persistent job queue...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "jobs.db")
+        queue = make_queue(path)
+        first = asyncio.run(queue.submit({"structured_data": {"CLAIM_ID": "JOB-TEST-1"}}))
+        asyncio.run(queue.submit({"structured_data": {"CLAIM_ID": "JOB-TEST-2"}}))
+        try:
+            asyncio.run(queue.submit({"structured_data": {"CLAIM_ID": "JOB-TEST-3"}}))
+        except JobQueueFull:
+            pass
+        else:
+            raise AssertionError("Job was accepted past the queue limit")
+
+        # Simulate a crash while the first job is running
+        queue._claim_next()
+        assert asyncio.run(queue.get(first.job_id)).status == "running"
+        queue.connection.close()
+
+        restarted = make_queue(path)
+        assert asyncio.run(restarted.get(first.job_id)).status == "queued"
+        assert restarted.active == 2
+        restarted.connection.close()
+
+    print("  ✅ PASS")
+
+
+def test_workers_route_and_store_jobs():
+    """Queued jobs are routed, stored, and their decision is available from the job"""
+    print("Testing job processing...")
+
+    async def run():
+        with tempfile.TemporaryDirectory() as directory:
+            queue = make_queue(str(Path(directory) / "jobs.db"))
+            await queue.start()
+            good = await queue.submit({"structured_data": {"CLAIM_ID": "JOB-TEST-OK", "CLAIM_AMOUNT_PAID": 20000}})
+            bad = await queue.submit({})
+            for _ in range(100):
+                if queue.active == 0:
+                    break
+                await asyncio.sleep(0.05)
+            done, failed = await queue.get(good.job_id), await queue.get(bad.job_id)
+            await queue.stop()
+            return done, failed
+
+    done, failed = asyncio.run(run())
+    assert done.status == "done" and done.decision.claim_id == "JOB-TEST-OK"
+    assert asyncio.run(ClaimDatabase.get_claim_by_id("JOB-TEST-OK")) is not None
+    assert failed.status == "failed" and "text" in failed.error
+    print(f"  {done.job_id}: {done.decision.assigned_team}")
+    print("  ✅ PASS")
+
+
+def test_crashing_job_is_given_up():
+    """A job that was running at each of max_attempts crashes is failed without being run again"""
+    print("Testing jobs interrupted max_attempts times...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "jobs.db")
+        queue = make_queue(path)
+        asyncio.run(queue.submit({"structured_data": {"CLAIM_ID": "JOB-TEST-CRASH", "CLAIM_AMOUNT_PAID": 20000}}))
+        for _ in range(3):
+            queue._claim_next()
+            queue.connection.close()
+            queue = make_queue(path)
+
+        failed = asyncio.run(queue._process(queue._claim_next()))
+        assert failed.status == "failed" and "Gave up after 3 attempts" in failed.error
+        assert queue.active == 0
+        assert asyncio.run(ClaimDatabase.get_claim_by_id("JOB-TEST-CRASH")) is None
+        queue.connection.close()
+    print("  ✅ PASS")
+
+
+def test_failed_job_is_retried_after_backoff():
+    """A job that fails unexpectedly is not picked up again before its backoff has passed"""
+    print("Testing retry backoff...")
+
+    async def broken_lookup(key):
+        raise RuntimeError("database unavailable")
+
+    find_existing = ClaimDatabase.find_existing
+    ClaimDatabase.find_existing = broken_lookup
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            queue = make_queue(str(Path(directory) / "jobs.db"))
+            job = asyncio.run(queue.submit({"structured_data": {"CLAIM_ID": "JOB-TEST-RETRY"}}))
+            assert asyncio.run(queue._process(queue._claim_next())) is None
+            assert asyncio.run(queue.get(job.job_id)).status == "queued"
+            assert queue._claim_next() is None
+            assert 0 < queue._idle_seconds() <= config.JOB_RETRY_BACKOFF_SECONDS
+
+            queue.connection.execute("UPDATE jobs SET retry_at = '2000-01-01T00:00:00+00:00'")
+            row = queue._claim_next()
+            assert row["job_id"] == job.job_id and row["attempts"] == 2
+            queue.connection.close()
+    finally:
+        ClaimDatabase.find_existing = find_existing
+    print("  ✅ PASS")
+
+
+def test_callback_urls_are_checked():
+    """Callbacks to private, loopback or link-local addresses and other schemes are refused"""
+    print("Testing callback URL checks...")
+
+    def allowed(url: str) -> bool:
+        try:
+            asyncio.run(check_callback_url(url))
+        except ValueError:
+            return False
+        return True
+
+    for url in [
+        "ftp://93.184.215.14/hook", "file:///etc/passwd", "http:///hook", "http://127.0.0.1:8000/hook",
+        "http://localhost/hook", "http://10.0.0.5/hook", "http://192.168.1.1/hook",
+        "http://169.254.169.254/latest/meta-data", "http://[::1]/hook", "http://[::ffff:127.0.0.1]/hook",
+        "http://0.0.0.0/hook",
+    ]:
+        assert not allowed(url), url
+    assert allowed("https://93.184.215.14/hook")
+
+    allowed_hosts = config.JOB_CALLBACK_ALLOWED_HOSTS
+    config.JOB_CALLBACK_ALLOWED_HOSTS = ["hooks.internal"]
+    try:
+        assert allowed("https://HOOKS.internal/claims")
+        assert not allowed("https://93.184.215.14/hook")
+        assert not allowed("ftp://hooks.internal/claims")
+    finally:
+        config.JOB_CALLBACK_ALLOWED_HOSTS = allowed_hosts
+    print("  ✅ PASS")
+
+
+def test_callback_is_sent_to_checked_address():
+    """A callback connects to the address its host was checked at, not to what the host resolves to later"""
+    print("Testing callback address pinning...")
+    answers = [["93.184.215.14"], ["127.0.0.1"]]
+    sent = []
+
+    async def rebinding_host(host, port):
+        return answers.pop(0) if answers else ["127.0.0.1"]
+
+    def receive(request):
+        sent.append((request.url.host, request.headers["host"], request.extensions.get("sni_hostname")))
+        return httpx.Response(204)
+
+    async def run(queue, job):
+        queue._client = httpx.AsyncClient(transport=httpx.MockTransport(receive))
+        await queue._send_callback("https://hooks.example.com/claims", job)
+        await queue._send_callback("https://hooks.example.com/claims", job)
+        await queue._client.aclose()
+
+    resolve_host = job_queue.resolve_host
+    job_queue.resolve_host = rebinding_host
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            queue = make_queue(str(Path(directory) / "jobs.db"))
+            job = asyncio.run(queue.submit({"structured_data": {"CLAIM_ID": "JOB-TEST-CALLBACK"}}))
+            asyncio.run(run(queue, job))
+            queue.connection.close()
+    finally:
+        job_queue.resolve_host = resolve_host
+    assert sent == [("93.184.215.14", "hooks.example.com", "hooks.example.com")]
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_queue_is_bounded_and_survives_crash()
+    test_workers_route_and_store_jobs()
+    test_crashing_job_is_given_up()
+    test_failed_job_is_retried_after_backoff()
+    test_callback_urls_are_checked()
+    test_callback_is_sent_to_checked_address()
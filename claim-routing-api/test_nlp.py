@@ -22,13 +22,13 @@ test_cases = [
 
 print("Testing NLP-enhanced claim extraction...\n")
 
-for i, test in enumerate(test_cases):
+# Extract claim data from all test texts in one pass through the NLP pipeline
+extracted = ClaimExtractor.extract_many([test["text"] for test in test_cases])
+
+for i, (test, claim_data) in enumerate(zip(test_cases, extracted)):
     print(f"Test {i+1}: {test['name']}")
     print(f"Input: {test['text']}")
     
-    # Extract claim data
-    claim_data = ClaimExtractor.extract_from_text(test["text"])
-    
     # Print extracted data
     print("\nExtracted data:")
     print(f"  Age: {claim_data.policyholder_age}")
@@ -0,0 +1,62 @@
+"""
+Test script for loading the spaCy pipeline of the claim extractor.
+
+Checks that the pipeline is only loaded by the first text claim, not by
+importing the API or extracting structured claims, and that it is loaded
+without the components listed in SPACY_EXCLUDE and with those in
+SPACY_DISABLE turned off. Uses a small pipeline saved to a temporary
+directory, so the installed model is not needed.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+import spacy
+
+from app import config
+import app.routers.claims  # noqa: F401
+from app.modules.claim_extractor import ClaimExtractor
+
+TEXT = "I'm a 40-year-old policyholder in Milan. My Fiat Panda was hit. Claim amount: 8500 euros."
+
+
+def save_pipeline(directory: str) -> None:
+    nlp = spacy.blank("en")
+    nlp.add_pipe("tagger").add_label("NN")
+    nlp.add_pipe("senter")
+    nlp.add_pipe("ner").add_label("GPE")
+    nlp.initialize()
+    nlp.to_disk(directory)
+
+
+def test_pipeline_loaded_on_first_text_claim():
+    """Importing the API and extracting structured claims leave the pipeline unloaded"""
+    print("Testing lazy spaCy loading...")
+    model, exclude, disable = config.SPACY_MODEL, config.SPACY_EXCLUDE, config.SPACY_DISABLE
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            save_pipeline(directory)
+            ClaimExtractor._nlp = None
+            config.SPACY_MODEL, config.SPACY_EXCLUDE, config.SPACY_DISABLE = directory, ["tagger"], ["senter"]
+
+            ClaimExtractor.extract_batch([{"structured_data": {"CLAIM_ID": "CLAIM-1"}}, {}])
+            ClaimExtractor.extract_from_text(TEXT, use_nlp=False)
+            assert ClaimExtractor._nlp is None
+
+            claim_data = ClaimExtractor.extract_from_text(TEXT)
+            assert claim_data.claim_region == "Milan" and claim_data.policyholder_age == 40
+            nlp = ClaimExtractor.get_nlp()
+            assert nlp.component_names == ["senter", "ner"]
+            assert nlp.pipe_names == ["ner"]
+            assert ClaimExtractor.get_nlp() is nlp
+    finally:
+        ClaimExtractor._nlp = None
+        config.SPACY_MODEL, config.SPACY_EXCLUDE, config.SPACY_DISABLE = model, exclude, disable
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_pipeline_loaded_on_first_text_claim()
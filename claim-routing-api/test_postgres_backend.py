@@ -0,0 +1,147 @@
+"""
+Test script for the PostgreSQL claim store.
+
+Runs the storage backend checks against a local Postgres instance. Set
+POSTGRES_TEST_URL to a database the tests may create schemas in, e.g.
+
+    POSTGRES_TEST_URL=postgresql://postgres@localhost/postgres python test_postgres_backend.py
+
+Each test works in a schema of its own that is dropped afterwards. Without
+POSTGRES_TEST_URL the tests are skipped.
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from test_claim_backends import check_queries_match, check_stored_once, fill
+from test_claim_index import make_claims
+
+POSTGRES_TEST_URL = os.getenv("POSTGRES_TEST_URL")
+
+
+@asynccontextmanager
+async def postgres_backend():
+    """A PostgresClaimBackend working in a fresh schema, dropped on exit"""
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+    from app.modules.postgres_backend import PostgresClaimBackend
+
+    schema = f"claims_test_{uuid.uuid4().hex[:8]}"
+    async with await psycopg.AsyncConnection.connect(POSTGRES_TEST_URL, autocommit=True) as connection:
+        await connection.execute(f"CREATE SCHEMA {schema}")
+    backend = PostgresClaimBackend(make_conninfo(POSTGRES_TEST_URL, options=f"-c search_path={schema}"), 1, 4)
+    await backend.open()
+    try:
+        yield backend
+    finally:
+        await backend.close()
+        async with await psycopg.AsyncConnection.connect(POSTGRES_TEST_URL, autocommit=True) as connection:
+            await connection.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def skipped() -> bool:
+    if not POSTGRES_TEST_URL:
+        print("  Skipped: set POSTGRES_TEST_URL to run against a local Postgres instance")
+        return True
+    return False
+
+
+def test_queries_match():
+    """Dashboard pages and exports (through a server-side cursor) match the in-memory store"""
+    print("Testing Postgres queries against the in-memory store...")
+    if skipped():
+        return
+    claims = make_claims(1500)
+
+    async def run():
+        async with postgres_backend() as backend:
+            await check_queries_match(await fill(backend, claims), claims, queries=100)
+
+    asyncio.run(run())
+    print("  ✅ PASS")
+
+
+def test_claims_are_stored_once():
+    """Single inserts and COPY batches both keep the first claim stored under an ID"""
+    print("Testing duplicate claim IDs in Postgres...")
+    if skipped():
+        return
+
+    async def run():
+        async with postgres_backend() as backend:
+            await check_stored_once(backend, make_claims(3))
+
+    asyncio.run(run())
+    print("  ✅ PASS")
+
+
+def test_epoch_persists():
+    """Reopening the store keeps its claims, epoch and version"""
+    print("Testing Postgres persistence...")
+    if skipped():
+        return
+    claims = make_claims(10)
+
+    async def run():
+        from app.modules.postgres_backend import PostgresClaimBackend
+
+        async with postgres_backend() as backend:
+            await backend.add_many(claims)
+            reopened = PostgresClaimBackend(backend.url, 1, 1)
+            await reopened.open()
+            try:
+                assert await reopened.epoch() == await backend.epoch()
+                assert await reopened.version() == await backend.version()
+                assert await reopened.get(claims[4].claim_id) == claims[4]
+            finally:
+                await reopened.close()
+
+    asyncio.run(run())
+    print("  ✅ PASS")
+
+
+def test_claims_commit_in_seq_order():
+    """A claim inserted while another insert is open commits after it, so versions and cursors never miss it"""
+    print("Testing Postgres insert ordering...")
+    if skipped():
+        return
+    claims = make_claims(3)
+
+    async def run():
+        from app.models.claim import ClaimQuery
+        from app.modules.postgres_backend import CLAIM_INSERT_LOCK, INSERT_CLAIM, LOCK_INSERTS, _row
+
+        async with postgres_backend() as backend:
+            await backend.add_many(claims[:1])
+            page, cursor = await backend.query(ClaimQuery(sort="submitted", limit=1))
+            version = await backend.version()
+
+            async with backend.pool.connection() as connection:
+                async with connection.transaction():
+                    await connection.execute(LOCK_INSERTS, (CLAIM_INSERT_LOCK,))
+                    await connection.execute(INSERT_CLAIM, _row(claims[1]))
+                    later = asyncio.create_task(backend.add_many(claims[2:]))
+                    await asyncio.sleep(0.5)
+                    assert not later.done()
+                    assert await backend.version() == version
+            await later
+
+            assert await backend.version() != version
+            rest, _ = await backend.query(ClaimQuery(sort="submitted", cursor=cursor))
+            assert page + rest == claims
+
+    asyncio.run(run())
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_queries_match()
+    test_claims_are_stored_once()
+    test_epoch_persists()
+    test_claims_commit_in_seq_order()
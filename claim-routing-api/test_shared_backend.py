@@ -0,0 +1,178 @@
+"""
+Test script for the claim store shared between worker processes.
+
+Checks that the shared store answers dashboard queries like the in-memory
+store, that claims added by several processes at once are stored once and
+seen by every process, that a writer dying mid-append leaves the store
+readable, and that waiting for another worker's lock leaves the event loop
+free.
+"""
+
+import asyncio
+import fcntl
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.modules.shared_backend import SharedClaimBackend, COUNTER, SEQUENCE_OFFSET
+from test_claim_backends import check_queries_match, check_stored_once, fill
+from test_claim_index import make_claims
+
+WORKERS = 3
+
+
+@asynccontextmanager
+async def shared_backend(path):
+    backend = SharedClaimBackend(path)
+    await backend.open()
+    try:
+        yield backend
+    finally:
+        await backend.close()
+
+
+def test_queries_match():
+    """Dashboard pages and exports match the in-memory store"""
+    print("Testing shared store queries against the in-memory store...")
+    claims = make_claims(1500)
+
+    async def run(path):
+        async with shared_backend(path) as backend:
+            await check_queries_match(await fill(backend, claims), claims, queries=100)
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(os.path.join(directory, "claims.shared")))
+    print("  ✅ PASS")
+
+
+def test_claims_are_stored_once():
+    """Adding a stored claim ID, in a later batch or the same one, keeps the first claim"""
+    print("Testing duplicate claim IDs in the shared store...")
+
+    async def run(path):
+        async with shared_backend(path) as backend:
+            await check_stored_once(backend, make_claims(3))
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(os.path.join(directory, "claims.shared")))
+    print("  ✅ PASS")
+
+
+def add_from_worker(path, worker, start_barrier):
+    """Add every claim, in batches starting at a different offset in each worker"""
+    claims = make_claims(600)
+
+    async def run():
+        async with shared_backend(path) as backend:
+            start_barrier.wait()
+            offset = worker * 200
+            for start in range(0, len(claims), 50):
+                batch = [claims[(offset + i) % len(claims)] for i in range(start, start + 50)]
+                await backend.add_many(batch)
+
+    asyncio.run(run())
+
+
+def test_workers_share_claims():
+    """Claims added by several processes at once are stored once, and every process sees them all"""
+    print("Testing claims added by several worker processes...")
+    claims = make_claims(600)
+
+    async def run(path):
+        async with shared_backend(path) as reader:
+            assert await reader.count() == 0
+            context = multiprocessing.get_context("spawn")
+            start_barrier = context.Barrier(WORKERS)
+            workers = [
+                context.Process(target=add_from_worker, args=(path, worker, start_barrier))
+                for worker in range(WORKERS)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+                assert worker.exitcode == 0
+
+            # The reader opened before the workers wrote and catches up on its next read
+            stored = await reader.get_all()
+            assert sorted(claim.claim_id for claim in stored) == sorted(claim.claim_id for claim in claims)
+            assert await reader.get_json(claims[123].claim_id) == claims[123].model_dump_json().encode()
+
+            async with shared_backend(path) as other:
+                assert await other.epoch() == await reader.epoch()
+                assert await other.version() == await reader.version()
+                assert [claim.claim_id for claim in await other.get_all()] == [claim.claim_id for claim in stored]
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(os.path.join(directory, "claims.shared")))
+    print("  ✅ PASS")
+
+
+def test_unpublished_records_are_ignored():
+    """A writer that died mid-append leaves its records unpublished and the header repaired"""
+    print("Testing recovery from a writer dying mid-append...")
+    claims = make_claims(20)
+
+    async def run(path):
+        async with shared_backend(path) as backend:
+            await backend.add_many(claims[:10])
+            # Simulate a crash: a record written past the committed end, and a publication left open
+            os.pwrite(backend.fd, struct.pack("<I", 1000) + b"{torn", backend.read_end)
+            sequence = COUNTER.unpack_from(backend.header, SEQUENCE_OFFSET)[0]
+            COUNTER.pack_into(backend.header, SEQUENCE_OFFSET, sequence + 1)
+
+        async with shared_backend(path) as backend:
+            assert await backend.count() == 10
+            await backend.add_many(claims[10:])
+
+        async with shared_backend(path) as backend:
+            assert [claim.claim_id for claim in await backend.get_all()] == [claim.claim_id for claim in claims]
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(os.path.join(directory, "claims.shared")))
+    print("  ✅ PASS")
+
+
+def test_waits_off_the_event_loop():
+    """Writes, and reads that must repair the header, wait for another worker's lock on a thread"""
+    print("Testing shared store waits for the writer lock...")
+    claims = make_claims(2)
+
+    async def run(path):
+        async with shared_backend(path) as backend:
+            await backend.add_many(claims[:1])
+            other = os.open(path, os.O_RDWR)
+            fcntl.flock(other, fcntl.LOCK_EX)
+            # Another worker holds the lock, and looks to have died mid-publish
+            sequence = COUNTER.unpack_from(backend.header, SEQUENCE_OFFSET)[0]
+            COUNTER.pack_into(backend.header, SEQUENCE_OFFSET, sequence + 1)
+            adding = asyncio.create_task(backend.add_many(claims[1:]))
+            counting = asyncio.create_task(backend.count())
+            ticks = 0
+            for _ in range(20):
+                await asyncio.sleep(0.01)
+                ticks += 1
+            assert ticks == 20 and not adding.done() and not counting.done()
+            fcntl.flock(other, fcntl.LOCK_UN)
+            os.close(other)
+            assert [added for _, added in await adding] == [True]
+            assert await counting in (1, 2)
+            assert await backend.count() == 2
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(os.path.join(directory, "claims.shared")))
+    print("  ✅ PASS")
+
+
+if __name__ == "__main__":
+    test_queries_match()
+    test_claims_are_stored_once()
+    test_workers_share_claims()
+    test_unpublished_records_are_ignored()
+    test_waits_off_the_event_loop()
@@ -42,20 +42,53 @@ export const submitClaim = async (claimInput: ClaimInput): Promise<RoutingDecisi
   }
 };
 
-export const getAdjusterDashboard = async (team?: string): Promise<RoutingDecision[]> => {
+export interface DashboardQuery {
+  urgency?: string;
+  customer_value?: string;
+  is_potential_fraud?: boolean;
+  min_risk?: number;
+  max_risk?: number;
+  date_from?: string;
+  date_to?: string;
+  sort?: 'submitted' | 'risk' | 'urgency' | 'amount';
+  limit?: number;
+  cursor?: string;
+  view?: 'full' | 'summary';
+  fields?: string;
+}
+
+export interface DashboardPage {
+  claims: RoutingDecision[];
+  nextCursor?: string;
+}
+
+// Largest page the API returns; whole-dashboard loads fetch pages of this size
+const DASHBOARD_PAGE_LIMIT = 1000;
+
+export const getAdjusterDashboardPage = async (team?: string, query: DashboardQuery = {}): Promise<DashboardPage> => {
   try {
-    const url = team 
-      ? `${API_URL}/adjuster-dashboard?team=${encodeURIComponent(team)}` 
-      : `${API_URL}/adjuster-dashboard`;
-    
-    const response = await axios.get(url);
-    return response.data;
+    const response = await axios.get(`${API_URL}/adjuster-dashboard`, {
+      params: { ...query, team },
+    });
+    return { claims: response.data, nextCursor: response.headers['x-next-cursor'] || undefined };
   } catch (error) {
     console.error('Error fetching adjuster dashboard:', error);
     throw error;
   }
 };
 
+// Every claim matching the filters: follows X-Next-Cursor until the last page
+export const getAdjusterDashboard = async (team?: string, query: DashboardQuery = {}): Promise<RoutingDecision[]> => {
+  const claims: RoutingDecision[] = [];
+  let cursor: string | undefined = query.cursor;
+  do {
+    const page = await getAdjusterDashboardPage(team, { limit: DASHBOARD_PAGE_LIMIT, ...query, cursor });
+    claims.push(...page.claims);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return claims;
+};
+
 export const getClaimById = async (claimId: string): Promise<RoutingDecision> => {
   try {
     const response = await axios.get(`${API_URL}/claim/${claimId}`);